@@ -11,13 +11,6 @@ import os
 # Import database
 from models.database import db
 
-# Import blueprints
-from routes.visitor_routes import visitor_bp
-from routes.admin_routes import admin_bp
-from routes.analytics_routes import analytics_bp
-from routes.security_routes import security_bp
-from routes.host_routes import host_bp
-
 # Import extensions (Flask-Mail)
 from extensions import init_extensions
 
@@ -33,6 +26,12 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///visitor_management.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # WAL journaling, busy timeout etc. on every SQLite connection
+    # (values in config.Config.SQLITE_*)
+    from utils.sqlite_tuning import register_sqlite_tuning, sqlite_engine_options
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options()
+    register_sqlite_tuning()
+    
     # =========================================================================
     # FILE UPLOAD CONFIGURATION
     # =========================================================================
@@ -118,22 +117,25 @@ def create_app():
         
         This function checks the session for user_type to load from the correct table.
         This prevents ID conflicts when different user tables have the same ID.
+        
+        Rows come from utils.user_cache (TTL/LRU), so most requests run no query.
         """
         from models.database import User, Host
+        from utils.user_cache import load_principal
         
         # Check session for user type
         user_type = session.get('user_type')
         
         if user_type == 'host':
             # Load as Host from hosts table
-            return Host.query.get(int(user_id))
+            return load_principal('host', Host, int(user_id))
         elif user_type == 'security' or user_type == 'admin':
             # Both admin and security are in users table!
-            return User.query.get(int(user_id))
+            return load_principal('user', User, int(user_id))
         else:
             # Fallback: try all tables (for backward compatibility or when session is lost)
             # Try User (Admin/Security) first
-            user = User.query.get(int(user_id))
+            user = load_principal('user', User, int(user_id))
             if user:
                 # Set session based on role
                 if user.role == 'security':
@@ -143,7 +145,7 @@ def create_app():
                 return user
             
             # Try Host
-            host = Host.query.get(int(user_id))
+            host = load_principal('host', Host, int(user_id))
             if host:
                 session['user_type'] = 'host'
                 return host
@@ -155,6 +157,14 @@ def create_app():
     # REGISTER BLUEPRINTS
     # =========================================================================
     
+    # Imported here so `from app import create_app` stays cheap; heavy
+    # libraries inside the blueprints go through utils.lazy_imports
+    from routes.visitor_routes import visitor_bp
+    from routes.admin_routes import admin_bp
+    from routes.analytics_routes import analytics_bp
+    from routes.security_routes import security_bp
+    from routes.host_routes import host_bp
+    
     app.register_blueprint(visitor_bp)  # Public visitor registration
     app.register_blueprint(admin_bp, url_prefix='/admin')  # Admin portal
     app.register_blueprint(analytics_bp, url_prefix='/analytics')  # Analytics
@@ -192,9 +202,45 @@ def create_app():
             Host, HostVisitor, HostActivityLog
         )
         
-        # Create all tables
-        db.create_all()
-        
+        # Schema: a single schema_version lookup when the database is up to
+        # date; otherwise create missing tables and apply pending migrations
+        # (columns, hot query indexes, 'visits' read model, visit_days)
+        from utils.migrations import run_migrations, schema_is_current
+        conn = db.engine.raw_connection()
+        try:
+            if not schema_is_current(conn):
+                run_migrations(conn, log=print, prepare=db.create_all)
+        finally:
+            conn.close()
+
+        # Buffered VisitLog / HostActivityLog writes (flushed at exit too)
+        from utils.audit_log import init_audit_log
+        init_audit_log(db.engine.raw_connection)
+
+        # Separate read-only pool for analytics pages and report exports
+        from utils.analytics_db import init_analytics_engine
+        init_analytics_engine(db.engine.url.database)
+
+        # Report jobs built in background threads (submit / poll / download)
+        from utils.report_jobs import init_report_jobs
+        init_report_jobs(db.engine.raw_connection)
+
+        # Keep the in-memory face index in sync with visitor registrations
+        from utils.face_index import register_face_index_listeners
+        register_face_index_listeners(Visitor, HostVisitor)
+
+        # Store new face encodings in the binary column as well
+        from utils.face_codec import register_face_blob_listeners
+        register_face_blob_listeners(Visitor, HostVisitor)
+
+        # Remove content-addressed face photos nothing references any more
+        from utils.face_store import register_face_store_listeners
+        register_face_store_listeners(Visitor, HostVisitor)
+
+        # Evict cached login principals when users / hosts change
+        from utils.user_cache import register_user_cache_listeners
+        register_user_cache_listeners(User, Host)
+
         # Create default admin user if not exists
         try:
             admin = User.query.filter_by(username='admin').first()
@@ -0,0 +1,100 @@
+"""
+Monthly Archive Job
+Moves closed visits older than the archive horizon (Config.ARCHIVE_AFTER_DAYS)
+and their log rows from the live database into per-month archive files
+(see utils/archive.py). Safe to interrupt and re-run; schedule it nightly.
+
+Usage: python archive_old_visits.py [db_path] [--days=N] [--list]
+    --days=N   archive closed visits older than N days instead of the default
+    --list     only list the existing archive months and their row counts
+"""
+
+import sqlite3
+import os
+import sys
+from datetime import date, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from utils.archive import ARCHIVED_TABLES, archive_closed_visits, archive_path, archived_months
+from utils.sqlite_tuning import apply_sqlite_pragmas
+
+
+def list_archives():
+    months = archived_months()
+    if not months:
+        print("   (no archive months yet)")
+    for month in months:
+        conn = sqlite3.connect(archive_path(month))
+        counts = []
+        for table in ARCHIVED_TABLES:
+            try:
+                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            except sqlite3.OperationalError:
+                count = 0
+            counts.append(f"{table}={count}")
+        conn.close()
+        print(f"   📦 {month}  {'  '.join(counts)}")
+
+
+def archive_old_visits(db_path='visitor_management.db', days=None):
+    """Run the archive job; returns True on success"""
+
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found: {db_path}")
+        print("Please run this script from the project root directory")
+        return False
+
+    days = Config.ARCHIVE_AFTER_DAYS if days is None else days
+    cutoff = date.today() - timedelta(days=days)
+    print(f"📅 Archiving closed visits before {cutoff.isoformat()} ({days} days)")
+    print(f"📁 Archive folder: {Config.ARCHIVE_FOLDER}")
+    print()
+
+    try:
+        conn = sqlite3.connect(db_path)
+        apply_sqlite_pragmas(conn)
+        totals = archive_closed_visits(conn, cutoff=cutoff, log=lambda line: print(f"   {line}"))
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"❌ Database error: {e}")
+        return False
+
+    print()
+    for table, count in totals.items():
+        print(f"   ✅ {table:<20} {count} row(s) archived")
+    print()
+    list_archives()
+    return True
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("🗄️  MONTHLY ARCHIVE JOB")
+    print("=" * 70)
+    print()
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    db_path = args[0] if args else 'visitor_management.db'
+    days = None
+    for arg in sys.argv[1:]:
+        if arg.startswith('--days='):
+            days = int(arg.split('=', 1)[1])
+
+    if '--list' in sys.argv:
+        list_archives()
+        success = True
+    else:
+        success = archive_old_visits(db_path, days)
+
+    print()
+    print("=" * 70)
+    if success:
+        print("✅ ARCHIVE COMPLETE")
+    else:
+        print("❌ ARCHIVE FAILED")
+        print("Please check the errors above")
+    print("=" * 70)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,146 @@
+"""
+Audit Log Write-Behind Benchmark
+Check-in throughput on a scratch SQLite database with the visit_logs row
+committed on the request path (the old way) versus queued in
+utils/audit_log.AuditLogWriter and written in batches.
+
+Each simulated check-in updates the visitor row and commits, then writes
+one visit_logs row. Runs once with the tuned PRAGMAs from Config and once
+with synchronous=FULL, where every commit is an fsync.
+
+Usage: python benchmark_audit_log.py [threads] [checkins_per_thread]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from utils.audit_log import AuditLogWriter, audit_timestamp
+from utils.sqlite_tuning import apply_sqlite_pragmas, sqlite_pragmas
+
+VISITORS = 2000
+
+SCHEMA = [
+    """CREATE TABLE visitors (
+        id INTEGER PRIMARY KEY,
+        full_name VARCHAR(120) NOT NULL,
+        status VARCHAR(20),
+        check_in_time DATETIME
+    )""",
+    """CREATE TABLE visit_logs (
+        id INTEGER PRIMARY KEY,
+        visitor_id INTEGER NOT NULL,
+        action VARCHAR(50) NOT NULL,
+        timestamp DATETIME,
+        notes TEXT,
+        performed_by VARCHAR(100)
+    )""",
+    "CREATE INDEX ix_visit_logs_visitor_id_timestamp ON visit_logs (visitor_id, timestamp)",
+]
+
+
+def seed(path):
+    conn = sqlite3.connect(path)
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.executemany(
+        "INSERT INTO visitors (full_name, status) VALUES (?, 'approved')",
+        [(f"Visitor {i}",) for i in range(VISITORS)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_scenario(path, pragmas, threads, checkins, write_behind):
+    def connect():
+        conn = sqlite3.connect(path, timeout=Config.SQLITE_BUSY_TIMEOUT_MS / 1000.0,
+                               check_same_thread=False)
+        apply_sqlite_pragmas(conn, pragmas)
+        return conn
+
+    writer = AuditLogWriter(connect, mode='async') if write_behind else None
+
+    def worker(worker_id):
+        conn = connect()
+        for n in range(checkins):
+            visitor_id = (worker_id * checkins + n) % VISITORS + 1
+            conn.execute(
+                "UPDATE visitors SET status = 'checked-in', check_in_time = ? WHERE id = ?",
+                (audit_timestamp(), visitor_id)
+            )
+            conn.commit()
+            values = (visitor_id, 'check_in', None, 'security', audit_timestamp())
+            if writer is not None:
+                writer.log('visit_logs', values)
+            else:
+                conn.execute(
+                    "INSERT INTO visit_logs (visitor_id, action, notes, performed_by, timestamp) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    values
+                )
+                conn.commit()
+        conn.close()
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    request_seconds = time.perf_counter() - start
+    if writer is not None:
+        writer.close()
+    total_seconds = time.perf_counter() - start
+
+    conn = sqlite3.connect(path)
+    logged = conn.execute("SELECT COUNT(*) FROM visit_logs").fetchone()[0]
+    conn.close()
+    return {
+        'checkins': threads * checkins,
+        'logged': logged,
+        'request_seconds': request_seconds,
+        'total_seconds': total_seconds,
+        'flushes': writer.flushes if writer is not None else threads * checkins,
+    }
+
+
+def run_benchmark(threads=8, checkins=250):
+    tuned = sqlite_pragmas()
+    full_sync = [(name, 'FULL' if name == 'synchronous' else value) for name, value in tuned]
+    scenarios = [
+        ('Tuned, direct', tuned, False),
+        ('Tuned, write-behind', tuned, True),
+        ('FULL sync, direct', full_sync, False),
+        ('FULL sync, write-behind', full_sync, True),
+    ]
+    results = []
+    for label, pragmas, write_behind in scenarios:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'audit.db')
+            seed(path)
+            results.append((label, run_scenario(path, pragmas, threads, checkins, write_behind)))
+
+    print("=" * 70)
+    print(f"AUDIT LOG BENCHMARK ({threads} threads x {checkins} check-ins)")
+    print("=" * 70)
+    print(f"{'Scenario':<25} {'Check-ins/s':>12} {'Log commits':>12} {'Logged':>8} {'Drain':>9}")
+    print("-" * 70)
+    for label, r in results:
+        drain = r['total_seconds'] - r['request_seconds']
+        print(f"{label:<25} {r['checkins'] / r['request_seconds']:>12.0f} {r['flushes']:>12} "
+              f"{r['logged']:>8} {drain * 1000:>6.0f} ms")
+    print("=" * 70)
+    return results
+
+
+if __name__ == '__main__':
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    checkins = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    run_benchmark(threads, checkins)
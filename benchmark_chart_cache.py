@@ -0,0 +1,186 @@
+"""
+Chart Cache Benchmark
+Dashboard loads (four matplotlib charts each) on a scratch SQLite database,
+served through utils/chart_cache.py:
+
+    cold       empty cache - every chart is rendered
+    repeat     same worker again - memory tier, no rendering
+    restart    new worker (memory cleared) - disk tier, no rendering
+    304        browser revalidates with If-None-Match - no bytes at all
+    new visit  a visitor registers, the data version moves - rendered again
+
+Exits with code 1 if a repeat load renders anything or a new visit does
+not invalidate the charts.
+
+Usage: python benchmark_chart_cache.py [visitors] [loads]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.chart_cache import (
+    ChartCache, cached_chart, chart_key, data_version, ensure_data_version_table, new_figure
+)
+import utils.chart_cache as chart_cache
+
+SCHEMA = [
+    """CREATE TABLE visitors (
+        id INTEGER PRIMARY KEY,
+        company VARCHAR(120),
+        status VARCHAR(20),
+        visit_date DATE,
+        check_in_time DATETIME
+    )""",
+    "CREATE TABLE host_visitors (id INTEGER PRIMARY KEY, status VARCHAR(20))",
+]
+
+STATUSES = ['pending', 'approved', 'checked-in', 'checked-out', 'rejected']
+
+
+def seed(path, visitors):
+    rng = random.Random(7)
+    conn = sqlite3.connect(path)
+    for statement in SCHEMA:
+        conn.execute(statement)
+    ensure_data_version_table(conn)
+    today = date.today()
+    rows = []
+    for _ in range(visitors):
+        day = today - timedelta(days=rng.randrange(90))
+        rows.append((
+            f"Company {rng.randrange(40)}", rng.choice(STATUSES), day.isoformat(),
+            f"{day.isoformat()} {rng.randrange(7, 19):02d}:{rng.randrange(60):02d}:00",
+        ))
+    conn.executemany(
+        "INSERT INTO visitors (company, status, visit_date, check_in_time) VALUES (?, ?, ?, ?)", rows
+    )
+    conn.commit()
+    return conn
+
+
+def dashboard_charts(conn):
+    """(chart type, params, render) for the four dashboard charts"""
+
+    def daily_visits(days):
+        rows = conn.execute(
+            "SELECT visit_date, COUNT(*) FROM visitors WHERE visit_date >= date('now', ?) "
+            "GROUP BY visit_date ORDER BY visit_date", (f"-{days} days",)
+        ).fetchall()
+        figure = new_figure()
+        axes = figure.subplots()
+        axes.plot([row[0] for row in rows], [row[1] for row in rows], marker='o')
+        axes.set_title(f"Visits, last {days} days")
+        axes.tick_params(axis='x', labelrotation=60, labelsize=6)
+        return figure
+
+    def status_breakdown():
+        rows = conn.execute("SELECT status, COUNT(*) FROM visitors GROUP BY status ORDER BY 2 DESC").fetchall()
+        figure = new_figure(6, 4)
+        figure.subplots().bar([row[0] for row in rows], [row[1] for row in rows], color='steelblue')
+        return figure
+
+    def top_companies(limit):
+        rows = conn.execute(
+            "SELECT company, COUNT(*) FROM visitors GROUP BY company ORDER BY 2 DESC LIMIT ?", (limit,)
+        ).fetchall()
+        figure = new_figure(6, 5)
+        figure.subplots().barh([row[0] for row in rows][::-1], [row[1] for row in rows][::-1])
+        return figure
+
+    def hourly_checkins():
+        rows = conn.execute(
+            "SELECT CAST(strftime('%H', check_in_time) AS INTEGER), COUNT(*) FROM visitors "
+            "WHERE check_in_time IS NOT NULL GROUP BY 1 ORDER BY 1"
+        ).fetchall()
+        figure = new_figure(6, 4)
+        figure.subplots().bar([row[0] for row in rows], [row[1] for row in rows], color='darkorange')
+        return figure
+
+    return [
+        ('daily_visits', {'days': 30}, daily_visits),
+        ('status_breakdown', {}, status_breakdown),
+        ('top_companies', {'limit': 10}, top_companies),
+        ('hourly_checkins', {}, hourly_checkins),
+    ]
+
+
+def load_dashboard(conn, charts):
+    """One page view: returns (seconds, charts rendered, ETags)"""
+    cache = chart_cache.get_chart_cache()
+    renders = cache.renders
+    start = time.perf_counter()
+    version = data_version(conn=conn)
+    etags = [cached_chart(chart_type, params, render, version)[1] for chart_type, params, render in charts]
+    return time.perf_counter() - start, cache.renders - renders, etags
+
+
+def revalidate(conn, charts, etags):
+    """Browser reload: If-None-Match checks only (what chart_response does)"""
+    start = time.perf_counter()
+    version = data_version(conn=conn)
+    fresh = sum(chart_key(chart_type, params, version) == etag
+                for (chart_type, params, _), etag in zip(charts, etags))
+    return time.perf_counter() - start, fresh
+
+
+def run_benchmark(visitors=20000, loads=20):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = seed(os.path.join(tmp, 'charts.db'), visitors)
+        charts = dashboard_charts(conn)
+        chart_cache._cache = ChartCache(memory_items=128, folder=os.path.join(tmp, 'charts'), disk_items=2000)
+
+        cold, cold_renders, etags = load_dashboard(conn, charts)
+
+        repeat = repeat_renders = 0
+        for _ in range(loads):
+            seconds, renders, _ = load_dashboard(conn, charts)
+            repeat += seconds
+            repeat_renders += renders
+
+        chart_cache._cache = ChartCache(memory_items=128, folder=os.path.join(tmp, 'charts'), disk_items=2000)
+        restart, restart_renders, _ = load_dashboard(conn, charts)
+
+        not_modified, fresh = revalidate(conn, charts, etags)
+
+        conn.execute("INSERT INTO visitors (company, status, visit_date) VALUES ('Walk-in', 'pending', date('now'))")
+        conn.commit()
+        stale = len(charts) - revalidate(conn, charts, etags)[1]
+        changed, changed_renders, _ = load_dashboard(conn, charts)
+        conn.close()
+
+    print()
+    print("=" * 70)
+    print(f"CHART CACHE BENCHMARK ({visitors:,} visitors, {len(charts)} charts per dashboard)")
+    print("=" * 70)
+    print(f"{'Dashboard load':<34} {'Time':>12} {'Charts rendered':>18}")
+    print("-" * 70)
+    print(f"{'cold (empty cache)':<34} {cold * 1000:>9.1f} ms {cold_renders:>18}")
+    print(f"{f'repeat (memory, avg of {loads})':<34} {repeat / loads * 1000:>9.2f} ms {repeat_renders:>18}")
+    print(f"{'new worker (disk tier)':<34} {restart * 1000:>9.2f} ms {restart_renders:>18}")
+    print(f"{'browser revalidation (304)':<34} {not_modified * 1000:>9.2f} ms {'0':>18}")
+    print(f"{'after a new visit':<34} {changed * 1000:>9.1f} ms {changed_renders:>18}")
+    print("=" * 70)
+
+    success = (
+        repeat_renders == 0 and restart_renders == 0 and fresh == len(charts)
+        and stale == len(charts) and changed_renders == len(charts)
+    )
+    if success:
+        print("✅ Repeat loads rendered no charts; a new visit invalidated all of them")
+    else:
+        print("❌ Unexpected renders or stale charts")
+    return success
+
+
+if __name__ == '__main__':
+    visitors = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    loads = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    sys.exit(0 if run_benchmark(visitors, loads) else 1)
@@ -0,0 +1,104 @@
+"""
+Face Detection Pre-scaling Benchmark
+Compares detection on the full-resolution upload with detection on a copy
+downscaled to FACE_DETECTION_MAX_DIMENSION: latency per image, and whether the
+two paths agree on the face (same encoding within tolerance).
+
+Images are upscaled by [upscale] first to mimic phone / webcam uploads.
+
+Usage: python benchmark_face_detection_prescale.py [image_folder] [max_dimension] [upscale]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from utils.face_engine import FaceModel, NoFaceDetected, match_tolerance
+from utils.lazy_imports import cv2
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def load_images(folder, upscale):
+    images = []
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            image = cv2.imread(os.path.join(root, name), cv2.IMREAD_COLOR)
+            if image is None:
+                continue
+            if upscale != 1:
+                image = cv2.resize(image, None, fx=upscale, fy=upscale, interpolation=cv2.INTER_CUBIC)
+            images.append((name, image))
+    return images
+
+
+def time_path(model, image, max_dimension):
+    start = time.perf_counter()
+    try:
+        encoding = model.encode_image(image, max_dimension)
+    except NoFaceDetected:
+        encoding = None
+    return time.perf_counter() - start, encoding
+
+
+def run_benchmark(folder=Config.FACE_FOLDER, max_dimension=Config.FACE_DETECTION_MAX_DIMENSION, upscale=3.0):
+    images = load_images(folder, upscale)
+    if not images:
+        print(f"❌ No images found in {folder}")
+        return
+
+    model = FaceModel()
+    tolerance = match_tolerance(model.backend)
+    full_times, scaled_times = [], []
+    both_found = agree = only_full = only_scaled = 0
+
+    for name, image in images:
+        full_time, full_encoding = time_path(model, image, 0)
+        scaled_time, scaled_encoding = time_path(model, image, max_dimension)
+        full_times.append(full_time)
+        scaled_times.append(scaled_time)
+
+        if full_encoding is not None and scaled_encoding is not None:
+            both_found += 1
+            if np.linalg.norm(full_encoding - scaled_encoding) <= tolerance:
+                agree += 1
+        elif full_encoding is not None:
+            only_full += 1
+        elif scaled_encoding is not None:
+            only_scaled += 1
+
+    count = len(images)
+    megapixels = np.mean([img.shape[0] * img.shape[1] for _, img in images]) / 1e6
+
+    print("=" * 70)
+    print(f"FACE DETECTION PRE-SCALING BENCHMARK ({count} images, "
+          f"~{megapixels:.1f} MP, backend={model.backend}/{model.detection_model})")
+    print("=" * 70)
+    print(f"{'Path':<22} {'Mean':>10} {'p95':>10} {'Total':>10}")
+    print("-" * 70)
+    for label, times in (('Full resolution', full_times), (f'Pre-scaled ({max_dimension}px)', scaled_times)):
+        times = np.array(times)
+        print(f"{label:<22} {times.mean() * 1000:>7.1f} ms {np.percentile(times, 95) * 1000:>7.1f} ms "
+              f"{times.sum():>8.2f} s")
+    print("-" * 70)
+    print(f"Speed-up:                 {sum(full_times) / max(sum(scaled_times), 1e-9):.1f}x")
+    print(f"Face found by both:       {both_found}/{count}")
+    print(f"Same face (within {tolerance}): {agree}/{both_found}")
+    print(f"Found only at full res:   {only_full}")
+    print(f"Found only pre-scaled:    {only_scaled}")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    folder = sys.argv[1] if len(sys.argv) > 1 else Config.FACE_FOLDER
+    max_dimension = int(sys.argv[2]) if len(sys.argv) > 2 else Config.FACE_DETECTION_MAX_DIMENSION
+    upscale = float(sys.argv[3]) if len(sys.argv) > 3 else 3.0
+    run_benchmark(folder, max_dimension, upscale)
@@ -0,0 +1,82 @@
+"""
+Face Encoding Storage Benchmark
+Compares the TEXT (JSON) face_encoding column with the float32 BLOB column:
+on-disk size per row and time to read + decode every row.
+
+Usage: python benchmark_face_encoding_storage.py [rows] [dimension]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.face_codec import decode_face_blob, encode_face_blob
+from utils.face_index import decode_text_encoding
+
+
+def build_database(path, rows, dimension):
+    """Create a table holding the same encodings in both formats"""
+    rng = np.random.default_rng(42)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE text_faces (id INTEGER PRIMARY KEY, face_encoding TEXT)")
+    conn.execute("CREATE TABLE blob_faces (id INTEGER PRIMARY KEY, face_encoding_blob BLOB)")
+
+    batch = 10000
+    for start in range(0, rows, batch):
+        vectors = rng.normal(0, 0.1, size=(min(batch, rows - start), dimension)).astype(np.float32)
+        ids = range(start + 1, start + 1 + len(vectors))
+        # json.dumps of Python floats is what the app stores today
+        conn.executemany("INSERT INTO text_faces VALUES (?, ?)",
+                         [(i, json.dumps(v.tolist())) for i, v in zip(ids, vectors)])
+        conn.executemany("INSERT INTO blob_faces VALUES (?, ?)",
+                         [(i, encode_face_blob(v)) for i, v in zip(ids, vectors)])
+    conn.commit()
+    return conn
+
+
+def time_decode(conn, sql, decode):
+    start = time.perf_counter()
+    count = 0
+    for (value,) in conn.execute(sql):
+        decode(value)
+        count += 1
+    return time.perf_counter() - start, count
+
+
+def run_benchmark(rows=100_000, dimension=128):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, 'bench.db'), rows, dimension)
+
+        text_bytes = conn.execute("SELECT SUM(LENGTH(face_encoding)) FROM text_faces").fetchone()[0]
+        blob_bytes = conn.execute("SELECT SUM(LENGTH(face_encoding_blob)) FROM blob_faces").fetchone()[0]
+
+        text_time, _ = time_decode(conn, "SELECT face_encoding FROM text_faces", decode_text_encoding)
+        blob_time, _ = time_decode(conn, "SELECT face_encoding_blob FROM blob_faces", decode_face_blob)
+        conn.close()
+
+    print("=" * 70)
+    print(f"FACE ENCODING STORAGE BENCHMARK ({rows:,} rows x {dimension} dims)")
+    print("=" * 70)
+    print(f"{'Format':<10} {'Total size':>14} {'Bytes/row':>12} {'Decode all':>12} {'us/row':>10}")
+    print("-" * 70)
+    for name, size, seconds in (('TEXT', text_bytes, text_time), ('BLOB', blob_bytes, blob_time)):
+        print(f"{name:<10} {size / 1024 / 1024:>11.1f} MB {size / rows:>12.0f} "
+              f"{seconds:>10.2f} s {seconds / rows * 1e6:>10.1f}")
+    print("-" * 70)
+    print(f"Size reduction:   {text_bytes / blob_bytes:.1f}x smaller")
+    print(f"Decode speed-up:  {text_time / blob_time:.1f}x faster")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dimension = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+    run_benchmark(rows, dimension)
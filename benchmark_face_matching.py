@@ -0,0 +1,269 @@
+"""
+Face Matching Benchmark Suite
+Measures how face lookup scales with the number of stored faces, on
+synthetic embeddings (no database, camera or GPU needed).
+
+For every size and engine it records index build time, memory held by the
+index, p50 / p99 / mean lookup latency and recall against exact search -
+both the match / no-match decision at the tolerance and the top-1 nearest
+face regardless of tolerance (the ANN engines' real test):
+
+    per_row  - decode + compare one stored encoding at a time (original path)
+    exact    - FaceIndex, one batched distance computation
+    ivf      - FaceIndex with FACE_MATCH_ENGINE='ivf'
+    ivf_pq   - as ivf, with product-quantized residuals
+
+Results are written as JSON so runs can be compared between releases.
+
+Usage: python benchmark_face_matching.py [output.json] [sizes] [baseline.json]
+    python benchmark_face_matching.py
+    python benchmark_face_matching.py results.json 1000,10000,100000
+    python benchmark_face_matching.py new.json 1000,10000 old.json
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from utils.face_index import FaceIndex
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DIMENSION = 128
+QUERIES = 200
+PER_ROW_MAX_FACES = 100_000     # The per-row path takes seconds per lookup beyond this
+VISITS_PER_PERSON = 3           # Repeat visitors: several noisy encodings per identity
+IDENTITY_SPREAD = 0.35          # Spread of identity centres
+SAME_PERSON_DISTANCE = 0.4      # Typical distance between two visits of one person
+# Two visits differ by noise of VISIT_NOISE * sqrt(2) per dimension, so their
+# distance is ~ VISIT_NOISE * sqrt(2 * DIMENSION): 0.4, inside the 0.6 tolerance
+VISIT_NOISE = SAME_PERSON_DISTANCE / np.sqrt(2 * DIMENSION)
+
+
+@contextmanager
+def override_config(**values):
+    saved = {name: getattr(Config, name) for name in values}
+    for name, value in values.items():
+        setattr(Config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(Config, name, value)
+
+
+def synthetic_embeddings(count, dimension=DIMENSION, seed=42):
+    """Clustered float32 encodings: count // VISITS_PER_PERSON people"""
+    rng = np.random.default_rng(seed)
+    people = max(count // VISITS_PER_PERSON, 1)
+    centres = rng.normal(0, IDENTITY_SPREAD, size=(people, dimension)).astype(np.float32)
+    owners = rng.integers(0, people, size=count)
+    noise = rng.normal(0, VISIT_NOISE, size=(count, dimension)).astype(np.float32)
+    return centres[owners] + noise, centres
+
+
+def synthetic_queries(centres, count=QUERIES, seed=7):
+    """New visits of known people (fresh noise around stored identities)"""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(centres), size=count)
+    noise = rng.normal(0, VISIT_NOISE, size=(count, centres.shape[1])).astype(np.float32)
+    return centres[picks] + noise
+
+
+# ----------------------------------------------------------------------
+# Engines
+# ----------------------------------------------------------------------
+
+class PerRowMatcher:
+    """The pre-index path: every stored encoding compared one by one"""
+
+    def __init__(self, embeddings):
+        # Stored as TEXT, decoded per row on every lookup
+        self.rows = [json.dumps(vector.tolist()) for vector in embeddings]
+
+    def best_match(self, encoding, tolerance):
+        best_id, best_distance = None, None
+        for record_id, value in enumerate(self.rows):
+            stored = np.array(json.loads(value), dtype=np.float32)
+            distance = float(np.linalg.norm(stored - encoding))
+            if best_distance is None or distance < best_distance:
+                best_id, best_distance = record_id, distance
+        if best_distance is None or best_distance > tolerance:
+            return None
+        return 'visitor', best_id, best_distance
+
+
+def build_face_index(embeddings, engine):
+    index = FaceIndex(engine=engine)
+    index.load(('visitor', record_id, vector) for record_id, vector in enumerate(embeddings))
+    return index
+
+
+ENGINES = {
+    'per_row': lambda embeddings: PerRowMatcher(embeddings),
+    'exact': lambda embeddings: build_face_index(embeddings, 'exact'),
+    'ivf': lambda embeddings: build_face_index(embeddings, 'ivf'),
+    'ivf_pq': lambda embeddings: build_face_index(embeddings, 'ivf'),
+}
+
+ENGINE_CONFIG = {
+    'ivf': {'FACE_ANN_MIN_FACES': 0, 'FACE_PQ_SUBQUANTIZERS': 0},
+    'ivf_pq': {'FACE_ANN_MIN_FACES': 0, 'FACE_PQ_SUBQUANTIZERS': 16},
+}
+
+
+def measure_engine(name, embeddings, queries, truth, nearest, tolerance):
+    with override_config(**ENGINE_CONFIG.get(name, {})):
+        # Memory in a separate traced build - tracing slows allocation down
+        tracemalloc.start()
+        matcher = ENGINES[name](embeddings)
+        memory_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del matcher
+
+        start = time.perf_counter()
+        matcher = ENGINES[name](embeddings)
+        build_seconds = time.perf_counter() - start
+
+        latencies = np.empty(len(queries))
+        hits = 0
+        for i, query in enumerate(queries):
+            start = time.perf_counter()
+            found = matcher.best_match(query, tolerance)
+            latencies[i] = time.perf_counter() - start
+            if found is not None and truth[i] is not None and found[1] == truth[i]:
+                hits += 1
+            elif found is None and truth[i] is None:
+                hits += 1
+
+        # Untimed: the nearest face whatever its distance
+        top1_hits = sum(
+            1 for query, expected in zip(queries, nearest)
+            if (matcher.best_match(query, float('inf')) or (None, None))[1] == expected
+        )
+
+    return {
+        'engine': name,
+        'faces': len(embeddings),
+        'queries': len(queries),
+        'build_seconds': round(build_seconds, 4),
+        'memory_mb': round(memory_bytes / 1024 / 1024, 2),
+        'peak_build_memory_mb': round(peak_bytes / 1024 / 1024, 2),
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 4),
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 4),
+        'mean_ms': round(float(latencies.mean()) * 1000, 4),
+        'recall': round(hits / len(queries), 4),
+        'top1_recall': round(top1_hits / len(queries), 4),
+        'matched_queries': sum(1 for expected in truth[:len(queries)] if expected is not None),
+    }
+
+
+# ----------------------------------------------------------------------
+# Suite
+# ----------------------------------------------------------------------
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'dimension': DIMENSION,
+        'tolerance': Config.FACE_RECOGNITION_TOLERANCE,
+        'visit_noise': float(VISIT_NOISE),
+    }
+
+
+def run_suite(sizes=DEFAULT_SIZES, engines=tuple(ENGINES)):
+    tolerance = Config.FACE_RECOGNITION_TOLERANCE
+    results = []
+
+    for size in sizes:
+        embeddings, centres = synthetic_embeddings(size)
+        queries = synthetic_queries(centres)
+
+        # Ground truth from exact search on the same data
+        reference = build_face_index(embeddings, 'exact')
+        truth, nearest = [], []
+        for query in queries:
+            found = reference.best_match(query, tolerance)
+            truth.append(found[1] if found else None)
+            nearest.append(reference.best_match(query, float('inf'))[1])
+        del reference
+        matched = sum(1 for expected in truth if expected is not None)
+        if matched < len(queries) * 0.9:
+            print(f"   ⚠️  only {matched}/{len(queries)} queries have a face within {tolerance} - "
+                  f"the tolerance recall below says little")
+
+        for name in engines:
+            if name == 'per_row' and size > PER_ROW_MAX_FACES:
+                print(f"   ... {name:<8} {size:>9,} faces: skipped (> {PER_ROW_MAX_FACES:,})")
+                continue
+            run_queries = queries[:20] if name == 'per_row' and size > 10_000 else queries
+            result = measure_engine(name, embeddings, run_queries, truth, nearest, tolerance)
+            results.append(result)
+            print(f"   ... {name:<8} {size:>9,} faces: build {result['build_seconds']:>8.3f} s, "
+                  f"p50 {result['p50_ms']:>9.3f} ms, p99 {result['p99_ms']:>9.3f} ms, "
+                  f"{result['memory_mb']:>8.1f} MB, recall {result['recall']:.3f} "
+                  f"(top-1 {result['top1_recall']:.3f})")
+
+    return {'environment': environment(), 'results': results}
+
+
+def print_comparison(report, baseline):
+    old = {(r['engine'], r['faces']): r for r in baseline['results']}
+    print("-" * 70)
+    print(f"Compared with {baseline['environment'].get('commit')} "
+          f"({baseline['environment'].get('timestamp')})")
+    print(f"{'Engine':<8} {'Faces':>9} {'p50 change':>12} {'p99 change':>12} {'Memory change':>14}")
+    for result in report['results']:
+        before = old.get((result['engine'], result['faces']))
+        if before is None:
+            continue
+
+        def change(key):
+            return f"{(result[key] / before[key] - 1) * 100:+.1f}%" if before[key] else 'n/a'
+
+        print(f"{result['engine']:<8} {result['faces']:>9,} {change('p50_ms'):>12} "
+              f"{change('p99_ms'):>12} {change('memory_mb'):>14}")
+
+
+if __name__ == '__main__':
+    output = sys.argv[1] if len(sys.argv) > 1 else 'face_matching_benchmark.json'
+    sizes = [int(s) for s in sys.argv[2].split(',')] if len(sys.argv) > 2 else DEFAULT_SIZES
+    baseline_path = sys.argv[3] if len(sys.argv) > 3 else None
+
+    print("=" * 70)
+    print(f"FACE MATCHING BENCHMARK ({DIMENSION}-d synthetic embeddings, {QUERIES} queries)")
+    print("=" * 70)
+    report = run_suite(sizes)
+
+    with open(output, 'w') as handle:
+        json.dump(report, handle, indent=2)
+
+    if baseline_path:
+        with open(baseline_path) as handle:
+            print_comparison(report, json.load(handle))
+    print("=" * 70)
+    print(f"✅ Results written to {output}")
@@ -0,0 +1,274 @@
+"""
+Report Aggregation Benchmark
+Builds a scratch 'visits' table with synthetic visits (1M by default), then:
+
+  1. checks that every query in utils/report_queries.py returns exactly what
+     the old approach - load all visits in the range into pandas and group
+     in memory - computes (exit code 1 on any difference)
+  2. runs each approach in a fresh process and reports wall time and peak
+     resident memory
+
+Usage: python benchmark_report_aggregation.py [visits] [days]
+"""
+
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.report_queries import REPORT_QUERIES, report_params
+
+CHUNK = 100_000
+STATUSES = ['pending', 'approved', 'checked-in', 'checked-out', 'checked_out', 'rejected', None]
+VISITOR_TYPES = ['vendor', 'contractor', 'interview', 'guest', 'delivery', None]
+CLOSED = ['checked-out', 'checked_out']
+
+
+# ----------------------------------------------------------------------
+# Synthetic data
+# ----------------------------------------------------------------------
+
+def seed(path, visits, days):
+    rng = np.random.default_rng(42)
+    first_day = date(2024, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE visits (source VARCHAR(20), source_id INTEGER, email VARCHAR(120), "
+        "company VARCHAR(120), visitor_type VARCHAR(50), status VARCHAR(20), visit_date DATE, "
+        "check_in_time DATETIME, check_out_time DATETIME, PRIMARY KEY (source, source_id))"
+    )
+    for offset in range(0, visits, CHUNK):
+        size = min(CHUNK, visits - offset)
+        day_offsets = rng.integers(0, days, size)
+        companies = rng.zipf(1.6, size) % 2000
+        emails = rng.integers(0, visits // 3 + 1, size)
+        statuses = rng.integers(0, len(STATUSES), size)
+        types = rng.integers(0, len(VISITOR_TYPES), size)
+        check_in_minutes = rng.integers(7 * 60, 19 * 60, size)
+        stay_seconds = rng.integers(5 * 60, 8 * 3600, size)
+        rows = []
+        for i in range(size):
+            day = first_day + timedelta(days=int(day_offsets[i]))
+            status = STATUSES[statuses[i]]
+            check_in = check_out = None
+            if status in ('checked-in', 'checked-out', 'checked_out'):
+                start = (day.toordinal() * 86400) + int(check_in_minutes[i]) * 60
+                check_in = _timestamp(start)
+                if status != 'checked-in':
+                    check_out = _timestamp(start + int(stay_seconds[i]))
+            rows.append((
+                'visitor', offset + i + 1, f"visitor{emails[i]}@example.com",
+                f"Company {companies[i]}" if companies[i] else '',
+                VISITOR_TYPES[types[i]], status, day.isoformat(), check_in, check_out,
+            ))
+        conn.executemany("INSERT INTO visits VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+    conn.execute("CREATE INDEX ix_visits_visit_date_status ON visits (visit_date, status)")
+    conn.commit()
+    conn.close()
+    return first_day, first_day + timedelta(days=days - 1)
+
+
+def _timestamp(seconds):
+    day = date.fromordinal(seconds // 86400)
+    rest = seconds % 86400
+    return f"{day.isoformat()} {rest // 3600:02d}:{rest % 3600 // 60:02d}:{rest % 60:02d}"
+
+
+# ----------------------------------------------------------------------
+# Old approach: every visit in the range into pandas, grouped in memory
+# ----------------------------------------------------------------------
+
+def _sorted(frame, by, ascending):
+    return frame.sort_values(by, ascending=ascending, kind='mergesort').reset_index(drop=True)
+
+
+def pandas_reports(conn, params):
+    df = pd.read_sql_query(
+        "SELECT * FROM visits WHERE visit_date BETWEEN :start AND :end", conn, params=params
+    )
+    limit = params['limit']
+    reports = {}
+
+    grouped = df.groupby('visit_date')
+    daily = pd.DataFrame({
+        'visits': grouped.size(),
+        'checked_out': grouped['status'].agg(lambda s: int(s.isin(CLOSED).sum())),
+    }).reset_index().rename(columns={'visit_date': 'day'})
+    daily['cumulative_visits'] = daily['visits'].cumsum()
+    reports['daily_counts'] = daily
+
+    status = df['status'].fillna('unknown')
+    counts = status.value_counts().rename_axis('status').reset_index(name='visits')
+    reports['status_breakdown'] = _sorted(counts, ['visits', 'status'], [False, True])
+
+    reports['daily_status'] = (
+        df.assign(status=status).groupby(['visit_date', 'status']).size()
+        .reset_index(name='visits').rename(columns={'visit_date': 'day'})
+    )
+
+    companies = df[df['company'].notna() & (df['company'] != '')]
+    company_counts = companies['company'].value_counts().rename_axis('company').reset_index(name='visits')
+    reports['top_companies'] = _sorted(company_counts, ['visits', 'company'], [False, True]).head(limit)
+
+    monthly = (
+        companies.assign(month=companies['visit_date'].str[:7])
+        .groupby(['month', 'company']).size().reset_index(name='visits')
+    )
+    monthly = _sorted(monthly, ['month', 'visits', 'company'], [True, False, True])
+    monthly['rank'] = monthly.groupby('month').cumcount() + 1
+    reports['monthly_top_companies'] = monthly[monthly['rank'] <= 3].reset_index(drop=True)
+
+    types = df['visitor_type'].fillna('unknown').value_counts().rename_axis('visitor_type')
+    reports['visitor_types'] = _sorted(
+        types.reset_index(name='visits'), ['visits', 'visitor_type'], [False, True]
+    )
+
+    checked_in = df[df['check_in_time'].notna()]
+    hours = pd.to_datetime(checked_in['check_in_time']).dt.hour
+    reports['hourly_checkins'] = hours.value_counts().sort_index().rename_axis('hour').reset_index(name='checkins')
+
+    completed = df[df['check_in_time'].notna() & df['check_out_time'].notna()]
+    minutes = (
+        pd.to_datetime(completed['check_out_time']) - pd.to_datetime(completed['check_in_time'])
+    ).dt.total_seconds() / 60.0
+    durations = minutes.groupby(completed['visit_date']).agg(['size', 'mean', 'max']).reset_index()
+    durations.columns = ['day', 'completed', 'avg_minutes', 'max_minutes']
+    reports['visit_durations'] = durations
+
+    emails = df[df['email'].notna() & (df['email'] != '')]
+    repeat = emails.groupby('email')['visit_date'].agg(['size', 'min', 'max']).reset_index()
+    repeat.columns = ['email', 'visits', 'first_visit', 'last_visit']
+    repeat = repeat[repeat['visits'] > 1]
+    reports['repeat_visitors'] = _sorted(repeat, ['visits', 'email'], [False, True]).head(limit)
+    return reports
+
+
+def sql_reports(conn, params):
+    return {
+        name: pd.read_sql_query(sql, conn, params=params)
+        for name, sql in REPORT_QUERIES.items()
+    }
+
+
+# ----------------------------------------------------------------------
+# Regression check and memory runs
+# ----------------------------------------------------------------------
+
+def compare(sql_results, pandas_results):
+    """Names of the reports whose outputs differ"""
+    failed = []
+    for name, expected in pandas_results.items():
+        actual = sql_results[name]
+        try:
+            pd.testing.assert_frame_equal(
+                actual.reset_index(drop=True), expected.reset_index(drop=True),
+                check_dtype=False, check_exact=False, rtol=1e-6,
+            )
+        except AssertionError as e:
+            print(f"   ❌ {name}: {str(e).splitlines()[0]}")
+            failed.append(name)
+        else:
+            print(f"   ✅ {name:<24} {len(actual):>6} row(s) identical")
+    return failed
+
+
+def _memory_kb(field):
+    """VmRSS / VmHWM from /proc (Linux), ru_maxrss elsewhere"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _reset_peak():
+    # Writing 5 to clear_refs resets VmHWM, so importing pandas does not count
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def run_worker(mode, path, params):
+    """Child process: run one approach, print seconds and peak RSS as JSON"""
+    conn = sqlite3.connect(path)
+    baseline = _memory_kb('VmRSS')
+    _reset_peak()
+    start = time.perf_counter()
+    results = pandas_reports(conn, params) if mode == 'pandas' else sql_reports(conn, params)
+    seconds = time.perf_counter() - start
+    peak = _memory_kb('VmHWM')
+    conn.close()
+    print(json.dumps({
+        'seconds': seconds,
+        'peak_rss_mb': peak / 1024.0,
+        'extra_rss_mb': max(peak - baseline, 0) / 1024.0,
+        'rows_returned': sum(len(frame) for frame in results.values()),
+    }))
+
+
+def measure(mode, path, params):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), f"--worker={mode}", path, json.dumps(params)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_benchmark(visits=1_000_000, days=730):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'reports.db')
+        print(f"🧪 Generating {visits:,} synthetic visits over {days} days...")
+        start_day, end_day = seed(path, visits, days)
+        params = report_params(start_day, end_day, limit=10)
+
+        print("🔍 Comparing SQL aggregation with in-memory pandas grouping...")
+        conn = sqlite3.connect(path)
+        failed = compare(sql_reports(conn, params), pandas_reports(conn, params))
+        conn.close()
+
+        results = {mode: measure(mode, path, params) for mode in ('pandas', 'sql')}
+
+    print()
+    print("=" * 70)
+    print(f"REPORT AGGREGATION BENCHMARK ({visits:,} visits, {len(REPORT_QUERIES)} reports)")
+    print("=" * 70)
+    print(f"{'Approach':<22} {'Time':>9} {'Peak RSS':>11} {'Extra RSS':>11} {'Rows':>10}")
+    print("-" * 70)
+    for label, mode in (('pandas in memory', 'pandas'), ('SQL GROUP BY', 'sql')):
+        r = results[mode]
+        print(f"{label:<22} {r['seconds']:>7.2f} s {r['peak_rss_mb']:>8.0f} MB "
+              f"{r['extra_rss_mb']:>8.0f} MB {r['rows_returned']:>10}")
+    print("=" * 70)
+    if failed:
+        print(f"❌ {len(failed)} report(s) differ: {', '.join(failed)}")
+    else:
+        print("✅ All reports identical")
+    return not failed
+
+
+if __name__ == '__main__':
+    worker = [arg for arg in sys.argv[1:] if arg.startswith('--worker=')]
+    if worker:
+        run_worker(worker[0].split('=', 1)[1], sys.argv[2], json.loads(sys.argv[3]))
+        sys.exit(0)
+
+    visits = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 730
+    sys.exit(0 if run_benchmark(visits, days) else 1)
@@ -0,0 +1,176 @@
+"""
+Streaming Export Benchmark
+Peak memory of utils/visit_export.py exports (CSV, gzipped CSV, XLSX) on a
+scratch 'visits' table at two sizes, next to the old approach of loading
+every row into a DataFrame and building the file in memory. Each run is a
+fresh process, so the numbers are not mixed up.
+
+Also checks that an export cut into parts with limit= / the next cursor
+gives exactly the bytes of the single-part export (exit code 1 if not).
+
+Usage: python benchmark_visit_export.py [visits] [--no-xlsx]
+"""
+
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.visit_export import DEFAULT_EXPORT_COLUMNS, VisitExport
+from utils.visits import VISIT_COLUMNS, VISIT_INDEXES, VISITS_TABLE, create_table_sql
+
+CHUNK = 50_000
+STATUSES = ['pending', 'approved', 'checked-in', 'checked-out', 'rejected']
+
+
+def seed(path, visits):
+    rng = random.Random(11)
+    first_day = date(2025, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.execute(create_table_sql())
+    for name, columns in VISIT_INDEXES:
+        conn.execute(f"CREATE INDEX {name} ON {VISITS_TABLE} ({', '.join(columns)})")
+    names = ['source', 'source_id'] + [column for column, _, _, _ in VISIT_COLUMNS]
+    insert = f"INSERT INTO {VISITS_TABLE} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})"
+    for offset in range(0, visits, CHUNK):
+        rows = []
+        for i in range(offset, min(offset + CHUNK, visits)):
+            day = (first_day + timedelta(days=rng.randrange(365))).isoformat()
+            values = {
+                'source': 'visitor' if i % 4 else 'host_visitor', 'source_id': i + 1,
+                'full_name': f"Visitor {i}", 'email': f"visitor{i}@example.com",
+                'phone': f"98{i:08d}", 'company': f"Company {rng.randrange(500)}",
+                'visitor_type': 'guest', 'purpose': 'Meeting with the project team',
+                'host_name': f"Host {rng.randrange(80)}", 'host_department': 'Engineering',
+                'visit_date': day, 'visit_time': '10:30', 'status': rng.choice(STATUSES),
+                'pass_id': f"VP{i:08d}", 'check_in_time': f"{day} 10:32:00",
+                'check_out_time': f"{day} 12:05:00", 'created_at': f"{day} 09:00:00",
+            }
+            rows.append(tuple(values.get(name) for name in names))
+        conn.executemany(insert, rows)
+        conn.commit()
+    conn.close()
+
+
+def _memory_kb(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def run_worker(mode, path, rows):
+    """Child process: one export into a byte counter, print memory as JSON"""
+    conn = sqlite3.connect(path)
+
+    def read(sql, params):
+        return conn.execute(sql, params).fetchall()
+
+    if mode == 'pandas':
+        import pandas as pd
+    elif mode == 'xlsx':
+        # Import cost stays out of the measurement, as for pandas
+        from utils.lazy_imports import openpyxl
+        openpyxl._load()
+
+    baseline = _memory_kb('VmRSS')
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    start = time.perf_counter()
+    size = 0
+    if mode == 'pandas':
+        frame = pd.read_sql_query(
+            f"SELECT {', '.join(DEFAULT_EXPORT_COLUMNS)} FROM {VISITS_TABLE} LIMIT ?", conn, params=(rows,)
+        )
+        size = len(frame.to_csv(index=False).encode('utf-8'))
+    else:
+        fmt, compress = ('xlsx', False) if mode == 'xlsx' else ('csv', mode == 'csv.gz')
+        for chunk in VisitExport(limit=rows, read=read).chunks(fmt, compress):
+            size += len(chunk)
+    seconds = time.perf_counter() - start
+    print(json.dumps({
+        'seconds': seconds,
+        'extra_rss_mb': max(_memory_kb('VmHWM') - baseline, 0) / 1024.0,
+        'bytes': size,
+    }))
+
+
+def measure(mode, path, rows):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), f"--worker={mode}", path, str(rows)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check_resumption(path, part_rows):
+    """Parts joined by X-Export-Next-Cursor == one single export"""
+    conn = sqlite3.connect(path)
+
+    def read(sql, params):
+        return conn.execute(sql, params).fetchall()
+
+    options = {'start': '2025-03-01', 'end': '2025-08-31', 'status': 'checked-out'}
+    whole = b''.join(VisitExport(read=read, **options).csv_chunks())
+    parts = []
+    cursor = None
+    while True:
+        export = VisitExport(cursor=cursor, limit=part_rows, read=read, **options)
+        cursor = export.next_cursor()
+        parts.append(b''.join(export.csv_chunks()))
+        if cursor is None:
+            break
+    conn.close()
+    return b''.join(parts) == whole, len(parts)
+
+
+def run_benchmark(visits=500_000, xlsx=True):
+    sizes = [visits // 5, visits]
+    modes = ['pandas', 'csv', 'csv.gz'] + (['xlsx'] if xlsx else [])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'export.db')
+        print(f"🧪 Generating {visits:,} synthetic visits...")
+        seed(path, visits)
+
+        identical, parts = check_resumption(path, max(visits // 20, 1000))
+        results = {(mode, rows): measure(mode, path, rows) for mode in modes for rows in sizes}
+
+    print()
+    print("=" * 70)
+    print(f"STREAMING EXPORT BENCHMARK ({len(DEFAULT_EXPORT_COLUMNS)} columns)")
+    print("=" * 70)
+    print(f"{'Export':<20} {'Rows':>9} {'Time':>9} {'Extra RSS':>11} {'Size':>11}")
+    print("-" * 70)
+    labels = {'pandas': 'DataFrame in memory', 'csv': 'streamed CSV', 'csv.gz': 'streamed CSV gzip',
+              'xlsx': 'write-only XLSX'}
+    for mode in modes:
+        for rows in sizes:
+            r = results[(mode, rows)]
+            print(f"{labels[mode]:<20} {rows:>9,} {r['seconds']:>7.2f} s {r['extra_rss_mb']:>8.1f} MB "
+                  f"{r['bytes'] / 1048576:>8.1f} MB")
+    print("=" * 70)
+    if identical:
+        print(f"✅ Export resumed over {parts} parts matches the single export byte for byte")
+    else:
+        print(f"❌ Export resumed over {parts} parts differs from the single export")
+    return identical
+
+
+if __name__ == '__main__':
+    worker = [arg for arg in sys.argv[1:] if arg.startswith('--worker=')]
+    if worker:
+        run_worker(worker[0].split('=', 1)[1], sys.argv[2], int(sys.argv[3]))
+        sys.exit(0)
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    visits = int(args[0]) if args else 500_000
+    sys.exit(0 if run_benchmark(visits, xlsx='--no-xlsx' not in sys.argv) else 1)
@@ -7,6 +7,7 @@ from flask import Flask
 from models.database import db, User, Host
 from werkzeug.security import generate_password_hash
 from datetime import datetime
+from utils.pagination import stream_query
 
 # Create minimal Flask app
 app = Flask(__name__)
@@ -32,14 +33,14 @@ with app.app_context():
     print("📊 PART 1: CHECKING ADMIN USERS (users table)")
     print("=" * 80)
     
-    all_users = User.query.all()
+    user_count = User.query.count()
     
-    if not all_users:
+    if not user_count:
         print("\n⚠️  NO USERS FOUND IN DATABASE!")
     else:
-        print(f"\n✅ Found {len(all_users)} user(s) in database:\n")
+        print(f"\n✅ Found {user_count} user(s) in database:\n")
         
-        for user in all_users:
+        for user in stream_query(User.query.order_by(User.id)):
             print(f"  Username: {user.username}")
             print(f"  Email: {user.email}")
             print(f"  Role: {user.role}")
@@ -122,15 +123,15 @@ with app.app_context():
     print("👤 PART 3: CHECKING HOST USERS (hosts table)")
     print("=" * 80)
     
-    all_hosts = Host.query.all()
+    host_count = Host.query.count()
     
-    if not all_hosts:
+    if not host_count:
         print("\n⚠️  NO HOSTS FOUND IN DATABASE!")
         print("   Hosts must register through: http://localhost:5000/host/register")
     else:
-        print(f"\n✅ Found {len(all_hosts)} host(s) in database:\n")
+        print(f"\n✅ Found {host_count} host(s) in database:\n")
         
-        for host in all_hosts:
+        for host in stream_query(Host.query.order_by(Host.id)):
             print(f"  Username: {host.username}")
             print(f"  Email: {host.email}")
             print(f"  Full Name: {host.full_name}")
@@ -215,8 +216,7 @@ with app.app_context():
         fixes_applied.append(f"✅ Auto-approved first host: {first_host.username}")
     
     # Fix 4: Fix NULL passwords for all hosts
-    hosts_with_null_password = Host.query.all()
-    for host in hosts_with_null_password:
+    for host in stream_query(Host.query.order_by(Host.id)):
         if not check_password_hash_valid(host):
             # This shouldn't happen, but fix it if it does
             print(f"\n⚠️  Host '{host.username}' has NULL password - needs re-registration")
@@ -254,10 +254,10 @@ with app.app_context():
             print(f"   Password: security123")
     
     # Check hosts
-    approved_hosts = Host.query.filter_by(is_approved=True, is_active=True).all()
-    if approved_hosts:
+    approved_hosts = Host.query.filter_by(is_approved=True, is_active=True)
+    if approved_hosts.first() is not None:
         print("\n✅ HOST LOGIN READY:")
-        for host in approved_hosts:
+        for host in stream_query(approved_hosts.order_by(Host.id)):
             if check_password_hash_valid(host):
                 print(f"   URL: http://localhost:5000/host/login")
                 print(f"   Username: {host.username}")
@@ -269,10 +269,10 @@ with app.app_context():
         print(f"   Then admin must approve from admin panel")
     
     # Pending hosts
-    pending_hosts = Host.query.filter_by(is_approved=False).all()
-    if pending_hosts:
+    pending_hosts = Host.query.filter_by(is_approved=False)
+    if pending_hosts.first() is not None:
         print("\n⚠️  PENDING HOST APPROVALS:")
-        for host in pending_hosts:
+        for host in stream_query(pending_hosts.order_by(Host.id)):
             print(f"   - {host.username} ({host.email}) - needs admin approval")
     
     print("\n" + "=" * 80)
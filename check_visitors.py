@@ -64,10 +64,12 @@ else:
     # Count by status
     print("\nBy Status:")
     print("-" * 70)
+    # Live rows only, like the total above (the daily rollup keeps counting
+    # archived visits)
+    cursor.execute("SELECT status, COUNT(*) FROM visitors GROUP BY status")
+    counts = dict(cursor.fetchall())
     for status in ['pending', 'approved', 'checked-in', 'checked-out', 'rejected']:
-        cursor.execute("SELECT COUNT(*) FROM visitors WHERE status = ?", (status,))
-        count = cursor.fetchone()[0]
-        print(f"  - {status}: {count}")
+        print(f"  - {status}: {counts.get(status, 0)}")
     
     # Show date range of all visitors
     print("\nDate Range of All Visitors:")
@@ -0,0 +1,96 @@
+"""
+Report Job Cleanup
+Deletes expired report files from Config.REPORT_JOB_FOLDER, marks jobs of
+workers that stopped as failed and removes old job rows (see
+utils/report_jobs.py). Submissions already clean up every
+REPORT_JOB_CLEANUP_INTERVAL seconds; schedule this hourly for quiet periods.
+
+Usage: python cleanup_report_jobs.py [db_path] [--keep-days=N] [--list]
+    --keep-days=N   keep failed / expired job rows for N days (default 7)
+    --list          only list the most recent jobs
+"""
+
+import sqlite3
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from utils.report_jobs import ReportJobs, ensure_report_jobs_table
+from utils.sqlite_tuning import apply_sqlite_pragmas
+
+
+def _connect(db_path):
+    def connect():
+        conn = sqlite3.connect(db_path)
+        apply_sqlite_pragmas(conn)
+        return conn
+    return connect
+
+
+def list_jobs(jobs):
+    recent = jobs.recent(limit=20)
+    if not recent:
+        print("   (no report jobs)")
+    for job in recent:
+        size = f"{job['size'] / 1024:.1f} KiB" if job['size'] else ''
+        print(f"   📄 {job['created_at'][:19]}  {job['kind']:<12} {job['status']:<8} "
+              f"{job['progress'] * 100:>5.1f}%  {size}")
+
+
+def cleanup_report_jobs(db_path='visitor_management.db', keep_days=7, list_only=False):
+    """Run the cleanup; returns True on success"""
+
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found: {db_path}")
+        print("Please run this script from the project root directory")
+        return False
+
+    print(f"📁 Report folder: {Config.REPORT_JOB_FOLDER}")
+    print()
+
+    try:
+        conn = sqlite3.connect(db_path)
+        ensure_report_jobs_table(conn)
+        conn.close()
+        jobs = ReportJobs(_connect(db_path), cleanup_interval=0)
+        if not list_only:
+            counts = jobs.cleanup(keep_days=keep_days)
+            print(f"   ✅ {counts['expired']} expired report(s) deleted")
+            print(f"   ✅ {counts['stale']} job(s) of stopped workers marked failed")
+            print(f"   ✅ {counts['deleted_jobs']} old job row(s) removed")
+            print(f"   ✅ {counts['orphan_files']} orphaned file(s) removed")
+            print()
+        list_jobs(jobs)
+    except sqlite3.Error as e:
+        print(f"❌ Database error: {e}")
+        return False
+    return True
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("🧹 REPORT JOB CLEANUP")
+    print("=" * 70)
+    print()
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    db_path = args[0] if args else 'visitor_management.db'
+    keep_days = 7
+    for arg in sys.argv[1:]:
+        if arg.startswith('--keep-days='):
+            keep_days = int(arg.split('=', 1)[1])
+
+    success = cleanup_report_jobs(db_path, keep_days, list_only='--list' in sys.argv)
+
+    print()
+    print("=" * 70)
+    if success:
+        print("✅ CLEANUP COMPLETE")
+    else:
+        print("❌ CLEANUP FAILED")
+        print("Please check the errors above")
+    print("=" * 70)
+    sys.exit(0 if success else 1)
@@ -14,14 +14,83 @@ class Config:
     # Database Settings
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(BASE_DIR, 'visitor_management.db')}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # SQLite Connection Tuning (applied to every connection, see utils/sqlite_tuning.py)
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 15000))
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024   # Bytes of the file memory-mapped for reads
+    SQLITE_CACHE_SIZE = -64000             # Negative = KiB of page cache per connection
+    SQLITE_TEMP_STORE = 'MEMORY'
+
+    # Write-Behind Audit Log (VisitLog / HostActivityLog, see utils/audit_log.py)
+    AUDIT_LOG_MODE = os.getenv('AUDIT_LOG_MODE', 'async')  # 'async' (buffered) or 'sync' (write immediately)
+    AUDIT_LOG_FLUSH_MS = 200       # Longest a queued entry waits before it is written
+    AUDIT_LOG_BATCH_SIZE = 100     # Queued entries that trigger an early flush
+    AUDIT_LOG_MAX_QUEUE = 5000     # Entries held in memory before callers flush themselves
+
+    # Read-Only Analytics Engine (analytics pages and report exports, see utils/analytics_db.py)
+    ANALYTICS_POOL_SIZE = 2        # Reports that can run at the same time
+    ANALYTICS_MAX_OVERFLOW = 0     # Extra connections beyond the pool under load
+    ANALYTICS_POOL_TIMEOUT = 10    # Seconds a report waits for a free connection
+    ANALYTICS_STATEMENT_TIMEOUT = int(os.getenv('ANALYTICS_STATEMENT_TIMEOUT', 30))  # Seconds before a query is aborted (0 = no limit)
+
+    # Chart Cache (rendered analytics PNGs, see utils/chart_cache.py)
+    CHART_CACHE_FOLDER = os.getenv('CHART_CACHE_FOLDER', os.path.join(BASE_DIR, 'cache', 'charts'))
+    CHART_CACHE_MEMORY_ITEMS = 128 # Charts kept in memory per worker (0 = disk tier only)
+    CHART_CACHE_DISK_ITEMS = 2000  # PNG files kept in CHART_CACHE_FOLDER (0 = memory tier only)
+    CHART_CACHE_DPI = 100
+
+    # Streaming Visit Export (CSV / XLSX downloads, see utils/visit_export.py)
+    EXPORT_BATCH_SIZE = 2000       # Rows read per query and written per response chunk
+
+    # Background Report Jobs (PDF / Excel / CSV, see utils/report_jobs.py)
+    REPORT_JOB_FOLDER = os.getenv('REPORT_JOB_FOLDER', os.path.join(BASE_DIR, 'reports'))
+    REPORT_JOB_WORKERS = int(os.getenv('REPORT_JOB_WORKERS', 2))  # Reports built at the same time per process
+    REPORT_JOB_MAX_PENDING = 20    # Queued + running jobs before new ones are refused
+    REPORT_JOB_RESULT_TTL = 3600   # Seconds a finished report is served again for the same request
+    REPORT_JOB_STALE_AFTER = 300   # Seconds without a heartbeat before a job counts as dead
+    REPORT_JOB_CLEANUP_INTERVAL = 300  # Seconds between cleanups triggered by submissions (0 = only the script)
     
     # Upload Folders
     FACE_FOLDER = os.path.join(BASE_DIR, 'static', 'faces')
+    FACE_STORE_RELEASE_GRACE = 300 # Seconds a newly stored face photo is kept even without a committed reference
     EPASS_FOLDER = os.path.join(BASE_DIR, 'static', 'epasses')
     
+    # Monthly Archives (see utils/archive.py)
+    ARCHIVE_FOLDER = os.getenv('ARCHIVE_FOLDER', os.path.join(BASE_DIR, 'archive'))
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 180))  # Closed visits older than this are archived
+    ARCHIVE_BATCH_SIZE = 500       # Visits moved per transaction
+    ARCHIVE_CLOSED_STATUSES = ('checked-out', 'checked_out', 'rejected', 'cancelled', 'expired')
+    
     # Face Recognition Settings
-    FACE_RECOGNITION_TOLERANCE = 0.6
+    FACE_RECOGNITION_TOLERANCE = 0.6  # Match distance for the default 'histogram' encodings
+    FACE_LBP_TOLERANCE = 0.35      # Match distance for 'opencv' (LBP) encodings - tune after re-enrolment
+    FACE_DEEPFACE_TOLERANCE = float(os.getenv('FACE_DEEPFACE_TOLERANCE', 10))  # deepface's Euclidean threshold for Facenet
     FACE_DETECTION_MODEL = 'hog'  # 'hog' or 'cnn'
+    FACE_DETECTION_MAX_DIMENSION = 800  # Longest side detection runs on (0 = full resolution)
+    FACE_ENCODER_BACKEND = os.getenv('FACE_ENCODER_BACKEND', 'histogram')  # 'histogram', 'opencv' (LBP) or 'deepface'
+    DEEPFACE_MODEL_NAME = os.getenv('DEEPFACE_MODEL_NAME', 'Facenet')
+
+    # Face Processing Pool
+    FACE_POOL_WORKERS = int(os.getenv('FACE_POOL_WORKERS', 2))  # 0 = encode in the request thread
+    FACE_POOL_MAX_PENDING = 8      # Jobs queued or running before new ones are refused
+    FACE_POOL_TIMEOUT = 15         # Seconds a request waits for one encoding
+    FACE_POOL_SYNC_FALLBACK = True # Encode in-process when the pool is disabled, full or broken
+
+    # Face Matching Engine
+    FACE_MATCH_ENGINE = os.getenv('FACE_MATCH_ENGINE', 'exact')  # 'exact' or 'ivf'
+    FACE_ANN_MIN_FACES = 20000     # Below this many faces exact search is always used
+    FACE_IVF_NLIST = 0             # Number of clusters (0 = 4 * sqrt(faces))
+    FACE_IVF_NPROBE = 16           # Clusters scanned per lookup (higher = better recall, slower)
+    FACE_PQ_SUBQUANTIZERS = 0      # Product quantization sub-vectors (0 = off, must divide dimension)
+    FACE_ANN_RERANK_TOP_K = 50     # Candidates re-ranked with exact distances
+    
+    # Kiosk Streaming Recognition
+    KIOSK_DETECT_EVERY_N_FRAMES = 5   # Full detection cadence; frames in between are tracked
+    KIOSK_MAX_MISSED_DETECTIONS = 2   # Detection rounds a track may go unseen before it is dropped
+    KIOSK_QUALITY_GAIN = 0.25         # Re-encode a track when its quality improves by this fraction
+    KIOSK_EVENT_COOLDOWN = 30         # Seconds before the same person can produce another event
     
     # Email Settings
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
@@ -35,4 +104,8 @@ class Config:
     # Security Settings
     SESSION_COOKIE_SECURE = True  # Set to True in production with HTTPS
     SESSION_COOKIE_HTTPONLY = False
-    SESSION_COOKIE_SAMESITE = 'Lax'
\ No newline at end of file
+    SESSION_COOKIE_SAMESITE = 'Lax'
+    
+    # Login User Cache (Flask-Login user_loader)
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 60))  # Seconds a cached login is trusted (0 = off)
+    USER_CACHE_MAX_SIZE = 1024     # Logged-in users / hosts kept in memory
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Database Migration Script for the Unified Visits Read Model
+Creates the 'visits' table (visitors + host_visitors keyed by source and id),
+its indexes and the triggers that keep it in sync, then backfills it.
+
+Safe to run multiple times. --rebuild drops and recreates the triggers and
+recopies every row (use after changing VISIT_COLUMNS in utils/visits.py).
+
+Usage: python create_visits_read_model.py [db_path] [--rebuild]
+"""
+
+import sqlite3
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.visits import VISITS_TABLE, count_mismatches, drop_visits_triggers, ensure_visits_table
+
+
+def create_visits_read_model(db_path='visitor_management.db', rebuild=False):
+    """Create / rebuild the visits table and verify it matches both sources"""
+
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found: {db_path}")
+        print("Please run this script from the project root directory")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+
+        if rebuild:
+            print("🔧 Dropping visits triggers and table...")
+            drop_visits_triggers(conn)
+            conn.execute(f"DROP TABLE IF EXISTS {VISITS_TABLE}")
+            conn.commit()
+
+        print("🔧 Creating visits table, indexes and triggers...")
+        copied = ensure_visits_table(conn)
+        if copied:
+            print(f"   ✅ {copied} visit(s) copied")
+        else:
+            print("   ℹ️  visits table already up to date")
+
+        mismatches = count_mismatches(conn)
+        conn.close()
+
+        if mismatches:
+            print(f"❌ {mismatches} row(s) differ between visits and the source tables")
+            print("Run again with --rebuild")
+            return False
+
+        print("✅ Migration completed successfully!")
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Database error: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("🗄️  VISITS READ MODEL MIGRATION")
+    print("=" * 70)
+    print()
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    db_path = args[0] if args else 'visitor_management.db'
+    success = create_visits_read_model(db_path, rebuild='--rebuild' in sys.argv)
+
+    print()
+    print("=" * 70)
+    if success:
+        print("✅ MIGRATION SUCCESSFUL")
+        print("You can now restart your Flask application")
+    else:
+        print("❌ MIGRATION FAILED")
+        print("Please check the errors above")
+    print("=" * 70)
@@ -0,0 +1,80 @@
+"""
+Import Time Report
+Runs `python -X importtime` on an import statement in a fresh interpreter and
+summarises where the start-up time goes, grouped by top-level package.
+
+Usage: python import_time_report.py [statement] [top]
+    python import_time_report.py
+    python import_time_report.py "from app import create_app; create_app()" 30
+"""
+
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+DEFAULT_STATEMENT = "from app import create_app"
+
+# "import time:      self [us] |  cumulative | imported package"
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+HEAVY_PACKAGES = ('cv2', 'deepface', 'tensorflow', 'keras', 'pandas', 'matplotlib', 'reportlab')
+
+
+def measure(statement=DEFAULT_STATEMENT):
+    """Return [(module, self_us, cumulative_us, depth)] for one statement"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        print("⚠️  Statement failed:")
+        print("\n".join(errors[-5:]))
+    return rows
+
+
+def run_report(statement=DEFAULT_STATEMENT, top=20):
+    rows = measure(statement)
+    if not rows:
+        print("❌ No import timings collected")
+        return
+
+    by_package = defaultdict(int)
+    for module, self_us, _, _ in rows:
+        by_package[module.split('.')[0]] += self_us
+    total_us = sum(by_package.values())
+
+    print("=" * 70)
+    print(f"IMPORT TIME REPORT: {statement}")
+    print("=" * 70)
+    print(f"{'Package':<40} {'Self time':>12} {'Share':>8}")
+    print("-" * 70)
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        flag = '  ⚠️' if package in HEAVY_PACKAGES else ''
+        print(f"{package:<40} {self_us / 1000:>9.1f} ms {self_us / total_us:>7.1%}{flag}")
+    print("-" * 70)
+    print(f"{'Total':<40} {total_us / 1000:>9.1f} ms")
+
+    heavy = sorted(p for p in by_package if p in HEAVY_PACKAGES)
+    if heavy:
+        print(f"Heavy packages imported eagerly: {', '.join(heavy)}")
+        print("Use the shims in utils/lazy_imports.py to defer them to first use")
+    else:
+        print("✅ No heavy ML / imaging packages imported at start-up")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    statement = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_STATEMENT
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    run_report(statement, top)
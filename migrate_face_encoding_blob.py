@@ -0,0 +1,125 @@
+"""
+Database Migration Script for Binary Face Encodings
+Adds a face_encoding_blob column (float32 BLOB) to visitors and host_visitors
+and converts the existing TEXT encodings in chunks.
+
+Safe to run multiple times - only rows without a blob are converted.
+"""
+
+import sqlite3
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.face_codec import BLOB_COLUMN, encode_face_blob
+from utils.face_index import decode_text_encoding
+
+TABLES = ['visitors', 'host_visitors']
+CHUNK_SIZE = 500
+
+
+def convert_table(conn, table, chunk_size=CHUNK_SIZE):
+    """Convert one table's TEXT encodings to blobs, committing every chunk"""
+    cursor = conn.cursor()
+
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = [row[1] for row in cursor.fetchall()]
+
+    if 'face_encoding' not in columns:
+        print(f"   ℹ️  {table} has no face_encoding column - skipped")
+        return 0
+
+    if BLOB_COLUMN not in columns:
+        print(f"➕ Adding {BLOB_COLUMN} column to {table}...")
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {BLOB_COLUMN} BLOB")
+        conn.commit()
+        print(f"   ✅ {BLOB_COLUMN} added")
+    else:
+        print(f"   ℹ️  {table}.{BLOB_COLUMN} already exists")
+
+    converted = 0
+    skipped = 0
+    last_id = 0
+
+    while True:
+        # Keyset walk by id so each chunk is a short indexed range scan
+        cursor.execute(
+            f"SELECT id, face_encoding FROM {table} "
+            f"WHERE id > ? AND {BLOB_COLUMN} IS NULL "
+            f"AND face_encoding IS NOT NULL AND face_encoding != '' "
+            f"ORDER BY id LIMIT ?",
+            (last_id, chunk_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for record_id, value in rows:
+            try:
+                encoding = decode_text_encoding(value)
+            except ValueError:
+                skipped += 1
+                continue
+            if encoding is not None:
+                updates.append((encode_face_blob(encoding), record_id))
+
+        cursor.executemany(f"UPDATE {table} SET {BLOB_COLUMN} = ? WHERE id = ?", updates)
+        conn.commit()
+
+        converted += len(updates)
+        last_id = rows[-1][0]
+        print(f"   ... {table}: {converted} row(s) converted (up to id {last_id})")
+
+    print(f"   ✅ {table}: {converted} converted, {skipped} unreadable encoding(s) skipped")
+    return converted
+
+
+def migrate_face_encoding_blob(db_path='visitor_management.db', chunk_size=CHUNK_SIZE):
+    """Add and backfill face_encoding_blob on every table that stores faces"""
+
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found: {db_path}")
+        print("Please run this script from the project root directory")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+
+        for table in TABLES:
+            print(f"🔧 Checking {table} table...")
+            convert_table(conn, table, chunk_size)
+            print()
+
+        conn.close()
+        print("✅ Migration completed successfully!")
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Database error: {e}")
+        return False
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("🗄️  FACE ENCODING BLOB MIGRATION")
+    print("=" * 70)
+    print()
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'visitor_management.db'
+    success = migrate_face_encoding_blob(db_path)
+
+    print()
+    print("=" * 70)
+    if success:
+        print("✅ MIGRATION SUCCESSFUL")
+        print("You can now restart your Flask application")
+    else:
+        print("❌ MIGRATION FAILED")
+        print("Please check the errors above")
+    print("=" * 70)
@@ -0,0 +1,179 @@
+"""
+Database Migration Script for the Content-Addressed Face Store
+Copies flat face photos (FACE_FOLDER/<name>.jpg, including rows that hold
+an absolute Windows path) into the sharded content-addressed layout
+(FACE_FOLDER/ab/cd/<sha256>.jpg), rewrites face_image_path on visitors and
+host_visitors to the relative store path ('ab/cd/<sha256>.jpg'), and creates
+the face_embedding_cache table and a face_image_path index per table.
+
+A row is only rewritten once its new file resolves and hashes to the
+expected content. Identical photos collapse into one file. The original
+files are kept unless --delete-originals is given. Safe to run multiple
+times - rows already holding the relative store path are skipped, hashed
+paths with a folder prefix are normalised.
+
+Usage: python migrate_face_store.py [db_path] [face_folder] [--delete-originals]
+"""
+
+import sqlite3
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.face_store import (
+    FACE_IMAGE_TABLES, content_hash, default_face_folder, ensure_cache_table, hash_from_path,
+    resolve_face_image, sharded_path, store_face_image
+)
+
+CHUNK_SIZE = 500
+
+
+def _stored_copy(source, face_folder):
+    """
+    Relative store path for a legacy file, or None when the copy does not
+    resolve to a file with the same content
+    """
+    with open(source, 'rb') as handle:
+        image_bytes = handle.read()
+    relative, digest = store_face_image(image_bytes, face_folder)
+    stored = resolve_face_image(relative, face_folder)
+    if stored is None:
+        return None
+    with open(stored, 'rb') as handle:
+        if content_hash(handle.read()) != digest:
+            return None
+    return relative
+
+
+def migrate_table(conn, table, face_folder, moved_files, chunk_size=CHUNK_SIZE):
+    """Rewrite one table's face_image_path values, committing every chunk"""
+    cursor = conn.cursor()
+
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = [row[1] for row in cursor.fetchall()]
+    if 'face_image_path' not in columns:
+        print(f"   ℹ️  {table} has no face_image_path column - skipped")
+        return 0
+
+    # Reference counts look rows up by path
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_face_image_path ON {table} (face_image_path)"
+    )
+    conn.commit()
+
+    migrated = 0
+    missing = 0
+    unverified = 0
+    last_id = 0
+
+    while True:
+        cursor.execute(
+            f"SELECT id, face_image_path FROM {table} "
+            f"WHERE id > ? AND face_image_path IS NOT NULL AND face_image_path != '' "
+            f"ORDER BY id LIMIT ?",
+            (last_id, chunk_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for record_id, value in rows:
+            digest = hash_from_path(value)
+            if digest is not None:
+                # Written by an earlier run with a folder prefix in front
+                relative = sharded_path(digest, os.path.splitext(value)[1])
+                if value != relative and resolve_face_image(relative, face_folder):
+                    updates.append((relative, record_id))
+                continue
+            source = resolve_face_image(value, face_folder)
+            if source is None:
+                missing += 1
+                continue
+            relative = _stored_copy(source, face_folder)
+            if relative is None:
+                unverified += 1
+                continue
+            updates.append((relative, record_id))
+            moved_files.add(source)
+
+        cursor.executemany(f"UPDATE {table} SET face_image_path = ? WHERE id = ?", updates)
+        conn.commit()
+
+        migrated += len(updates)
+        last_id = rows[-1][0]
+        print(f"   ... {table}: {migrated} row(s) moved (up to id {last_id})")
+
+    print(f"   ✅ {table}: {migrated} moved, {missing} missing file(s) left as they were")
+    if unverified:
+        print(f"   ⚠️  {table}: {unverified} row(s) left as they were - their copy did not verify")
+    return migrated
+
+
+def migrate_face_store(db_path='visitor_management.db', face_folder=None, delete_originals=False):
+    """Copy every legacy face photo into the content-addressed store"""
+
+    # The folder the runtime store reads (Config.FACE_FOLDER outside the app)
+    face_folder = face_folder or default_face_folder()
+
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found: {db_path}")
+        print("Please run this script from the project root directory")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+
+        print("🔧 Creating face_embedding_cache table...")
+        ensure_cache_table(conn)
+        print()
+
+        moved_files = set()
+        for table in FACE_IMAGE_TABLES:
+            print(f"🔧 Checking {table} table...")
+            migrate_table(conn, table, face_folder, moved_files)
+            print()
+
+        conn.close()
+
+        # Only now that every row points at a verified copy
+        if delete_originals:
+            for path in moved_files:
+                os.remove(path)
+            print(f"🗑️  Removed {len(moved_files)} flat file(s)")
+        elif moved_files:
+            print(f"ℹ️  Kept {len(moved_files)} flat file(s) - rerun with --delete-originals to remove them")
+
+        print("✅ Migration completed successfully!")
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Database error: {e}")
+        return False
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("🗄️  FACE IMAGE STORE MIGRATION")
+    print("=" * 70)
+    print()
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    db_path = args[0] if args else 'visitor_management.db'
+    face_folder = args[1] if len(args) > 1 else None
+    success = migrate_face_store(db_path, face_folder, delete_originals='--delete-originals' in sys.argv)
+
+    print()
+    print("=" * 70)
+    if success:
+        print("✅ MIGRATION SUCCESSFUL")
+        print("You can now restart your Flask application")
+    else:
+        print("❌ MIGRATION FAILED")
+        print("Please check the errors above")
+    print("=" * 70)
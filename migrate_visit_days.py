@@ -0,0 +1,81 @@
+"""
+Database Migration Script for Visit Days
+Creates the visit_days(visit_source, visit_id, day) table with its day index
+and the triggers that keep it in sync, and fills it from visit_date / no_of_days / visit_dates
+of every visitors and host_visitors row.
+
+Safe to run multiple times - each run rebuilds the rows in keyset chunks.
+
+Usage: python migrate_visit_days.py [db_path]
+"""
+
+import sqlite3
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.visit_days import SOURCE_TABLES, VISIT_DAYS_TABLE, ensure_visit_days_table
+
+
+def migrate_visit_days(db_path='visitor_management.db'):
+    """Create and backfill visit_days"""
+
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found: {db_path}")
+        print("Please run this script from the project root directory")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+
+        print(f"🔧 Creating and filling {VISIT_DAYS_TABLE}...")
+        written = ensure_visit_days_table(conn, rebuild=True)
+        print(f"   ✅ {written} day row(s) written")
+
+        cursor = conn.cursor()
+        for source, table in SOURCE_TABLES.items():
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE visit_date IS NOT NULL AND NOT EXISTS "
+                f"(SELECT 1 FROM {VISIT_DAYS_TABLE} d WHERE d.visit_source = ? AND d.visit_id = {table}.id)",
+                (source,)
+            )
+            unreadable = cursor.fetchone()[0]
+            if unreadable:
+                print(f"   ⚠️  {table}: {unreadable} row(s) with an unreadable visit date")
+
+        cursor.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {VISIT_DAYS_TABLE} "
+            f"GROUP BY visit_source, visit_id HAVING COUNT(*) > 1)"
+        )
+        multi_day = cursor.fetchone()[0]
+        print(f"   ℹ️  {multi_day} multi-day visit(s)")
+        conn.close()
+
+        print("✅ Migration completed successfully!")
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Database error: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("🗄️  VISIT DAYS MIGRATION")
+    print("=" * 70)
+    print()
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'visitor_management.db'
+    success = migrate_visit_days(db_path)
+
+    print()
+    print("=" * 70)
+    if success:
+        print("✅ MIGRATION SUCCESSFUL")
+        print("You can now restart your Flask application")
+    else:
+        print("❌ MIGRATION FAILED")
+        print("Please check the errors above")
+    print("=" * 70)
@@ -0,0 +1,74 @@
+"""
+Daily Visit Rollup Maintenance
+Creates the daily_visit_rollup table and its triggers if needed, recounts
+it from the live visit tables plus every archive month, or only checks
+that the trigger-maintained counts still match a fresh count.
+
+Usage: python rebuild_visit_rollups.py [db_path] [--check]
+    --check   only compare; exit code 1 if any rollup row is off
+"""
+
+import sqlite3
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.sqlite_tuning import apply_sqlite_pragmas
+from utils.visit_rollups import ROLLUP_TABLE, check_rollups, ensure_rollup_table
+
+
+def rebuild_visit_rollups(db_path='visitor_management.db', check_only=False):
+    """Rebuild (or only check) the rollups; returns True when consistent"""
+
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found: {db_path}")
+        print("Please run this script from the project root directory")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+        apply_sqlite_pragmas(conn)
+
+        if not check_only:
+            print(f"🔧 Rebuilding {ROLLUP_TABLE}...")
+            written = ensure_rollup_table(conn, rebuild=True)
+            print(f"   ✅ {written} rollup row(s) written")
+            print()
+
+        print("🔍 Checking rollup counts...")
+        mismatches = check_rollups(conn)
+        conn.close()
+
+    except sqlite3.Error as e:
+        print(f"❌ Database error: {e}")
+        return False
+
+    for key, expected, actual in mismatches[:20]:
+        print(f"   ❌ {' | '.join(map(str, key))}: expected {expected}, found {actual}")
+    if len(mismatches) > 20:
+        print(f"   ... and {len(mismatches) - 20} more")
+    if not mismatches:
+        print("   ✅ Every rollup row matches")
+    return not mismatches
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("📊 DAILY VISIT ROLLUPS")
+    print("=" * 70)
+    print()
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    db_path = args[0] if args else 'visitor_management.db'
+    success = rebuild_visit_rollups(db_path, check_only='--check' in sys.argv)
+
+    print()
+    print("=" * 70)
+    if success:
+        print("✅ ROLLUPS CONSISTENT")
+    else:
+        print("❌ ROLLUPS OUT OF STEP - run without --check to rebuild")
+    print("=" * 70)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,272 @@
+"""
+Bulk Face Re-encoding Job
+Regenerates face_encoding for every visitors / host_visitors row from its
+stored photo with the current model (FACE_ENCODER_BACKEND /
+FACE_DETECTION_MODEL), e.g. after switching detector or deepface backend.
+
+- Rows are walked in id order in chunks and encoded on a process pool
+- Each chunk is committed together with a checkpoint, so an interrupted
+  run resumes where it stopped
+- Every row is tagged with face_model_version; the face matcher only
+  compares embeddings that carry the current version
+- Rows whose photo cannot be found keep their old encoding and are listed
+  at the end; --drop-missing clears their encoding instead
+
+Usage: python reencode_faces.py [db_path] [workers] [--restart] [--drop-missing]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from utils.face_codec import BLOB_COLUMN, VERSION_COLUMN, encode_face_blob
+from utils.face_engine import HISTOGRAM_MODEL_VERSION, model_version
+from utils.face_store import (
+    content_hash, default_face_folder, ensure_cache_table, get_cached_encoding, put_cached_encoding,
+    resolve_face_image
+)
+
+TABLES = ['visitors', 'host_visitors']
+CHUNK_SIZE = 200
+CHECKPOINT_TABLE = 'face_reencode_checkpoints'
+
+
+def _encode_job(image_bytes):
+    """Runs in a worker; returns (encoding, error message)"""
+    from utils.face_engine import NoFaceDetected
+    from utils.face_pool import _encode_in_worker
+
+    try:
+        return _encode_in_worker(image_bytes), None
+    except NoFaceDetected:
+        return None, 'no face'
+    except ValueError as e:
+        return None, str(e)
+
+
+def prepare_table(conn, table):
+    """
+    Add face_model_version (and the blob column) if missing. Existing
+    encodings predate the column, so they are tagged with the version of
+    the encoder that wrote them (the 258-value histogram).
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = [row[1] for row in cursor.fetchall()]
+
+    if 'face_image_path' not in columns or 'face_encoding' not in columns:
+        return None
+    for column, sql_type in ((VERSION_COLUMN, 'VARCHAR(100)'), (BLOB_COLUMN, 'BLOB')):
+        if column not in columns:
+            print(f"➕ Adding {column} column to {table}...")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}")
+    cursor.execute(
+        f"UPDATE {table} SET {VERSION_COLUMN} = ? "
+        f"WHERE {VERSION_COLUMN} IS NULL AND face_encoding IS NOT NULL AND face_encoding != ''",
+        (HISTOGRAM_MODEL_VERSION,)
+    )
+    conn.commit()
+    return True
+
+
+def ensure_checkpoint_table(conn):
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} ("
+        f"table_name VARCHAR(50) NOT NULL, "
+        f"model_version VARCHAR(100) NOT NULL, "
+        f"last_id INTEGER NOT NULL, "
+        f"updated_at DATETIME, "
+        f"PRIMARY KEY (table_name, model_version))"
+    )
+    conn.commit()
+
+
+def get_checkpoint(conn, table, version):
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT last_id FROM {CHECKPOINT_TABLE} WHERE table_name = ? AND model_version = ?",
+        (table, version)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def reset_checkpoints(conn, version):
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE model_version = ?", (version,))
+    conn.commit()
+
+
+def reencode_table(conn, executor, table, version, face_folder, chunk_size=CHUNK_SIZE,
+                   drop_missing=False):
+    """
+    Re-encode one table from its checkpoint; commits every chunk.
+    Returns the ids whose photo could not be found.
+    """
+    if not prepare_table(conn, table):
+        print(f"   ℹ️  {table} has no face columns - skipped")
+        return []
+
+    cursor = conn.cursor()
+    last_id = get_checkpoint(conn, table, version)
+    if last_id:
+        print(f"   ↻ Resuming {table} after id {last_id}")
+
+    encoded = cached = failed = 0
+    missing = []
+    started = time.perf_counter()
+
+    while True:
+        cursor.execute(
+            f"SELECT id, face_image_path FROM {table} "
+            f"WHERE id > ? AND face_image_path IS NOT NULL AND face_image_path != '' "
+            f"AND ({VERSION_COLUMN} IS NULL OR {VERSION_COLUMN} != ?) "
+            f"ORDER BY id LIMIT ?",
+            (last_id, version, chunk_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        results = {}
+        unresolved = set()
+        pending = []
+        for record_id, value in rows:
+            path = resolve_face_image(value, face_folder)
+            if path is None:
+                unresolved.add(record_id)
+                if drop_missing:
+                    results[record_id] = None
+                continue
+            with open(path, 'rb') as handle:
+                image_bytes = handle.read()
+            digest = content_hash(image_bytes)
+            encoding = get_cached_encoding(conn, digest, version)
+            if encoding is not None:
+                results[record_id] = encoding
+                cached += 1
+            else:
+                pending.append((record_id, digest, image_bytes))
+
+        jobs = executor.map(_encode_job, [job[2] for job in pending])
+        for (record_id, digest, _), (encoding, error) in zip(pending, jobs):
+            if error and error != 'no face':
+                print(f"   ⚠️  {table} id {record_id}: {error}")
+            results[record_id] = encoding
+            if encoding is not None:
+                put_cached_encoding(conn, digest, version, encoding)
+
+        updates = []
+        for record_id, encoding in results.items():
+            if encoding is None:
+                if record_id not in unresolved:
+                    failed += 1
+                # The old embedding is from another model - never match on it
+                updates.append((None, None, None, record_id))
+            else:
+                encoded += 1
+                updates.append((json.dumps(encoding.tolist()), encode_face_blob(encoding), version, record_id))
+
+        missing += sorted(unresolved)
+        last_id = rows[-1][0]
+        cursor.executemany(
+            f"UPDATE {table} SET face_encoding = ?, {BLOB_COLUMN} = ?, {VERSION_COLUMN} = ? WHERE id = ?",
+            updates
+        )
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {CHECKPOINT_TABLE} (table_name, model_version, last_id, updated_at) "
+            f"VALUES (?, ?, ?, datetime('now'))",
+            (table, version, last_id)
+        )
+        conn.commit()
+
+        rate = (encoded + failed) / max(time.perf_counter() - started, 1e-9)
+        print(f"   ... {table}: {encoded} encoded ({cached} cached), {failed} failed, "
+              f"{len(missing)} photo(s) missing (up to id {last_id}, {rate:.1f} rows/s)")
+
+    print(f"   ✅ {table}: {encoded} encoded ({cached} from cache), {failed} without a usable face")
+    if missing:
+        action = 'encoding cleared' if drop_missing else 'left unchanged'
+        shown = ', '.join(str(record_id) for record_id in missing[:20])
+        more = f" (+{len(missing) - 20} more)" if len(missing) > 20 else ''
+        print(f"   ⚠️  {table}: {len(missing)} row(s) without a photo file, {action}: ids {shown}{more}")
+    return missing
+
+
+def reencode_faces(db_path='visitor_management.db', workers=None, restart=False, face_folder=None,
+                   drop_missing=False):
+    """Re-encode every stored face with the current model"""
+
+    # The folder the runtime store reads (Config.FACE_FOLDER outside the app)
+    face_folder = face_folder or default_face_folder()
+    workers = workers or os.cpu_count() or 1
+    version = model_version()
+
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found: {db_path}")
+        print("Please run this script from the project root directory")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+        ensure_cache_table(conn)
+        ensure_checkpoint_table(conn)
+        if restart:
+            reset_checkpoints(conn, version)
+
+        print(f"🧠 Model version: {version}")
+        print(f"⚙️  Workers: {workers}")
+        print()
+
+        from utils.face_pool import _init_worker
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(Config.FACE_DETECTION_MODEL, Config.FACE_ENCODER_BACKEND),
+        ) as executor:
+            for table in TABLES:
+                print(f"🔧 Re-encoding {table}...")
+                reencode_table(conn, executor, table, version, face_folder, drop_missing=drop_missing)
+                print()
+
+        conn.close()
+        print("✅ Re-encoding completed successfully!")
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Database error: {e}")
+        return False
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrupted - run again to resume from the last checkpoint")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("🔁 BULK FACE RE-ENCODING")
+    print("=" * 70)
+    print()
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    db_path = args[0] if args else 'visitor_management.db'
+    workers = int(args[1]) if len(args) > 1 else None
+    success = reencode_faces(db_path, workers, restart='--restart' in sys.argv,
+                             drop_missing='--drop-missing' in sys.argv)
+
+    print()
+    print("=" * 70)
+    if success:
+        print("✅ RE-ENCODING SUCCESSFUL")
+        print("Restart the Flask application to reload the face index")
+    else:
+        print("❌ RE-ENCODING INCOMPLETE")
+        print("Please check the messages above")
+    print("=" * 70)
@@ -0,0 +1,80 @@
+"""
+Database Migration Runner
+Applies the pending schema migrations from utils/migrations.py in order and
+records each one in the schema_version table. Safe to run repeatedly and on
+databases that already ran the old one-off migration scripts.
+
+Usage: python run_migrations.py [db_path] [--status] [--to=VERSION]
+    --status      list applied and pending migrations without changing anything
+    --to=VERSION  stop after this migration version
+"""
+
+import sqlite3
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.migrations import (
+    LATEST_VERSION, applied_migrations, current_version, pending_migrations, run_migrations
+)
+from utils.sqlite_tuning import apply_sqlite_pragmas
+
+
+def print_status(conn):
+    for version, description, applied_at, duration_ms in applied_migrations(conn):
+        print(f"   ✅ {version:04d} {description:<35} {applied_at}  ({duration_ms} ms)")
+    for version, description, _ in pending_migrations(conn):
+        print(f"   ⏳ {version:04d} {description:<35} pending")
+
+
+def migrate(db_path='visitor_management.db', status_only=False, target=None):
+    """Run (or only report) pending migrations; returns True on success"""
+
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found: {db_path}")
+        print("Please run this script from the project root directory")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+        apply_sqlite_pragmas(conn)
+
+        print(f"📋 Schema version: {current_version(conn)} (latest {LATEST_VERSION})")
+        if not status_only:
+            applied = run_migrations(conn, target=target, log=lambda line: print(f"   {line}"))
+            print(f"✅ Applied {len(applied)} migration(s)")
+        print()
+        print_status(conn)
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Database error: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("🗄️  DATABASE MIGRATIONS")
+    print("=" * 70)
+    print()
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    db_path = args[0] if args else 'visitor_management.db'
+    target = None
+    for arg in sys.argv[1:]:
+        if arg.startswith('--to='):
+            target = int(arg.split('=', 1)[1])
+    success = migrate(db_path, status_only='--status' in sys.argv, target=target)
+
+    print()
+    print("=" * 70)
+    if success:
+        print("✅ MIGRATIONS COMPLETE")
+    else:
+        print("❌ MIGRATIONS FAILED")
+        print("Please check the errors above")
+    print("=" * 70)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,153 @@
+"""
+SQLite Concurrency Stress Test
+Simulates the morning rush: many parallel writers (registrations and
+check-ins) plus readers (security desk lists) on one SQLite file, once with
+SQLite's defaults and once with the PRAGMAs from utils/sqlite_tuning.py.
+Reports "database is locked" errors and throughput for both.
+
+Usage: python stress_test_sqlite_concurrency.py [writers] [transactions_per_writer]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from utils.sqlite_tuning import apply_sqlite_pragmas, sqlite_pragmas
+
+READERS = 10
+
+# Rollback journal, fsync on every commit, pysqlite's default 5 s busy timeout
+DEFAULT_PRAGMAS = [('journal_mode', 'DELETE'), ('synchronous', 'FULL')]
+DEFAULT_TIMEOUT = 5.0
+
+SCHEMA = """
+CREATE TABLE visitors (
+    id INTEGER PRIMARY KEY,
+    full_name VARCHAR(120) NOT NULL,
+    visit_date DATE,
+    status VARCHAR(20),
+    entry_code VARCHAR(4),
+    face_encoding TEXT,
+    created_at DATETIME,
+    check_in_time DATETIME
+)
+"""
+
+
+def seed(path, rows=5000):
+    conn = sqlite3.connect(path)
+    conn.execute(SCHEMA)
+    conn.execute("CREATE INDEX ix_visitors_visit_date_status ON visitors (visit_date, status)")
+    conn.executemany(
+        "INSERT INTO visitors (full_name, visit_date, status, entry_code, face_encoding, created_at) "
+        "VALUES (?, date('now'), 'approved', ?, ?, datetime('now'))",
+        [(f"Visitor {i}", f"{i % 10000:04d}", 'x' * 2000) for i in range(rows)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_scenario(path, pragmas, timeout, writers, transactions):
+    errors = []
+    committed = [0]
+    counter_lock = threading.Lock()
+    stop_readers = threading.Event()
+
+    def connect():
+        conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        apply_sqlite_pragmas(conn, pragmas)
+        return conn
+
+    def writer(worker_id):
+        conn = connect()
+        for n in range(transactions):
+            try:
+                # Registration followed by a check-in, like the request handlers
+                conn.execute(
+                    "INSERT INTO visitors (full_name, visit_date, status, entry_code, face_encoding, created_at) "
+                    "VALUES (?, date('now'), 'pending', ?, ?, datetime('now'))",
+                    (f"Writer {worker_id}-{n}", f"{n:04d}", 'x' * 2000)
+                )
+                conn.execute(
+                    "UPDATE visitors SET status = 'checked_in', check_in_time = datetime('now') "
+                    "WHERE id = (SELECT MAX(id) FROM visitors WHERE entry_code = ?)",
+                    (f"{n:04d}",)
+                )
+                conn.commit()
+                with counter_lock:
+                    committed[0] += 1
+            except sqlite3.OperationalError as e:
+                conn.rollback()
+                errors.append(str(e))
+        conn.close()
+
+    def reader():
+        conn = connect()
+        while not stop_readers.is_set():
+            try:
+                conn.execute(
+                    "SELECT id, full_name, status, face_encoding FROM visitors "
+                    "WHERE visit_date = date('now') ORDER BY created_at DESC"
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+        conn.close()
+
+    reader_threads = [threading.Thread(target=reader) for _ in range(READERS)]
+    writer_threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+
+    start = time.perf_counter()
+    for thread in reader_threads + writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop_readers.set()
+    for thread in reader_threads:
+        thread.join()
+
+    locked = sum('locked' in error or 'busy' in error for error in errors)
+    return {
+        'committed': committed[0],
+        'locked_errors': locked,
+        'other_errors': len(errors) - locked,
+        'seconds': elapsed,
+    }
+
+
+def run_stress_test(writers=50, transactions=40):
+    scenarios = [
+        ('SQLite defaults', DEFAULT_PRAGMAS, DEFAULT_TIMEOUT),
+        ('Tuned (Config)', sqlite_pragmas(), Config.SQLITE_BUSY_TIMEOUT_MS / 1000.0),
+    ]
+    results = []
+    for label, pragmas, timeout in scenarios:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'stress.db')
+            seed(path)
+            results.append((label, run_scenario(path, pragmas, timeout, writers, transactions)))
+
+    print("=" * 70)
+    print(f"SQLITE CONCURRENCY STRESS TEST ({writers} writers x {transactions} transactions, "
+          f"{READERS} readers)")
+    print("=" * 70)
+    print(f"{'Settings':<18} {'Committed':>10} {'Locked':>8} {'Other':>7} {'Time':>9} {'Tx/s':>8}")
+    print("-" * 70)
+    for label, r in results:
+        print(f"{label:<18} {r['committed']:>10} {r['locked_errors']:>8} {r['other_errors']:>7} "
+              f"{r['seconds']:>7.2f} s {r['committed'] / r['seconds']:>8.0f}")
+    print("=" * 70)
+    return results
+
+
+if __name__ == '__main__':
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    transactions = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    run_stress_test(writers, transactions)
@@ -0,0 +1,218 @@
+"""
+Archive Read Test Script
+Builds a scratch database with fourteen months of visits, archives the
+closed ones (utils/archive.py) and checks that reads spanning the archive
+months - more than SQLite can attach at once - still see every visit, that
+every analytics report returns what it returned before archiving and that
+visit exports still contain every visit.
+
+Usage: python test_archive_reads.py   (or: python -m pytest test_archive_reads.py)
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from utils.archive import (
+    MAX_ATTACHED, archive_closed_visits, archive_views, archived_months, attached_months, with_archives
+)
+from utils.report_queries import REPORT_QUERIES, run_report
+from utils.visit_export import VisitExport
+from utils.visits import ensure_visits_table
+
+FIRST_DAY = date(2024, 1, 1)
+DAYS = 425                      # 2024-01-01 .. 2025-02-28: fourteen months
+CUTOFF = date(2025, 2, 1)
+STATUSES = ['checked-out', 'checked-out', 'pending', 'rejected', 'checked-in']
+COMPANIES = ['Acme', 'Globex', 'Initech', '']
+
+VISIT_FIELDS = (
+    "full_name VARCHAR(120), email VARCHAR(120), phone VARCHAR(20), company VARCHAR(120), "
+    "visitor_type VARCHAR(50), purpose VARCHAR(255), vehicle_number VARCHAR(20), "
+    "visit_type VARCHAR(20), visit_date DATE, visit_time VARCHAR(10), no_of_days INTEGER, "
+    "visit_dates TEXT, status VARCHAR(20), pass_id VARCHAR(50), entry_code VARCHAR(4), "
+    "exit_code VARCHAR(4), check_in_time DATETIME, check_out_time DATETIME, "
+    "face_image_path VARCHAR(255), created_at DATETIME, updated_at DATETIME"
+)
+
+
+def build_database(folder):
+    path = os.path.join(folder, 'visits.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE hosts (id INTEGER PRIMARY KEY, full_name VARCHAR(120), "
+                 "email VARCHAR(120), department VARCHAR(100))")
+    conn.execute(f"CREATE TABLE visitors (id INTEGER PRIMARY KEY, {VISIT_FIELDS}, host_name VARCHAR(120), "
+                 f"host_email VARCHAR(120), host_department VARCHAR(100), host_confirmation VARCHAR(20))")
+    conn.execute(f"CREATE TABLE host_visitors (id INTEGER PRIMARY KEY, host_id INTEGER, {VISIT_FIELDS})")
+    conn.execute("CREATE TABLE visit_logs (id INTEGER PRIMARY KEY, visitor_id INTEGER, "
+                 "action VARCHAR(50), timestamp DATETIME)")
+    conn.execute("CREATE TABLE host_activity_logs (id INTEGER PRIMARY KEY, visitor_id INTEGER, "
+                 "host_id INTEGER, action VARCHAR(50), timestamp DATETIME)")
+    conn.execute("INSERT INTO hosts VALUES (1, 'Dana Host', 'dana@example.com', 'Facilities')")
+    ensure_visits_table(conn)
+
+    for offset in range(DAYS):
+        day = FIRST_DAY + timedelta(days=offset)
+        for i in range(3):
+            status = STATUSES[(offset + i) % len(STATUSES)]
+            check_in = f"{day} {8 + (offset + i) % 9:02d}:15:00" if status != 'pending' else None
+            check_out = f"{day} 17:40:00" if status == 'checked-out' else None
+            values = (
+                f"Visitor {offset % 97}", f"visitor{offset % 97}@example.com", '555-0100',
+                COMPANIES[(offset + i) % len(COMPANIES)], ['guest', 'vendor'][i % 2], 'Meeting', None,
+                'single', day.isoformat(), '09:00', 1, None, status, f"P{offset}-{i}", None, None,
+                check_in, check_out, None, f"{day} 07:00:00", f"{day} 07:00:00",
+            )
+            if i < 2:
+                cursor = conn.execute(
+                    f"INSERT INTO visitors (full_name, email, phone, company, visitor_type, purpose, "
+                    f"vehicle_number, visit_type, visit_date, visit_time, no_of_days, visit_dates, status, "
+                    f"pass_id, entry_code, exit_code, check_in_time, check_out_time, face_image_path, "
+                    f"created_at, updated_at, host_name, host_email) "
+                    f"VALUES ({', '.join('?' for _ in range(23))})",
+                    values + ('Dana Host', 'dana@example.com')
+                )
+                conn.execute("INSERT INTO visit_logs (visitor_id, action, timestamp) VALUES (?, 'check_in', ?)",
+                             (cursor.lastrowid, f"{day} 09:00:00"))
+            else:
+                conn.execute(
+                    f"INSERT INTO host_visitors (host_id, full_name, email, phone, company, visitor_type, "
+                    f"purpose, vehicle_number, visit_type, visit_date, visit_time, no_of_days, visit_dates, "
+                    f"status, pass_id, entry_code, exit_code, check_in_time, check_out_time, "
+                    f"face_image_path, created_at, updated_at) "
+                    f"VALUES (1, {', '.join('?' for _ in range(21))})",
+                    values
+                )
+    conn.commit()
+    return conn
+
+
+class ArchivedDatabase:
+    """Scratch database and archive folder; archive() moves the closed visits"""
+
+    def __init__(self):
+        self.folder = tempfile.mkdtemp(prefix='archive_reads_')
+        self.archives = os.path.join(self.folder, 'archive')
+        self.conn = build_database(self.folder)
+
+    def archive(self):
+        return archive_closed_visits(self.conn, cutoff=CUTOFF, folder=self.archives)
+
+    def close(self):
+        self.conn.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+
+def read_all(conn, sql, folder):
+    rows = []
+    for _ in archive_views(conn, folder=folder):
+        rows += conn.execute(sql).fetchall()
+    return rows
+
+
+def test_archive_views_read_every_month():
+    db = ArchivedDatabase()
+    try:
+        sql = "SELECT source, source_id, visit_date, status, host_name FROM visits_all"
+        before = sorted(read_all(db.conn, sql, db.archives))
+        moved = db.archive()
+
+        assert moved['visitors'] > 0 and moved['host_visitors'] > 0
+        assert len(archived_months(folder=db.archives)) > MAX_ATTACHED
+        assert sorted(read_all(db.conn, sql, db.archives)) == before
+        visitors = read_all(db.conn, "SELECT id, status FROM visitors_all", db.archives)
+        assert len(visitors) == len({row[0] for row in visitors}) == DAYS * 2
+    finally:
+        db.close()
+
+
+def all_reports(db, start, end):
+    def read(sql, params):
+        return pd.read_sql_query(sql, db.conn, params=params)
+
+    return {
+        name: run_report(name, start, end, limit=10, read=read, connection=db.conn, folder=db.archives)
+        for name in REPORT_QUERIES
+    }
+
+
+def test_reports_match_before_archiving():
+    db = ArchivedDatabase()
+    try:
+        # Fourteen archived months (two attach groups) and eight (one group)
+        ranges = [('2024-01-01', '2025-02-28'), ('2024-06-01', '2025-02-28')]
+        before = [all_reports(db, start, end) for start, end in ranges]
+        db.archive()
+        assert len(archived_months('2024-06-01', '2025-02-28', db.archives)) <= MAX_ATTACHED
+        after = [all_reports(db, start, end) for start, end in ranges]
+
+        for (start, end), old, new in zip(ranges, before, after):
+            for name in REPORT_QUERIES:
+                assert not old[name].empty, name
+                pd.testing.assert_frame_equal(
+                    new[name], old[name], check_dtype=False, obj=f"{name} {start}..{end}"
+                )
+    finally:
+        db.close()
+
+
+def export(db, **options):
+    def read(sql, params):
+        return db.conn.execute(sql, params).fetchall()
+
+    def read_archive(month, sql, params):
+        with attached_months(db.conn, [month], db.archives) as aliases:
+            return read(with_archives(db.conn.cursor(), sql, aliases, live=False), params)
+
+    return VisitExport(read=read, read_archive=read_archive, folder=db.archives, batch_size=100, **options)
+
+
+def test_export_includes_archived_visits():
+    db = ArchivedDatabase()
+    try:
+        options = {'columns': ['source', 'source_id', 'full_name', 'visit_date', 'status', 'host_name'],
+                   'start': '2024-01-01', 'end': '2025-02-28'}
+        before = list(export(db, **options).rows())
+        db.archive()
+        whole = export(db, **options)
+        assert len(whole.months) > MAX_ATTACHED
+        assert whole.count() == len(before)
+        rows = list(whole.rows())
+        assert sorted(rows) == sorted(before)
+
+        # Parts joined by their next cursor == the single export
+        parts, cursor = [], None
+        while True:
+            part = export(db, cursor=cursor, limit=250, **options)
+            cursor = part.next_cursor()
+            parts += list(part.rows())
+            if cursor is None:
+                break
+        assert parts == rows
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("ARCHIVE READ TEST")
+    print("=" * 70)
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failed += 1
+                print(f"❌ {name}: {e}")
+    print("=" * 70)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,160 @@
+"""
+Kiosk Face Tracking Test Script
+Runs utils/face_stream.py's StreamingRecognizer on synthetic frames (a
+textured "face" moving over a noisy background) with a stub detector and
+matcher, and checks track continuity, one match per track, the event
+cooldown and that the cooldown map stays bounded.
+
+Usage: python test_face_stream.py   (or: python -m pytest test_face_stream.py)
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.face_stream import StreamingRecognizer
+
+FRAME_SHAPE = (240, 320)
+FACE_SIZE = 48
+
+
+def make_face(seed):
+    rng = np.random.RandomState(seed)
+    return rng.randint(0, 256, (FACE_SIZE, FACE_SIZE), dtype=np.uint8)
+
+
+def make_frame(faces, frame_index):
+    """Grey frame with each (face, (x, y)) pasted over fresh background noise"""
+    rng = np.random.RandomState(1000 + frame_index)
+    frame = rng.randint(100, 130, FRAME_SHAPE, dtype=np.uint8)
+    for face, (x, y) in faces:
+        frame[y:y + FACE_SIZE, x:x + FACE_SIZE] = face
+    return frame
+
+
+class StubModel:
+    """Detector that returns the true boxes; 'encoding' = the face's seed"""
+
+    def __init__(self):
+        self.boxes = []
+        self.seeds = {}
+
+    def detect_scaled(self, frame):
+        return list(self.boxes)
+
+    def encode_face(self, crop):
+        # The seed whose face matches the crop best
+        best = min(self.seeds, key=lambda seed: np.abs(
+            crop.astype(int) - make_face(seed)[:crop.shape[0], :crop.shape[1]]).mean())
+        return [float(best)]
+
+
+class StubMatcher:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, encoding):
+        self.calls += 1
+        return 'visitor', int(encoding[0]), 0.1
+
+
+def make_recognizer(cooldown=30):
+    model, matcher = StubModel(), StubMatcher()
+    recognizer = StreamingRecognizer(model=model, matcher=matcher, detect_every=5,
+                                     max_missed=1, quality_gain=0.25, cooldown=cooldown)
+    return recognizer, model, matcher
+
+
+def walk(recognizer, model, seed, frames, start_frame=0, start_time=0.0, fps=10.0):
+    """Move one face right 3 px per frame; returns (events, tracked boxes, true boxes)"""
+    face = make_face(seed)
+    model.seeds[seed] = True
+    events, tracked, truth = [], [], []
+    for i in range(frames):
+        x, y = 20 + 3 * i, 60
+        model.boxes = [(x, y, FACE_SIZE, FACE_SIZE)]
+        frame_index = start_frame + i
+        events += recognizer.process_frame(make_frame([(face, (x, y))], frame_index),
+                                           start_time + i / fps)
+        tracked.append([track.box for track in recognizer.tracks])
+        truth.append((x, y))
+    return events, tracked, truth
+
+
+def leave(recognizer, model, frames, start_frame, start_time, fps=10.0):
+    """Empty frames until every track is dropped"""
+    model.boxes = []
+    for i in range(frames):
+        recognizer.process_frame(make_frame([], start_frame + i), start_time + i / fps)
+
+
+def test_track_follows_face_between_detections():
+    recognizer, model, _ = make_recognizer()
+    _, tracked, truth = walk(recognizer, model, seed=1, frames=40)
+
+    assert recognizer.detections_run == 8
+    assert [track.track_id for track in recognizer.tracks] == [1]
+    for boxes, (x, y) in zip(tracked, truth):
+        assert len(boxes) == 1
+        bx, by, _, _ = boxes[0]
+        assert abs(bx - x) <= 2 and abs(by - y) <= 2
+
+
+def test_one_match_per_track():
+    recognizer, model, matcher = make_recognizer()
+    events, _, _ = walk(recognizer, model, seed=2, frames=40)
+
+    assert [(event.track_id, event.record_id) for event in events] == [(1, 2)]
+    assert matcher.calls == 1
+    assert recognizer.encodings_run == 1
+
+
+def test_cooldown_suppresses_reacquired_person():
+    recognizer, model, _ = make_recognizer(cooldown=30)
+    first, _, _ = walk(recognizer, model, seed=3, frames=10)
+    leave(recognizer, model, frames=15, start_frame=10, start_time=1.0)
+    assert recognizer.tracks == []
+
+    # Back 5 s later as a new track: same person, no second event
+    again, _, _ = walk(recognizer, model, seed=3, frames=10, start_frame=25, start_time=5.0)
+    assert len(first) == 1 and again == []
+    assert [track.track_id for track in recognizer.tracks] == [2]
+
+    leave(recognizer, model, frames=15, start_frame=35, start_time=6.0)
+    # Back after the cooldown: announced again
+    later, _, _ = walk(recognizer, model, seed=3, frames=10, start_frame=50, start_time=40.0)
+    assert [(event.track_id, event.record_id) for event in later] == [(3, 3)]
+
+
+def test_cooldown_map_stays_bounded():
+    recognizer, model, _ = make_recognizer(cooldown=30)
+    frame_index = 0
+    for person in range(20):
+        start_time = person * 60.0
+        walk(recognizer, model, seed=100 + person, frames=10,
+             start_frame=frame_index, start_time=start_time)
+        leave(recognizer, model, frames=15, start_frame=frame_index + 10, start_time=start_time + 1.0)
+        frame_index += 25
+    # Each visitor left more than a cooldown before the next one arrived
+    assert len(recognizer._recent) == 1
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("KIOSK FACE TRACKING TEST")
+    print("=" * 70)
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failed += 1
+                print(f"❌ {name}: {e}")
+    print("=" * 70)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,105 @@
+"""
+Hot Query Plan Test Script
+Builds the visitor tables in a scratch database, applies the indexes from
+utils/db_indexes.py and checks with EXPLAIN QUERY PLAN that every hot query
+is answered through an index (USING INDEX / USING COVERING INDEX) - and
+that without them the same check reports full table scans.
+
+Usage: python test_query_plans.py   (or: python -m pytest test_query_plans.py)
+"""
+
+import os
+import sqlite3
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.db_indexes import HOT_QUERIES, HOT_QUERY_INDEXES, ensure_indexes, explain, uses_index
+
+VISIT_FIELDS = (
+    "full_name VARCHAR(120), email VARCHAR(120), company VARCHAR(120), visit_date DATE, "
+    "visit_time VARCHAR(10), status VARCHAR(20), pass_id VARCHAR(50) UNIQUE, entry_code VARCHAR(4), "
+    "exit_code VARCHAR(4), created_at DATETIME, updated_at DATETIME"
+)
+
+SCHEMA = [
+    f"CREATE TABLE visitors (id INTEGER PRIMARY KEY, {VISIT_FIELDS}, host_email VARCHAR(120))",
+    f"CREATE TABLE host_visitors (id INTEGER PRIMARY KEY, host_id INTEGER NOT NULL, {VISIT_FIELDS})",
+    "CREATE TABLE visit_logs (id INTEGER PRIMARY KEY, visitor_id INTEGER, action VARCHAR(50), "
+    "timestamp DATETIME)",
+    "CREATE TABLE host_activity_logs (id INTEGER PRIMARY KEY, host_id INTEGER, visitor_id INTEGER, "
+    "action VARCHAR(50), timestamp DATETIME)",
+]
+
+ROWS = 2000
+
+
+def build_database(indexes=True):
+    conn = sqlite3.connect(':memory:')
+    for statement in SCHEMA:
+        conn.execute(statement)
+    for i in range(ROWS):
+        day = f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}"
+        values = (f"Visitor {i}", f"v{i}@example.com", f"Company {i % 40}", day, '09:00',
+                  ['pending', 'approved', 'checked_in', 'checked_out'][i % 4], f"P{i}",
+                  f"{i % 10000:04d}", f"{(i * 7) % 10000:04d}", f"{day} 08:00:00", f"{day} 08:00:00")
+        conn.execute("INSERT INTO visitors (full_name, email, company, visit_date, visit_time, status, pass_id, "
+                     "entry_code, exit_code, created_at, updated_at, host_email) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values + (f"host{i % 50}@example.com",))
+        conn.execute("INSERT INTO host_visitors (host_id, full_name, email, company, visit_date, visit_time, "
+                     "status, pass_id, entry_code, exit_code, created_at, updated_at) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (1 + i % 50,) + values)
+        conn.execute("INSERT INTO visit_logs (visitor_id, action, timestamp) VALUES (?, 'check_in', ?)",
+                     (1 + i, f"{day} 09:00:00"))
+        conn.execute("INSERT INTO host_activity_logs (host_id, visitor_id, action, timestamp) "
+                     "VALUES (?, ?, 'approve', ?)", (1 + i % 50, 1 + i, f"{day} 09:00:00"))
+    if indexes:
+        ensure_indexes(conn)
+    conn.execute("ANALYZE")
+    conn.commit()
+    return conn
+
+
+def test_every_index_is_applied():
+    conn = build_database()
+    applied = ensure_indexes(conn)
+    conn.close()
+    assert applied == [name for name, _, _ in HOT_QUERY_INDEXES]
+
+
+def test_hot_queries_use_an_index():
+    conn = build_database()
+    failures = []
+    for description, sql in HOT_QUERIES:
+        plan = explain(conn, sql)
+        searched = any('USING INDEX' in detail or 'USING COVERING INDEX' in detail for detail in plan)
+        if not (searched and uses_index(plan)):
+            failures.append(f"{description}: {'; '.join(plan)}")
+    conn.close()
+    assert not failures, '\n'.join(failures)
+
+
+def test_plan_check_reports_table_scans():
+    # Without the indexes (pass_id's unique index aside) the check must fail
+    conn = build_database(indexes=False)
+    scans = [description for description, sql in HOT_QUERIES if not uses_index(explain(conn, sql))]
+    conn.close()
+    assert len(scans) == len(HOT_QUERIES), scans
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("HOT QUERY PLAN TEST")
+    print("=" * 70)
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failed += 1
+                print(f"❌ {name}: {e}")
+    print("=" * 70)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,3 @@
+"""
+Utility modules for the Visitor Management System
+"""
@@ -0,0 +1,166 @@
+"""
+Read-Only Analytics Engine
+A second SQLAlchemy engine on the same SQLite file for the analytics pages
+and report exports, so long aggregate scans never share a pool slot or a
+lock with check-in writes:
+
+    mode=ro URI + PRAGMA query_only   cannot write, cannot take the write lock
+    own QueuePool                     ANALYTICS_POOL_SIZE + ANALYTICS_MAX_OVERFLOW
+                                      connections, so at most that many reports
+                                      run at once; the rest wait ANALYTICS_POOL_TIMEOUT
+    statement timeout                 a progress handler aborts any statement
+                                      still running after ANALYTICS_STATEMENT_TIMEOUT
+
+With WAL journaling readers never block the writer, so a heavy report only
+costs the security desk CPU, not lock waits.
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from config import Config
+
+# SQLite VM instructions between two timeout checks
+_PROGRESS_STEPS = 10000
+
+
+class AnalyticsTimeout(RuntimeError):
+    """Raised when an analytics query runs past its engine's statement timeout"""
+
+
+class ReadOnlyConnection(sqlite3.Connection):
+    """sqlite3 connection class the analytics engine opens (see sqlite_tuning)"""
+
+    read_only = True
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _database_path(database_uri):
+    prefix = 'sqlite:///'
+    if not database_uri.startswith(prefix):
+        raise ValueError(f"Analytics engine needs a SQLite database, got {database_uri!r}")
+    return database_uri[len(prefix):]
+
+
+def create_analytics_engine(database_path, pool_size=None, max_overflow=None,
+                            pool_timeout=None, statement_timeout=None):
+    """Read-only engine on database_path (a filesystem path, not a URI)"""
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.pool import QueuePool
+
+    statement_timeout = Config.ANALYTICS_STATEMENT_TIMEOUT if statement_timeout is None else statement_timeout
+    engine = create_engine(
+        f"sqlite:///file:{database_path}?mode=ro&uri=true",
+        poolclass=QueuePool,
+        pool_size=pool_size or Config.ANALYTICS_POOL_SIZE,
+        max_overflow=Config.ANALYTICS_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        pool_timeout=pool_timeout or Config.ANALYTICS_POOL_TIMEOUT,
+        pool_pre_ping=False,
+        connect_args={
+            'factory': ReadOnlyConnection,
+            'timeout': Config.SQLITE_BUSY_TIMEOUT_MS / 1000.0,
+            'check_same_thread': False,
+        },
+    )
+    # Reported by AnalyticsTimeout (engines may override the Config default)
+    engine.statement_timeout = statement_timeout
+
+    @event.listens_for(engine, 'connect')
+    def configure_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.execute(f"PRAGMA busy_timeout={int(Config.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA cache_size={int(Config.SQLITE_CACHE_SIZE)}")
+        cursor.execute(f"PRAGMA mmap_size={int(Config.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA temp_store={Config.SQLITE_TEMP_STORE}")
+        cursor.close()
+
+        deadline = connection_record.info['statement_deadline'] = [None]
+
+        def past_deadline():
+            return 1 if deadline[0] is not None and time.monotonic() > deadline[0] else 0
+
+        if statement_timeout:
+            dbapi_connection.set_progress_handler(past_deadline, _PROGRESS_STEPS)
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_statement_clock(conn, cursor, statement, parameters, context, executemany):
+        # The deadline also covers fetching the rows, until the next
+        # statement or until the connection goes back to the pool
+        deadline = conn.connection.info.get('statement_deadline')
+        if deadline is not None and statement_timeout:
+            deadline[0] = time.monotonic() + statement_timeout
+
+    @event.listens_for(engine, 'checkin')
+    def stop_statement_clock(dbapi_connection, connection_record):
+        deadline = connection_record.info.get('statement_deadline')
+        if deadline is not None:
+            deadline[0] = None
+
+    return engine
+
+
+def init_analytics_engine(database_path, **options):
+    """Create the process-wide engine (create_app passes db.engine.url.database)"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = create_analytics_engine(database_path, **options)
+    return _engine
+
+
+def get_analytics_engine():
+    """The process-wide engine; scripts get one on Config's database"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_analytics_engine(_database_path(Config.SQLALCHEMY_DATABASE_URI))
+    return _engine
+
+
+@contextmanager
+def analytics_connection():
+    """SQLAlchemy Connection from the read-only pool"""
+    engine = get_analytics_engine()
+    timeout = getattr(engine, 'statement_timeout', Config.ANALYTICS_STATEMENT_TIMEOUT)
+    with engine.connect() as conn:
+        try:
+            yield conn
+        except sqlite3.OperationalError as e:
+            _raise_timeout(e, timeout)
+            raise
+        except Exception as e:
+            original = getattr(e, 'orig', None)
+            if isinstance(original, sqlite3.OperationalError):
+                _raise_timeout(original, timeout)
+            raise
+
+
+def _raise_timeout(error, timeout):
+    if 'interrupted' in str(error):
+        raise AnalyticsTimeout(f"Analytics query exceeded {timeout} s") from error
+
+
+def read_sql(sql, params=None):
+    """Rows of a read query as a list of dicts"""
+    from sqlalchemy import text
+
+    with analytics_connection() as conn:
+        return [dict(row) for row in conn.execute(text(sql), params or {}).mappings()]
+
+
+def read_dataframe(sql, params=None):
+    """pandas DataFrame of a read query"""
+    from sqlalchemy import text
+
+    from utils.lazy_imports import pd
+
+    with analytics_connection() as conn:
+        return pd.read_sql_query(text(sql), conn, params=params or {})
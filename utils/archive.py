@@ -0,0 +1,442 @@
+"""
+Monthly Archives
+Closed visits older than Config.ARCHIVE_AFTER_DAYS move out of the live
+database into one SQLite file per month (ARCHIVE_FOLDER/archive_YYYY_MM.db)
+together with their visit_logs / host_activity_logs rows, so the hot tables
+and their indexes stay small enough to live in the page cache.
+
+Rows move in id batches: each batch is copied into the month file and
+committed there before it is deleted from the live tables, so an
+interrupted run loses nothing and simply repeats the batch (INSERT OR
+REPLACE). Deleting visitors / host_visitors fires the existing triggers,
+which also drop them from the visits and visit_days read models; the daily
+rollups (utils/visit_rollups.py) keep counting them. The raw DELETE bypasses
+ORM listeners, so the face side is handled here: archived photos are marked
+in the face store (never released) and the archived rows are dropped from
+this process's face index - other processes drop them on their next match
+(utils/face_index.find_face_match checks the row still exists).
+
+Reads spanning archived months attach the needed files on demand, at
+most MAX_ATTACHED at a time:
+
+    for months in archive_views(conn, start='2023-01', end='2024-06'):
+        rows += conn.execute("SELECT * FROM visitors_all WHERE ...").fetchall()
+
+visitors_all / host_visitors_all / visit_logs_all / host_activity_logs_all
+/ visits_all are TEMP views over the live table UNION ALL one group of
+attached months. with_archives() does the same for a single query as CTEs
+(reports and exports on the read-only analytics engine).
+"""
+
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from config import Config
+from utils.face_store import FACE_IMAGE_TABLES, mark_archived_faces
+from utils.visits import SOURCE_TABLES as VISIT_SOURCES, VISIT_COLUMNS, VISITS_TABLE
+
+# Visit table -> (its log table, log column holding the visit id)
+VISIT_TABLES = {
+    'visitors': ('visit_logs', 'visitor_id'),
+    'host_visitors': ('host_activity_logs', 'visitor_id'),
+}
+ARCHIVED_TABLES = ('visitors', 'host_visitors', 'visit_logs', 'host_activity_logs')
+
+# Secondary indexes created in every month file
+ARCHIVE_INDEXES = {
+    'visitors': [('visit_date',), ('pass_id',), ('created_at',)],
+    'host_visitors': [('visit_date',), ('pass_id',), ('host_id', 'created_at')],
+    'visit_logs': [('visitor_id',), ('timestamp',)],
+    'host_activity_logs': [('visitor_id',), ('host_id', 'timestamp')],
+}
+
+# SQLite allows 10 attached databases by default; keep one spare
+MAX_ATTACHED = 9
+
+_FILE_PATTERN = re.compile(r'^archive_(\d{4})_(\d{2})\.db$')
+
+
+def archive_folder():
+    return Config.ARCHIVE_FOLDER
+
+
+def month_key(value):
+    """'YYYY-MM' from a date, datetime or 'YYYY-MM[-DD...]' string"""
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m')
+    return str(value)[:7]
+
+
+def archive_path(month, folder=None):
+    return os.path.join(folder or archive_folder(), f"archive_{month.replace('-', '_')}.db")
+
+
+def archived_months(start=None, end=None, folder=None):
+    """Sorted 'YYYY-MM' months that have an archive file, within [start, end]"""
+    folder = folder or archive_folder()
+    if not os.path.isdir(folder):
+        return []
+    months = []
+    for name in os.listdir(folder):
+        match = _FILE_PATTERN.match(name)
+        if match:
+            months.append(f"{match.group(1)}-{match.group(2)}")
+    if start is not None:
+        months = [month for month in months if month >= month_key(start)]
+    if end is not None:
+        months = [month for month in months if month <= month_key(end)]
+    return sorted(months)
+
+
+def _alias(month):
+    return f"archive_{month.replace('-', '_')}"
+
+
+def _table_exists(cursor, table, schema='main'):
+    cursor.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def _columns(cursor, table, schema='main'):
+    """[(name, declared type)] of schema.table"""
+    cursor.execute(f"PRAGMA {schema}.table_info({table})")
+    return [(row[1], row[2]) for row in cursor.fetchall()]
+
+
+def attach_month(conn, month, folder=None, create=False):
+    """
+    ATTACH a month's archive file and return its schema alias, or None if
+    the file does not exist and create is False. Must be called outside a
+    transaction.
+    """
+    path = archive_path(month, folder)
+    if not create and not os.path.exists(path):
+        return None
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    alias = _alias(month)
+    cursor = conn.cursor()
+    cursor.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+    cursor.close()
+    return alias
+
+
+def detach_month(conn, alias):
+    cursor = conn.cursor()
+    cursor.execute(f"DETACH DATABASE {alias}")
+    cursor.close()
+
+
+def _ensure_archive_table(cursor, alias, table):
+    """Create alias.table with the live columns, or add any it is missing"""
+    live = _columns(cursor, table)
+    if not _table_exists(cursor, table, alias):
+        definitions = ', '.join(
+            'id INTEGER PRIMARY KEY' if name == 'id' else f"{name} {sql_type}"
+            for name, sql_type in live
+        )
+        cursor.execute(f"CREATE TABLE {alias}.{table} ({definitions})")
+        for columns in ARCHIVE_INDEXES.get(table, []):
+            if all(column in dict(live) for column in columns):
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {alias}.ix_{table}_{'_'.join(columns)} "
+                    f"ON {table} ({', '.join(columns)})"
+                )
+        return
+    archived = {name for name, _ in _columns(cursor, table, alias)}
+    for name, sql_type in live:
+        if name not in archived:
+            cursor.execute(f"ALTER TABLE {alias}.{table} ADD COLUMN {name} {sql_type}")
+
+
+def _move_rows(conn, alias, moves):
+    """
+    moves: [(table, where_sql, params)], children before parents.
+    Copies every set into the archive and commits, then deletes them from
+    the live tables and commits. Returns rows moved per table.
+    """
+    cursor = conn.cursor()
+    moved = {}
+    for table, where_sql, params in moves:
+        _ensure_archive_table(cursor, alias, table)
+        columns = ', '.join(name for name, _ in _columns(cursor, table))
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {alias}.{table} ({columns}) "
+            f"SELECT {columns} FROM main.{table} WHERE {where_sql}",
+            params
+        )
+    conn.commit()
+
+    # Archived visits keep counting in the daily rollups (utils/visit_rollups.py);
+    # the marker is only visible inside this transaction
+    from utils.visit_rollups import SUPPRESS_TABLE
+    suppress = _table_exists(cursor, SUPPRESS_TABLE)
+    if suppress:
+        cursor.execute(f"INSERT INTO {SUPPRESS_TABLE} (active) VALUES (1)")
+    for table, where_sql, params in moves:
+        if table in FACE_IMAGE_TABLES and 'face_image_path' in dict(_columns(cursor, table)):
+            cursor.execute(
+                f"SELECT face_image_path FROM main.{table} WHERE ({where_sql}) "
+                f"AND face_image_path IS NOT NULL",
+                params
+            )
+            mark_archived_faces(cursor, [row[0] for row in cursor.fetchall()])
+        cursor.execute(f"DELETE FROM main.{table} WHERE {where_sql}", params)
+        moved[table] = moved.get(table, 0) + cursor.rowcount
+    if suppress:
+        cursor.execute(f"DELETE FROM {SUPPRESS_TABLE}")
+    conn.commit()
+    cursor.close()
+    return moved
+
+
+def _group_by_month(rows):
+    months = {}
+    for record_id, month in rows:
+        if month:
+            months.setdefault(month, []).append(record_id)
+    return months
+
+
+def archive_closed_visits(conn, cutoff=None, statuses=None, batch_size=None, folder=None, log=None):
+    """
+    Move closed visits whose visit date (or creation date) is before cutoff
+    - default today minus ARCHIVE_AFTER_DAYS - and their log rows into the
+    month files, then log rows older than cutoff that belong to no live
+    visit. Archived visits are dropped from this process's face index.
+    Returns {table: rows moved}.
+    """
+    from utils.face_index import FACE_SOURCES, forget_face_rows
+
+    sources = {table: source for source, table in FACE_SOURCES.items()}
+    cutoff = (cutoff or date.today() - timedelta(days=Config.ARCHIVE_AFTER_DAYS)).isoformat()
+    statuses = list(statuses or Config.ARCHIVE_CLOSED_STATUSES)
+    batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+    totals = {table: 0 for table in ARCHIVED_TABLES}
+
+    def run(month, moves):
+        alias = attach_month(conn, month, folder, create=True)
+        try:
+            for table, count in _move_rows(conn, alias, moves).items():
+                totals[table] += count
+        finally:
+            detach_month(conn, alias)
+
+    cursor = conn.cursor()
+    status_list = ', '.join('?' for _ in statuses)
+    for table, (log_table, log_column) in VISIT_TABLES.items():
+        if not _table_exists(cursor, table):
+            continue
+        has_logs = _table_exists(cursor, log_table)
+        last_id = 0
+        while True:
+            cursor.execute(
+                f"SELECT id, strftime('%Y-%m', COALESCE(visit_date, created_at)) FROM {table} "
+                f"WHERE id > ? AND status IN ({status_list}) "
+                f"AND COALESCE(visit_date, date(created_at)) < ? ORDER BY id LIMIT ?",
+                [last_id] + statuses + [cutoff, batch_size]
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            for month, ids in sorted(_group_by_month(rows).items()):
+                placeholders = ', '.join('?' for _ in ids)
+                moves = []
+                if has_logs:
+                    moves.append((log_table, f"{log_column} IN ({placeholders})", ids))
+                moves.append((table, f"id IN ({placeholders})", ids))
+                run(month, moves)
+                if table in sources:
+                    forget_face_rows((sources[table], record_id) for record_id in ids)
+            if log:
+                log(f"{table}: {totals[table]} archived")
+
+    # Log rows not tied to a live visit (logins, deleted visitors, ...)
+    for table, (log_table, log_column) in VISIT_TABLES.items():
+        if not _table_exists(cursor, log_table):
+            continue
+        last_id = 0
+        while True:
+            cursor.execute(
+                f"SELECT id, strftime('%Y-%m', timestamp) FROM {log_table} "
+                f"WHERE id > ? AND timestamp < ? AND ({log_column} IS NULL OR NOT EXISTS "
+                f"(SELECT 1 FROM {table} WHERE {table}.id = {log_table}.{log_column})) "
+                f"ORDER BY id LIMIT ?",
+                (last_id, cutoff, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            for month, ids in sorted(_group_by_month(rows).items()):
+                placeholders = ', '.join('?' for _ in ids)
+                run(month, [(log_table, f"id IN ({placeholders})", ids)])
+        if log:
+            log(f"{log_table}: {totals[log_table]} archived")
+    cursor.close()
+    return totals
+
+
+# ----------------------------------------------------------------------
+# Reading archived months
+# ----------------------------------------------------------------------
+
+def month_groups(months):
+    """months in groups of at most MAX_ATTACHED, one ATTACH round each"""
+    return [months[i:i + MAX_ATTACHED] for i in range(0, len(months), MAX_ATTACHED)]
+
+
+@contextmanager
+def attached_months(conn, months, folder=None):
+    """Attach up to MAX_ATTACHED months for the block; yields their aliases"""
+    if len(months) > MAX_ATTACHED:
+        raise ValueError(f"At most {MAX_ATTACHED} archive months can be attached at once - see month_groups()")
+    aliases = []
+    try:
+        for month in months:
+            alias = attach_month(conn, month, folder)
+            if alias is not None:
+                aliases.append(alias)
+        yield aliases
+    finally:
+        for alias in aliases:
+            detach_month(conn, alias)
+
+
+def _archived_select(cursor, table, alias, columns):
+    """SELECT of columns from alias.table (NULL for any it lacks), or None"""
+    if not _table_exists(cursor, table, alias):
+        return None
+    archived = {name for name, _ in _columns(cursor, table, alias)}
+    select_list = ', '.join(name if name in archived else f"NULL AS {name}" for name in columns)
+    return f"SELECT {select_list} FROM {alias}.{table}"
+
+
+def _visits_union_sql(cursor, aliases, live):
+    """The 'visits' read model's rows, archived visits mapped as its triggers map live ones"""
+    columns = ['source', 'source_id'] + [column for column, _, _, _ in VISIT_COLUMNS]
+    selects = [f"SELECT {', '.join(columns)} FROM main.{VISITS_TABLE}{'' if live else ' WHERE 0'}"]
+    for alias in aliases:
+        for source, table in VISIT_SOURCES.items():
+            if not _table_exists(cursor, table):
+                continue
+            rows = _archived_select(cursor, table, alias, [name for name, _ in _columns(cursor, table)])
+            if rows is None:
+                continue
+            position = 2 if source == 'visitor' else 3
+            expressions = ', '.join(f"{spec[position].format(row='t')} AS {spec[0]}" for spec in VISIT_COLUMNS)
+            selects.append(f"SELECT '{source}' AS source, t.id AS source_id, {expressions} FROM ({rows}) t")
+    return ' UNION ALL '.join(selects)
+
+
+def union_sql(cursor, table, aliases, live=True):
+    """
+    SELECT over table's live rows (none when live is False) UNION ALL its
+    rows in each attached alias, with the live columns - NULL where an older
+    month file lacks one. table may also be the 'visits' read model.
+    """
+    if table == VISITS_TABLE:
+        return _visits_union_sql(cursor, aliases, live)
+    columns = [name for name, _ in _columns(cursor, table)]
+    selects = [f"SELECT {', '.join(columns)} FROM main.{table}{'' if live else ' WHERE 0'}"]
+    for alias in aliases:
+        select = _archived_select(cursor, table, alias, columns)
+        if select is not None:
+            selects.append(select)
+    return ' UNION ALL '.join(selects)
+
+
+def with_archives(cursor, sql, aliases, live=True, tables=(VISITS_TABLE,)):
+    """
+    sql prefixed with one CTE per table shadowing it, so the unchanged query
+    reads the attached months too. Needs no TEMP objects, so it also runs
+    on the query_only analytics connections.
+    """
+    ctes = [
+        f"{table} AS ({union_sql(cursor, table, aliases, live)})"
+        for table in tables if _table_exists(cursor, table)
+    ]
+    return f"WITH {', '.join(ctes)} {sql}" if ctes else sql
+
+
+def archive_views(conn, start=None, end=None, tables=ARCHIVED_TABLES + (VISITS_TABLE,), folder=None):
+    """
+    Iterate over the archive months in [start, end] in groups of at most
+    MAX_ATTACHED (SQLite's attach limit), with TEMP views {table}_all over
+    each group. The live rows are in the first group only, so the groups'
+    rows together are every row once; an aggregate comes back per group and
+    has to be combined. Yields each group's months ([] when none are
+    archived in range).
+    """
+    months = archived_months(start, end, folder)
+    cursor = conn.cursor()
+    try:
+        for index, group in enumerate(month_groups(months) or [[]]):
+            with attached_months(conn, group, folder) as aliases:
+                views = []
+                try:
+                    for table in tables:
+                        if not _table_exists(cursor, table):
+                            continue
+                        cursor.execute(f"DROP VIEW IF EXISTS temp.{table}_all")
+                        cursor.execute(
+                            f"CREATE TEMP VIEW {table}_all AS {union_sql(cursor, table, aliases, index == 0)}"
+                        )
+                        views.append(f"{table}_all")
+                    yield group
+                finally:
+                    for view in views:
+                        cursor.execute(f"DROP VIEW IF EXISTS temp.{view}")
+    finally:
+        cursor.close()
+
+
+def read_with_archives(sql, params=(), start=None, end=None):
+    """
+    Run a read query against the app database with the {table}_all views
+    for [start, end] available; returns a list of dicts - the rows of every
+    group of months (see archive_views), so row queries get every row once.
+    """
+    from models.database import db
+
+    conn = db.engine.raw_connection()
+    try:
+        rows = []
+        for _ in archive_views(conn, start, end):
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            names = [column[0] for column in cursor.description]
+            rows += [dict(zip(names, row)) for row in cursor.fetchall()]
+            cursor.close()
+        return rows
+    finally:
+        conn.close()
+
+
+def find_archived(column, value, table='visitors', folder=None):
+    """
+    First archived row where column = value, newest month first, as a dict
+    with an extra 'archive_month' key; None if no month has it. Used when a
+    pass id / code lookup misses the live tables.
+    """
+    for month in reversed(archived_months(folder=folder)):
+        conn = sqlite3.connect(f"file:{archive_path(month, folder)}?mode=ro", uri=True)
+        try:
+            cursor = conn.cursor()
+            if not _table_exists(cursor, table):
+                continue
+            if column not in {name for name, _ in _columns(cursor, table)}:
+                continue
+            cursor.execute(f"SELECT * FROM {table} WHERE {column} = ? LIMIT 1", (value,))
+            row = cursor.fetchone()
+            if row is not None:
+                names = [description[0] for description in cursor.description]
+                result = dict(zip(names, row))
+                result['archive_month'] = month
+                return result
+        finally:
+            conn.close()
+    return None
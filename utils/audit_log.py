@@ -0,0 +1,225 @@
+"""
+Write-Behind Audit Log
+VisitLog / HostActivityLog rows used to be inserted and committed on the
+request path - one extra SQLite commit per check-in, approval or host
+action. AuditLogWriter queues the rows in memory and a background thread
+writes them with executemany in a single transaction every
+AUDIT_LOG_FLUSH_MS milliseconds or AUDIT_LOG_BATCH_SIZE entries.
+
+    log_visit(visitor.id, 'check_in', performed_by=current_user.username)
+    log_host_activity(host.id, 'approve_visitor', visitor_id=hv.id)
+
+The queue holds at most AUDIT_LOG_MAX_QUEUE entries; when it is full (or a
+failed flush left that many waiting to be retried) the caller flushes it
+itself, so entries are slowed down, never dropped. While the database keeps
+failing, that flush raises in the caller instead of buffering without bound.
+Remaining entries are flushed at interpreter exit. AUDIT_LOG_MODE='sync'
+writes every entry immediately (tests, scripts).
+"""
+
+import atexit
+import queue
+import threading
+from datetime import datetime
+
+from config import Config
+
+# table -> columns written (timestamp is always last)
+AUDIT_TABLES = {
+    'visit_logs': ('visitor_id', 'action', 'notes', 'performed_by', 'timestamp'),
+    'host_activity_logs': ('host_id', 'action', 'description', 'visitor_id', 'ip_address', 'timestamp'),
+}
+
+# Same text format SQLAlchemy's DateTime uses on SQLite
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+class AuditLogWriter:
+    """
+    Buffered writer for the audit log tables
+
+    connect is a callable returning a DB-API connection (e.g.
+    engine.raw_connection); each flush uses one connection and one
+    transaction for every queued row.
+    """
+
+    def __init__(self, connect, mode=None, flush_ms=None, batch_size=None, max_queue=None):
+        self.connect = connect
+        self.mode = mode or Config.AUDIT_LOG_MODE
+        self.flush_interval = (flush_ms or Config.AUDIT_LOG_FLUSH_MS) / 1000.0
+        self.batch_size = batch_size or Config.AUDIT_LOG_BATCH_SIZE
+        self.max_queue = max_queue or Config.AUDIT_LOG_MAX_QUEUE
+
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._retry = []
+
+        self.written = 0
+        self.flushes = 0
+        self.caller_flushes = 0
+        self.errors = 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self.mode != 'async':
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._thread.start()
+
+    def close(self):
+        """Stop the background thread and write everything still queued"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Audit log flush failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def log(self, table, values):
+        """Queue one row; values are in AUDIT_TABLES[table] order"""
+        entry = (table, tuple(values))
+        if self.mode == 'sync':
+            self._write([entry])
+            return
+        self.start()
+        while True:
+            if len(self._retry) < self.max_queue:
+                try:
+                    self._queue.put_nowait(entry)
+                    break
+                except queue.Full:
+                    pass
+            # Back-pressure: the caller pays for one flush (and sees its error)
+            self.caller_flushes += 1
+            self.flush()
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write every queued row in one transaction; returns rows written"""
+        with self._flush_lock:
+            entries, self._retry = self._retry, []
+            while True:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not entries:
+                return 0
+            try:
+                self._write(entries)
+            except Exception:
+                self.errors += 1
+                # Keep all of them for the next flush; log() stops queueing
+                # new entries while max_queue or more are waiting here
+                self._retry = entries
+                raise
+            return len(entries)
+
+    def _write(self, entries):
+        rows = {}
+        for table, values in entries:
+            rows.setdefault(table, []).append(values)
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            for table, values in rows.items():
+                columns = AUDIT_TABLES[table]
+                cursor.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' for _ in columns)})",
+                    values
+                )
+            conn.commit()
+            cursor.close()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        self.written += len(entries)
+        self.flushes += 1
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'queued': self._queue.qsize() + len(self._retry),
+            'written': self.written,
+            'flushes': self.flushes,
+            'caller_flushes': self.caller_flushes,
+            'errors': self.errors,
+        }
+
+
+def audit_timestamp(value=None):
+    """value (default now, UTC) in the text format the log tables store"""
+    return (value or datetime.utcnow()).strftime(_TIMESTAMP_FORMAT)
+
+
+# ----------------------------------------------------------------------
+# Process-wide writer
+# ----------------------------------------------------------------------
+
+_audit_log = None
+_audit_log_lock = threading.Lock()
+
+
+def init_audit_log(connect, **options):
+    """Create the process-wide writer (create_app passes db.engine.raw_connection)"""
+    global _audit_log
+    with _audit_log_lock:
+        if _audit_log is not None:
+            _audit_log.close()
+        else:
+            atexit.register(lambda: _audit_log and _audit_log.close())
+        _audit_log = AuditLogWriter(connect, **options)
+    return _audit_log
+
+
+def get_audit_log():
+    if _audit_log is None:
+        raise RuntimeError("Audit log not initialised - call init_audit_log() first")
+    return _audit_log
+
+
+def log_visit(visitor_id, action, notes=None, performed_by=None, timestamp=None):
+    """Queue a visit_logs row (VisitLog)"""
+    get_audit_log().log('visit_logs', (visitor_id, action, notes, performed_by, audit_timestamp(timestamp)))
+
+
+def log_host_activity(host_id, action, description=None, visitor_id=None, ip_address=None, timestamp=None):
+    """Queue a host_activity_logs row (HostActivityLog)"""
+    get_audit_log().log(
+        'host_activity_logs',
+        (host_id, action, description, visitor_id, ip_address, audit_timestamp(timestamp))
+    )
+
+
+def flush_audit_log():
+    """Write queued rows now, e.g. before a page that lists the logs"""
+    if _audit_log is not None:
+        return _audit_log.flush()
+    return 0
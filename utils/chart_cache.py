@@ -0,0 +1,301 @@
+"""
+Chart Cache
+Rendered analytics charts (PNG bytes) keyed by (chart type, parameters,
+data version), so a repeat dashboard load serves bytes - or a bare 304 -
+instead of building a matplotlib figure and encoding it again.
+
+    data version   data_version.version for 'visits'; SQLite triggers bump it
+                   on every INSERT / UPDATE / DELETE of visitors or
+                   host_visitors, from any worker or script, so every cached
+                   chart of older data simply stops matching
+    memory tier    LRU of CHART_CACHE_MEMORY_ITEMS charts per worker
+    disk tier      CHART_CACHE_FOLDER/<version>-<key>.png, shared by all
+                   workers and kept across restarts (CHART_CACHE_DISK_ITEMS)
+    ETag           the cache key itself, so If-None-Match is answered from
+                   the data version alone, without reading any chart
+
+Figures are built on matplotlib.figure.Figure with the Agg canvas - no
+pyplot figure registry, nothing to close, safe in threaded workers.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from config import Config
+
+DATA_VERSION_TABLE = 'data_version'
+VISITS_DATA = 'visits'
+
+SOURCE_TABLES = ('visitors', 'host_visitors')
+
+
+# ----------------------------------------------------------------------
+# Data version (bumped by triggers)
+# ----------------------------------------------------------------------
+
+def trigger_sql(name=VISITS_DATA, tables=SOURCE_TABLES):
+    bump = f"UPDATE {DATA_VERSION_TABLE} SET version = version + 1 WHERE name = '{name}';"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_data_version_{event.lower()} "
+        f"AFTER {event} ON {table} BEGIN {bump} END"
+        for table in tables
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ]
+
+
+def ensure_data_version_table(conn):
+    """Create data_version, its 'visits' row and the triggers (DB-API connection)"""
+    cursor = conn.cursor()
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {DATA_VERSION_TABLE} "
+        f"(name VARCHAR(50) PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)"
+    )
+    cursor.execute(f"INSERT OR IGNORE INTO {DATA_VERSION_TABLE} (name, version) VALUES (?, 0)", (VISITS_DATA,))
+    for table in SOURCE_TABLES:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        if cursor.fetchone() is not None:
+            for statement in trigger_sql(tables=(table,)):
+                cursor.execute(statement)
+    cursor.close()
+    conn.commit()
+
+
+def data_version(name=VISITS_DATA, conn=None):
+    """
+    Current version of name (DB-API conn, or the Flask-SQLAlchemy session).
+    None when the table is missing - callers then render without caching.
+    """
+    sql = f"SELECT version FROM {DATA_VERSION_TABLE} WHERE name = :name"
+    try:
+        if conn is not None:
+            cursor = conn.cursor()
+            cursor.execute(sql, {'name': name})
+            row = cursor.fetchone()
+            cursor.close()
+        else:
+            from sqlalchemy import text
+
+            from models.database import db
+
+            row = db.session.execute(text(sql), {'name': name}).fetchone()
+    except Exception:
+        return None
+    return row[0] if row is not None else None
+
+
+# ----------------------------------------------------------------------
+# Cache tiers
+# ----------------------------------------------------------------------
+
+def chart_key(chart_type, params, version):
+    """Hex digest identifying one rendering (also used as the ETag)"""
+    payload = json.dumps([chart_type, params or {}, version], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class ChartCache:
+    """Thread-safe LRU of key -> PNG bytes backed by a folder of PNG files"""
+
+    def __init__(self, memory_items=128, folder=None, disk_items=2000):
+        self.memory_items = memory_items
+        self.folder = folder
+        self.disk_items = disk_items
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+        self.not_modified = 0
+
+    def _path(self, key, version):
+        return os.path.join(self.folder, f"{version}-{key}.png")
+
+    def get(self, key, version):
+        """PNG bytes for key, or None on a miss in both tiers"""
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return png
+        if not self.folder:
+            return None
+        try:
+            with open(self._path(key, version), 'rb') as f:
+                png = f.read()
+        except OSError:
+            return None
+        self._remember(key, png)
+        with self._lock:
+            self.disk_hits += 1
+        return png
+
+    def put(self, key, version, png):
+        self._remember(key, png)
+        if not self.folder or self.disk_items <= 0:
+            return
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            path = self._path(key, version)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(png)
+            os.replace(temp_path, path)
+            self._prune_disk(version)
+        except OSError as e:
+            print(f"⚠️ Could not write chart cache file: {e}")
+
+    def _remember(self, key, png):
+        if self.memory_items <= 0:
+            return
+        with self._lock:
+            self._entries[key] = png
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.memory_items:
+                self._entries.popitem(last=False)
+
+    def _prune_disk(self, version):
+        """Drop files of older data versions first, then the oldest files"""
+        try:
+            names = [name for name in os.listdir(self.folder) if name.endswith('.png')]
+        except OSError:
+            return
+        if len(names) <= self.disk_items:
+            return
+        prefix = f"{version}-"
+
+        def age(name):
+            try:
+                return (name.startswith(prefix), os.path.getmtime(os.path.join(self.folder, name)))
+            except OSError:
+                return (False, 0)
+
+        for name in sorted(names, key=age)[:len(names) - self.disk_items]:
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                pass
+
+    def record(self, counter):
+        """Count a render or a 304 served without touching the cache"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+        if disk and self.folder and os.path.isdir(self.folder):
+            for name in os.listdir(self.folder):
+                if name.endswith('.png'):
+                    try:
+                        os.remove(os.path.join(self.folder, name))
+                    except OSError:
+                        pass
+
+    def stats(self):
+        with self._lock:
+            served = self.memory_hits + self.disk_hits + self.not_modified
+            requests = served + self.renders
+            return {
+                'memory_size': len(self._entries),
+                'memory_items': self.memory_items,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'not_modified': self.not_modified,
+                'renders': self.renders,
+                'hit_rate': served / requests if requests else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_chart_cache():
+    """The process-wide cache (sized from Config.CHART_CACHE_*)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ChartCache(
+                    Config.CHART_CACHE_MEMORY_ITEMS, Config.CHART_CACHE_FOLDER, Config.CHART_CACHE_DISK_ITEMS
+                )
+    return _cache
+
+
+def chart_cache_stats():
+    return get_chart_cache().stats()
+
+
+# ----------------------------------------------------------------------
+# Rendering
+# ----------------------------------------------------------------------
+
+def new_figure(width=8, height=4):
+    """Agg-backed Figure for chart renderers (draw on figure.subplots())"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(width, height), dpi=Config.CHART_CACHE_DPI)
+    FigureCanvasAgg(figure)
+    return figure
+
+
+def figure_png(figure):
+    buffer = BytesIO()
+    figure.savefig(buffer, format='png', bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def _render(cache, render, params):
+    png = figure_png(render(**(params or {})))
+    cache.record('renders')
+    return png
+
+
+def cached_chart(chart_type, params, render, version=None):
+    """
+    (png bytes, etag) for chart_type with params. render(**params) builds
+    the Figure and is only called on a miss in both tiers; version defaults
+    to the current 'visits' data version. Without a data version the chart
+    is rendered every time and etag is None.
+    """
+    cache = get_chart_cache()
+    version = data_version() if version is None else version
+    if version is None:
+        return _render(cache, render, params), None
+
+    key = chart_key(chart_type, params, version)
+    png = cache.get(key, version)
+    if png is None:
+        png = _render(cache, render, params)
+        cache.put(key, version, png)
+    return png, key
+
+
+def chart_response(chart_type, params, render):
+    """
+    Flask response for an <img src> chart endpoint: 304 when the browser's
+    If-None-Match still matches the data version, cached PNG otherwise.
+    Browsers revalidate every time (no-cache), so new visits show up at once.
+    """
+    from flask import Response, request
+
+    version = data_version()
+    etag = chart_key(chart_type, params, version) if version is not None else None
+    if etag is not None and etag in request.if_none_match:
+        get_chart_cache().record('not_modified')
+        response = Response(status=304)
+    elif etag is None:
+        response = Response(_render(get_chart_cache(), render, params), mimetype='image/png')
+    else:
+        png, etag = cached_chart(chart_type, params, render, version)
+        response = Response(png, mimetype='image/png')
+    if etag is not None:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,132 @@
+"""
+Hot Query Indexes
+Composite indexes for the security desk, host portal and analytics queries
+on visitors / host_visitors, plus an EXPLAIN QUERY PLAN check that every hot
+query is answered from an index instead of a full table scan.
+
+db.create_all() only creates the pass_id unique index, so create_app() and
+add_hot_query_indexes.py apply these to new and existing databases.
+"""
+
+# (index name, table, columns)
+HOT_QUERY_INDEXES = [
+    # Security desk: today's list, pending / checked-in filters, code lookups
+    ('ix_visitors_visit_date_status', 'visitors', ('visit_date', 'status')),
+    ('ix_visitors_status_created_at', 'visitors', ('status', 'created_at')),
+    ('ix_visitors_entry_code', 'visitors', ('entry_code',)),
+    ('ix_visitors_exit_code', 'visitors', ('exit_code',)),
+    ('ix_visitors_host_email_visit_date', 'visitors', ('host_email', 'visit_date')),
+    # Analytics: date-range scans
+    ('ix_visitors_created_at', 'visitors', ('created_at',)),
+
+    ('ix_host_visitors_visit_date_status', 'host_visitors', ('visit_date', 'status')),
+    ('ix_host_visitors_status_created_at', 'host_visitors', ('status', 'created_at')),
+    ('ix_host_visitors_entry_code', 'host_visitors', ('entry_code',)),
+    ('ix_host_visitors_exit_code', 'host_visitors', ('exit_code',)),
+    ('ix_host_visitors_host_id_created_at', 'host_visitors', ('host_id', 'created_at')),
+    ('ix_host_visitors_created_at', 'host_visitors', ('created_at',)),
+
+    ('ix_visit_logs_visitor_id_timestamp', 'visit_logs', ('visitor_id', 'timestamp')),
+    ('ix_host_activity_logs_host_id_timestamp', 'host_activity_logs', ('host_id', 'timestamp')),
+    # Keyset pagination (utils/pagination.py) seeks on (timestamp, id)
+    ('ix_visit_logs_timestamp', 'visit_logs', ('timestamp',)),
+    ('ix_host_activity_logs_timestamp', 'host_activity_logs', ('timestamp',)),
+]
+
+# (description, SQL) - every one must use an index
+HOT_QUERIES = [
+    ("visitors expected today",
+     "SELECT * FROM visitors WHERE visit_date = '2025-01-01' ORDER BY visit_time"),
+    ("visitors by status today",
+     "SELECT * FROM visitors WHERE visit_date = '2025-01-01' AND status = 'approved'"),
+    ("visitors by status, newest first",
+     "SELECT * FROM visitors WHERE status = 'checked_in' ORDER BY created_at DESC"),
+    ("visitor by entry code",
+     "SELECT * FROM visitors WHERE entry_code = '1234'"),
+    ("visitor by exit code",
+     "SELECT * FROM visitors WHERE exit_code = '1234'"),
+    ("visitors for a host",
+     "SELECT * FROM visitors WHERE host_email = 'host@example.com' ORDER BY visit_date DESC"),
+    ("visitors created in a range",
+     "SELECT COUNT(*) FROM visitors WHERE created_at >= '2025-01-01' AND created_at < '2025-02-01'"),
+
+    ("host visitors expected today",
+     "SELECT * FROM host_visitors WHERE visit_date = '2025-01-01' ORDER BY visit_time"),
+    ("host visitors by status, newest first",
+     "SELECT * FROM host_visitors WHERE status = 'checked_in' ORDER BY created_at DESC"),
+    ("host visitor by entry code",
+     "SELECT * FROM host_visitors WHERE entry_code = '1234'"),
+    ("host visitor by exit code",
+     "SELECT * FROM host_visitors WHERE exit_code = '1234'"),
+    ("host's own visitors",
+     "SELECT * FROM host_visitors WHERE host_id = 1 ORDER BY created_at DESC"),
+    ("host visitors created in a range",
+     "SELECT COUNT(*) FROM host_visitors WHERE created_at >= '2025-01-01' AND created_at < '2025-02-01'"),
+
+    ("visit log of a visitor",
+     "SELECT * FROM visit_logs WHERE visitor_id = 1 ORDER BY timestamp DESC"),
+    ("host activity log",
+     "SELECT * FROM host_activity_logs WHERE host_id = 1 ORDER BY timestamp DESC"),
+
+    # Keyset pages: seek past the last (created_at | timestamp, id) seen
+    ("visitors page after cursor",
+     "SELECT * FROM visitors WHERE created_at < '2025-01-01' OR (created_at = '2025-01-01' AND id < 100) "
+     "ORDER BY created_at DESC, id DESC LIMIT 51"),
+    ("host visitors page after cursor",
+     "SELECT * FROM host_visitors WHERE created_at < '2025-01-01' OR (created_at = '2025-01-01' AND id < 100) "
+     "ORDER BY created_at DESC, id DESC LIMIT 51"),
+    ("visit logs page after cursor",
+     "SELECT * FROM visit_logs WHERE timestamp < '2025-01-01' OR (timestamp = '2025-01-01' AND id < 100) "
+     "ORDER BY timestamp DESC, id DESC LIMIT 51"),
+    ("host activity page after cursor",
+     "SELECT * FROM host_activity_logs WHERE timestamp < '2025-01-01' OR (timestamp = '2025-01-01' AND id < 100) "
+     "ORDER BY timestamp DESC, id DESC LIMIT 51"),
+]
+
+
+def _table_columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def ensure_indexes(conn):
+    """
+    Create every hot-query index whose table and columns exist (DB-API
+    connection). Returns the names of the indexes that were applied.
+    """
+    cursor = conn.cursor()
+    columns_by_table = {}
+    applied = []
+    for name, table, columns in HOT_QUERY_INDEXES:
+        if table not in columns_by_table:
+            columns_by_table[table] = _table_columns(cursor, table)
+        if not set(columns) <= columns_by_table[table]:
+            continue
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+        applied.append(name)
+    cursor.close()
+    conn.commit()
+    return applied
+
+
+def explain(conn, sql):
+    """EXPLAIN QUERY PLAN detail lines for a statement"""
+    cursor = conn.cursor()
+    cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+    details = [row[-1] for row in cursor.fetchall()]
+    cursor.close()
+    return details
+
+
+def uses_index(details):
+    """False if any step is a full table scan (SCAN without an index)"""
+    for detail in details:
+        if detail.startswith('SCAN') and 'INDEX' not in detail:
+            return False
+    return any('INDEX' in detail for detail in details)
+
+
+def check_query_plans(conn, queries=HOT_QUERIES):
+    """Return (description, uses_index, plan details) for every hot query"""
+    return [(description, uses_index(plan), plan)
+            for description, plan in ((d, explain(conn, sql)) for d, sql in queries)]
@@ -0,0 +1,228 @@
+"""
+Approximate Nearest-Neighbour Face Search
+IVF (inverted file) clustering with optional product quantization, pure NumPy.
+
+The IVF index never owns the face vectors - it refers to row slots of the
+FaceIndex matrix and is handed that matrix at search time, so the top-k
+candidates are always re-ranked with exact float32 distances.
+"""
+
+import numpy as np
+
+_TRAIN_POINTS_PER_LIST = 32
+_KMEANS_ITERATIONS = 8
+_PQ_CENTROIDS = 256
+
+
+def _nearest(data, centroids, chunk_size=16384):
+    """Index of the closest centroid for every row of data"""
+    c_norms = np.einsum('ij,ij->i', centroids, centroids)
+    result = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), chunk_size):
+        block = data[start:start + chunk_size]
+        # |x|^2 is constant per row and does not change the argmin
+        scores = c_norms[None, :] - 2.0 * (block @ centroids.T)
+        result[start:start + chunk_size] = np.argmin(scores, axis=1)
+    return result
+
+
+def _kmeans(data, k, rng, iterations=_KMEANS_ITERATIONS):
+    """Plain Lloyd's k-means; empty clusters are re-seeded from random points"""
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assign = _nearest(data, centroids)
+        order = np.argsort(assign, kind='stable')
+        counts = np.bincount(assign, minlength=k)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        sums = np.add.reduceat(data[order], starts, axis=0)
+        centroids[filled] = sums / counts[filled, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index over FaceIndex row slots
+
+    nlist clusters are trained with k-means; a query probes the nprobe
+    closest clusters. With pq_subquantizers > 0 each row additionally keeps a
+    product-quantized code of its residual, so candidates are scored from
+    lookup tables before the exact re-rank of the best rerank_top_k.
+    """
+
+    def __init__(self, nlist, nprobe, pq_subquantizers=0, rerank_top_k=50, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_subquantizers = pq_subquantizers
+        self.rerank_top_k = rerank_top_k
+        self._rng = np.random.default_rng(seed)
+
+        self.centroids = None
+        self.codebooks = None
+        self.trained_size = 0
+        self._lists = []
+        self._list_arrays = []
+        self._list_of_slot = np.empty(0, dtype=np.int32)
+        self._codes = None
+
+    @property
+    def stale(self):
+        """True once the index has more than doubled since training"""
+        size = sum(len(members) for members in self._lists)
+        return size > 2 * max(self.trained_size, 1)
+
+    # ------------------------------------------------------------------
+    # Training / building
+    # ------------------------------------------------------------------
+
+    def build(self, matrix):
+        """Train on the populated rows of the FaceIndex matrix and assign them"""
+        count, dimension = matrix.shape
+        if self.pq_subquantizers and dimension % self.pq_subquantizers:
+            raise ValueError(
+                f"FACE_PQ_SUBQUANTIZERS={self.pq_subquantizers} must divide "
+                f"the encoding dimension {dimension}"
+            )
+
+        sample_size = min(count, self.nlist * _TRAIN_POINTS_PER_LIST)
+        sample = matrix[self._rng.choice(count, sample_size, replace=False)]
+        self.centroids = _kmeans(sample, self.nlist, self._rng)
+        self.nlist = len(self.centroids)
+
+        if self.pq_subquantizers:
+            pq_sample = sample[:_PQ_CENTROIDS * _TRAIN_POINTS_PER_LIST]
+            residuals = pq_sample - self.centroids[_nearest(pq_sample, self.centroids)]
+            self.codebooks = np.stack([
+                self._pad_codebook(_kmeans(part, _PQ_CENTROIDS, self._rng))
+                for part in self._split(residuals)
+            ])
+
+        assign = _nearest(matrix, self.centroids)
+        self._list_of_slot = assign.astype(np.int32)
+        self._lists = [[] for _ in range(self.nlist)]
+        for slot, list_id in enumerate(assign.tolist()):
+            self._lists[list_id].append(slot)
+        self._list_arrays = [None] * self.nlist
+
+        if self.pq_subquantizers:
+            self._codes = self._encode(matrix, assign)
+        self.trained_size = count
+
+    def _split(self, vectors):
+        return np.split(vectors, self.pq_subquantizers, axis=1)
+
+    @staticmethod
+    def _pad_codebook(codebook):
+        # Small training sets give fewer than 256 codewords; repeat to keep shape
+        if len(codebook) < _PQ_CENTROIDS:
+            repeat = -(-_PQ_CENTROIDS // len(codebook))
+            codebook = np.tile(codebook, (repeat, 1))[:_PQ_CENTROIDS]
+        return codebook
+
+    def _encode(self, vectors, list_ids):
+        residuals = vectors - self.centroids[list_ids]
+        codes = np.empty((len(vectors), self.pq_subquantizers), dtype=np.uint8)
+        for m, part in enumerate(self._split(residuals)):
+            codes[:, m] = _nearest(part, self.codebooks[m])
+        return codes
+
+    # ------------------------------------------------------------------
+    # Incremental maintenance (mirrors FaceIndex slot changes)
+    # ------------------------------------------------------------------
+
+    def _grow(self, slot):
+        if slot < len(self._list_of_slot):
+            return
+        size = max(2 * len(self._list_of_slot), slot + 1, 1024)
+        grown = np.full(size, -1, dtype=np.int32)
+        grown[:len(self._list_of_slot)] = self._list_of_slot
+        self._list_of_slot = grown
+        if self._codes is not None:
+            codes = np.zeros((size, self.pq_subquantizers), dtype=np.uint8)
+            codes[:len(self._codes)] = self._codes
+            self._codes = codes
+
+    def add(self, slot, vector):
+        """Assign a new or replaced FaceIndex row to its closest cluster"""
+        if slot < len(self._list_of_slot) and self._list_of_slot[slot] >= 0:
+            self.remove(slot)
+        self._grow(slot)
+        list_id = int(_nearest(vector[None, :], self.centroids)[0])
+        self._list_of_slot[slot] = list_id
+        self._lists[list_id].append(slot)
+        self._list_arrays[list_id] = None
+        if self._codes is not None:
+            self._codes[slot] = self._encode(vector[None, :], np.array([list_id]))[0]
+
+    def remove(self, slot):
+        list_id = int(self._list_of_slot[slot])
+        self._lists[list_id].remove(slot)
+        self._list_arrays[list_id] = None
+        self._list_of_slot[slot] = -1
+
+    def move(self, old_slot, new_slot):
+        """FaceIndex moved its last row from old_slot into new_slot"""
+        list_id = int(self._list_of_slot[old_slot])
+        members = self._lists[list_id]
+        members[members.index(old_slot)] = new_slot
+        self._list_arrays[list_id] = None
+        self._list_of_slot[new_slot] = list_id
+        self._list_of_slot[old_slot] = -1
+        if self._codes is not None:
+            self._codes[new_slot] = self._codes[old_slot]
+
+    def _members(self, list_id):
+        members = self._list_arrays[list_id]
+        if members is None:
+            members = np.array(self._lists[list_id], dtype=np.int64)
+            self._list_arrays[list_id] = members
+        return members
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(self, query, matrix):
+        """
+        Return (slot, distance) of the best candidate, or None if the probed
+        clusters are empty. distance is exact Euclidean.
+        """
+        coarse = np.einsum('ij,ij->i', self.centroids, self.centroids) - 2.0 * (self.centroids @ query)
+        nprobe = min(self.nprobe, self.nlist)
+        probe = np.argpartition(coarse, nprobe - 1)[:nprobe]
+
+        if self._codes is not None:
+            # Distance tables for every probed list at once: (nprobe, m, 256)
+            residuals = (query - self.centroids[probe]).reshape(nprobe, self.pq_subquantizers, 1, -1)
+            tables = ((self.codebooks[None, :, :, :] - residuals) ** 2).sum(axis=3)
+            subspaces = np.arange(self.pq_subquantizers)
+
+        candidate_blocks = []
+        score_blocks = []
+        for position, list_id in enumerate(probe):
+            members = self._members(list_id)
+            if not len(members):
+                continue
+            candidate_blocks.append(members)
+            if self._codes is not None:
+                codes = self._codes[members]
+                score_blocks.append(tables[position][subspaces, codes].sum(axis=1))
+
+        if not candidate_blocks:
+            return None
+        candidates = np.concatenate(candidate_blocks)
+
+        if self._codes is not None:
+            scores = np.concatenate(score_blocks)
+            top_k = min(self.rerank_top_k, len(candidates))
+            candidates = candidates[np.argpartition(scores, top_k - 1)[:top_k]]
+
+        # Exact re-rank on the float32 rows
+        diffs = matrix[candidates] - query
+        exact = np.einsum('ij,ij->i', diffs, diffs)
+        best = int(np.argmin(exact))
+        return int(candidates[best]), float(np.sqrt(exact[best]))
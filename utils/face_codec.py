@@ -0,0 +1,131 @@
+"""
+Face Encoding Codec
+Binary float32 little-endian storage for face encodings.
+
+Layout of a face_encoding_blob value:
+    bytes 0-3   magic b'FENC'
+    bytes 4-5   format version (uint16, little-endian)
+    bytes 6-7   dimension (uint16, little-endian)
+    bytes 8-    dimension x float32, little-endian
+"""
+
+import struct
+import threading
+
+import numpy as np
+
+BLOB_COLUMN = 'face_encoding_blob'
+VERSION_COLUMN = 'face_model_version'
+BLOB_MAGIC = b'FENC'
+BLOB_VERSION = 1
+
+_HEADER = struct.Struct('<4sHH')
+HEADER_SIZE = _HEADER.size
+_FLOAT32_LE = np.dtype('<f4')
+
+
+def encode_face_blob(encoding):
+    """Pack an encoding (list / ndarray) into a versioned float32 blob"""
+    vector = np.asarray(encoding, dtype=_FLOAT32_LE).reshape(-1)
+    return _HEADER.pack(BLOB_MAGIC, BLOB_VERSION, vector.shape[0]) + vector.tobytes()
+
+
+def decode_face_blob(blob):
+    """
+    Read a face_encoding_blob value back as a float32 array.
+
+    The array is a read-only view over the blob's buffer - no copy is made.
+    """
+    if blob is None:
+        return None
+    magic, version, dimension = _HEADER.unpack_from(blob)
+    if magic != BLOB_MAGIC:
+        raise ValueError("Not a face encoding blob")
+    if version != BLOB_VERSION:
+        raise ValueError(f"Unsupported face encoding blob version: {version}")
+    if len(blob) != HEADER_SIZE + dimension * _FLOAT32_LE.itemsize:
+        raise ValueError("Truncated face encoding blob")
+    return np.frombuffer(blob, dtype=_FLOAT32_LE, count=dimension, offset=HEADER_SIZE)
+
+
+def has_column(conn, table, column):
+    """True if column exists on table (DB-API connection)"""
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = [row[1] for row in cursor.fetchall()]
+    cursor.close()
+    return column in columns
+
+
+def has_blob_column(conn, table):
+    """True if the binary encoding column exists on table (DB-API connection)"""
+    return has_column(conn, table, BLOB_COLUMN)
+
+
+_listeners_lock = threading.Lock()
+_registered_models = set()
+
+
+def register_face_blob_listeners(visitor_model, host_visitor_model):
+    """
+    Write face_encoding_blob alongside face_encoding on every insert/update.
+
+    The update runs on the flush connection, so the blob is committed in the
+    same transaction as the visit row. New encodings come from the current
+    model, so face_model_version is stamped in the same statement. Tables that
+    have not been migrated yet are left alone. Safe to call once per
+    create_app(): every listener is registered once.
+    """
+    from sqlalchemy import event, inspect, text
+
+    from utils.face_engine import model_version
+    from utils.face_index import decode_text_encoding
+
+    # Only complete tables are remembered: a column added by a migration
+    # while this process runs is picked up on the next write
+    columns_present = {}
+
+    def write_blob(connection, target, table):
+        columns = columns_present.get(table)
+        if columns is None:
+            raw = connection.connection
+            columns = [
+                column for column in (BLOB_COLUMN, VERSION_COLUMN)
+                if has_column(raw, table, column)
+            ]
+            if len(columns) == 2:
+                columns_present[table] = columns
+        if not columns:
+            return
+        try:
+            encoding = decode_text_encoding(target.face_encoding)
+        except ValueError:
+            encoding = None
+        values = {
+            BLOB_COLUMN: encode_face_blob(encoding) if encoding is not None else None,
+            VERSION_COLUMN: model_version() if encoding is not None else None,
+        }
+        assignments = ', '.join(f"{column} = :{column}" for column in columns)
+        params = {column: values[column] for column in columns}
+        params['id'] = target.id
+        connection.execute(text(f"UPDATE {table} SET {assignments} WHERE id = :id"), params)
+
+    def make_listeners(table):
+        def on_insert(mapper, connection, target):
+            if target.face_encoding:
+                write_blob(connection, target, table)
+
+        def on_update(mapper, connection, target):
+            if inspect(target).attrs.face_encoding.history.has_changes():
+                write_blob(connection, target, table)
+
+        return on_insert, on_update
+
+    with _listeners_lock:
+        for model in (visitor_model, host_visitor_model):
+            if model in _registered_models:
+                continue
+            _registered_models.add(model)
+            on_insert, on_update = make_listeners(model.__tablename__)
+            event.listen(model, 'after_insert', on_insert)
+            event.listen(model, 'after_update', on_update)
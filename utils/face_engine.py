@@ -0,0 +1,212 @@
+"""
+Face Detection and Encoding Engine
+Turns uploaded image bytes into a face encoding.
+
+Backends (Config.FACE_ENCODER_BACKEND):
+    'histogram' - Haar cascade detection + the 258-value encoding every stored
+                  face has: 256-bin grey-level histogram of the 128x128 face
+                  plus its mean and standard deviation (default)
+    'opencv'    - Haar cascade detection + 128-bin LBP histogram. Not
+                  comparable with 'histogram' encodings: switching to it
+                  needs every face re-enrolled (reencode_faces.py), and it
+                  matches with its own FACE_LBP_TOLERANCE
+    'deepface'  - deepface detector + embedding model (requirements_deepface.txt),
+                  also needs re-enrolment; matches with FACE_DEEPFACE_TOLERANCE
+
+A FaceModel loads its detector / network once; callers keep it around
+(one per worker process) instead of rebuilding it per request.
+"""
+
+import numpy as np
+
+from config import Config
+from utils.lazy_imports import DeepFace, cv2
+
+# FACE_DETECTION_MODEL -> deepface detector backend
+DEEPFACE_DETECTORS = {
+    'hog': 'opencv',
+    'cnn': 'mtcnn',
+}
+
+_ENCODING_SIZE = 128
+
+# Side of the square grey face crop the 'histogram' encoding is taken from
+_HISTOGRAM_FACE_SIZE = 128
+
+# Version of the 'histogram' encodings - including every row stored before
+# face_model_version existed
+HISTOGRAM_MODEL_VERSION = 'histogram258-haar'
+
+
+class NoFaceDetected(ValueError):
+    """Raised when an image does not contain a usable face"""
+
+
+def decode_image(image_bytes):
+    """Decode JPEG/PNG bytes into a BGR ndarray"""
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image")
+    return image
+
+
+def prescale_for_detection(image, max_dimension=None):
+    """
+    Downscale an image so its longer side is at most max_dimension.
+
+    Returns (small_image, scale) where scale maps small coordinates back to
+    the original (original = small / scale). max_dimension=0 disables it.
+    """
+    if max_dimension is None:
+        max_dimension = Config.FACE_DETECTION_MAX_DIMENSION
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if not max_dimension or longest <= max_dimension:
+        return image, 1.0
+    scale = max_dimension / longest
+    small = cv2.resize(
+        image, (max(int(width * scale), 1), max(int(height * scale), 1)),
+        interpolation=cv2.INTER_AREA
+    )
+    return small, scale
+
+
+def model_version(detection_model=None, backend=None):
+    """Version tag of the embeddings a FaceModel with these settings produces"""
+    detection_model = detection_model or Config.FACE_DETECTION_MODEL
+    backend = backend or Config.FACE_ENCODER_BACKEND
+    if backend == 'deepface':
+        detector = DEEPFACE_DETECTORS.get(detection_model, 'opencv')
+        return f"deepface-{Config.DEEPFACE_MODEL_NAME}-{detector}"
+    if backend == 'opencv':
+        return f"opencv-lbp{_ENCODING_SIZE}-haar"
+    return HISTOGRAM_MODEL_VERSION
+
+
+def match_tolerance(backend=None):
+    """Euclidean match distance for the encodings backend produces"""
+    backend = backend or Config.FACE_ENCODER_BACKEND
+    if backend == 'deepface':
+        return Config.FACE_DEEPFACE_TOLERANCE
+    if backend == 'opencv':
+        return Config.FACE_LBP_TOLERANCE
+    return Config.FACE_RECOGNITION_TOLERANCE
+
+
+class FaceModel:
+    """Detector + encoder loaded once and reused for every image"""
+
+    def __init__(self, detection_model=None, backend=None):
+        self.detection_model = detection_model or Config.FACE_DETECTION_MODEL
+        self.backend = backend or Config.FACE_ENCODER_BACKEND
+
+        if self.backend == 'deepface':
+            self._deepface = DeepFace
+            self._detector_backend = DEEPFACE_DETECTORS.get(self.detection_model, 'opencv')
+            # Builds and caches the network inside deepface
+            DeepFace.build_model(Config.DEEPFACE_MODEL_NAME)
+        elif self.backend in ('histogram', 'opencv'):
+            self._cv2 = cv2
+            self._cascade = cv2.CascadeClassifier(
+                cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+            )
+        else:
+            raise ValueError(f"Unknown face encoder backend: {self.backend}")
+
+    @property
+    def version(self):
+        """Identifies which model produced an embedding"""
+        return model_version(self.detection_model, self.backend)
+
+    # ------------------------------------------------------------------
+    # Detection
+    # ------------------------------------------------------------------
+
+    def detect(self, image):
+        """Return face boxes (x, y, w, h), largest first"""
+        if self.backend == 'deepface':
+            faces = self._deepface.extract_faces(
+                img_path=image,
+                detector_backend=self._detector_backend,
+                enforce_detection=False,
+            )
+            boxes = [
+                (f['facial_area']['x'], f['facial_area']['y'],
+                 f['facial_area']['w'], f['facial_area']['h'])
+                for f in faces if f.get('confidence', 1) > 0
+            ]
+        else:
+            gray = self._cv2.cvtColor(image, self._cv2.COLOR_BGR2GRAY)
+            found = self._cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(40, 40))
+            boxes = [tuple(int(v) for v in box) for box in found]
+        return sorted(boxes, key=lambda b: b[2] * b[3], reverse=True)
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+
+    def encode_face(self, face_image):
+        """Encode an already cropped face image"""
+        if self.backend == 'deepface':
+            result = self._deepface.represent(
+                img_path=face_image,
+                model_name=Config.DEEPFACE_MODEL_NAME,
+                detector_backend='skip',
+                enforce_detection=False,
+            )
+            return np.asarray(result[0]['embedding'], dtype=np.float32)
+        if self.backend == 'histogram':
+            return self._encode_histogram(face_image)
+
+        cv2 = self._cv2
+        gray = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY) if face_image.ndim == 3 else face_image
+        gray = cv2.equalizeHist(cv2.resize(gray, (96, 96), interpolation=cv2.INTER_AREA))
+        # 8-neighbour local binary pattern codes, histogrammed over a 4x2 grid
+        center = gray[1:-1, 1:-1]
+        codes = np.zeros_like(center, dtype=np.uint8)
+        offsets = [(-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1)]
+        for bit, (dy, dx) in enumerate(offsets):
+            neighbour = gray[1 + dy:gray.shape[0] - 1 + dy, 1 + dx:gray.shape[1] - 1 + dx]
+            codes |= (neighbour >= center).astype(np.uint8) << bit
+        cells = []
+        for band in np.array_split(codes, 4, axis=0):
+            for cell in np.array_split(band, 2, axis=1):
+                cells.append(np.bincount((cell >> 4).ravel(), minlength=16))
+        encoding = np.concatenate(cells).astype(np.float32)
+        return encoding / (np.linalg.norm(encoding) or 1.0)
+
+    def _encode_histogram(self, face_image):
+        cv2 = self._cv2
+        gray = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY) if face_image.ndim == 3 else face_image
+        gray = cv2.resize(gray, (_HISTOGRAM_FACE_SIZE, _HISTOGRAM_FACE_SIZE), interpolation=cv2.INTER_AREA)
+        histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float32) / gray.size
+        return np.concatenate([histogram, [gray.mean(), gray.std()]]).astype(np.float32)
+
+    def detect_scaled(self, image, max_dimension=None):
+        """
+        Detect on a downscaled copy (detection time grows with pixel count)
+        and return boxes in original image coordinates, largest first
+        """
+        small, scale = prescale_for_detection(image, max_dimension)
+        boxes = self.detect(small)
+        if scale == 1.0:
+            return boxes
+        height, width = image.shape[:2]
+        scaled = []
+        for x, y, w, h in boxes:
+            x0, y0 = max(int(x / scale), 0), max(int(y / scale), 0)
+            x1, y1 = min(int((x + w) / scale + 0.5), width), min(int((y + h) / scale + 0.5), height)
+            scaled.append((x0, y0, x1 - x0, y1 - y0))
+        return scaled
+
+    def encode_image(self, image, max_dimension=None):
+        """Detect the largest face in a BGR image and encode the full-resolution crop"""
+        boxes = self.detect_scaled(image, max_dimension)
+        if not boxes:
+            raise NoFaceDetected("No face detected in image")
+        x, y, w, h = boxes[0]
+        return self.encode_face(image[max(y, 0):y + h, max(x, 0):x + w])
+
+    def encode_image_bytes(self, image_bytes, max_dimension=None):
+        return self.encode_image(decode_image(image_bytes), max_dimension)
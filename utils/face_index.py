@@ -0,0 +1,465 @@
+"""
+Face Match Index
+Keeps every stored face encoding in one contiguous float32 matrix so a lookup
+is a single batched distance computation instead of a per-row decode + compare.
+"""
+
+import json
+import threading
+
+import numpy as np
+
+from config import Config
+
+# Source name -> table holding face encodings
+FACE_SOURCES = {
+    'visitor': 'visitors',
+    'host_visitor': 'host_visitors',
+}
+
+_INITIAL_CAPACITY = 1024
+
+
+def decode_text_encoding(value):
+    """Decode a face_encoding TEXT value ("[0.1, 0.2, ...]") into float32"""
+    if value is None:
+        return None
+    value = value.strip()
+    if not value:
+        return None
+    if value.startswith('['):
+        return np.asarray(json.loads(value), dtype=np.float32)
+    return np.array([float(v) for v in value.split(',')], dtype=np.float32)
+
+
+class FaceIndex:
+    """
+    In-memory face encoding index keyed by (source, record_id)
+
+    Rows live in a pre-allocated float32 matrix together with their squared
+    norms. Removing a row moves the last row into the freed slot, so the
+    populated part of the matrix always stays contiguous.
+
+    With engine='ivf' and at least Config.FACE_ANN_MIN_FACES rows, lookups go
+    through an IVF(-PQ) index over the same matrix (see utils.face_ann).
+    """
+
+    def __init__(self, dimension=None, engine=None):
+        self._lock = threading.RLock()
+        self._matrix = None
+        self._sq_norms = None
+        self._keys = []
+        self._slots = {}
+        self._ann = None
+        self.engine = engine or Config.FACE_MATCH_ENGINE
+        self.dimension = dimension
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def _ensure_capacity(self, needed):
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if needed <= capacity:
+            return
+
+        new_capacity = max(_INITIAL_CAPACITY, capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+
+        matrix = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+        sq_norms = np.zeros(new_capacity, dtype=np.float32)
+        count = len(self._keys)
+        if count:
+            matrix[:count] = self._matrix[:count]
+            sq_norms[:count] = self._sq_norms[:count]
+        self._matrix = matrix
+        self._sq_norms = sq_norms
+
+    def _query_vector(self, encoding):
+        """encoding as float32, or None when it does not fit the index"""
+        vector = np.asarray(encoding, dtype=np.float32).reshape(-1)
+        if self.dimension is not None and vector.shape[0] != self.dimension:
+            return None
+        return vector
+
+    def _as_vector(self, encoding):
+        vector = np.asarray(encoding, dtype=np.float32).reshape(-1)
+        if self.dimension is None:
+            self.dimension = vector.shape[0]
+        elif vector.shape[0] != self.dimension:
+            raise ValueError(
+                f"Face encoding has {vector.shape[0]} values, index expects {self.dimension}"
+            )
+        return vector
+
+    def load(self, rows):
+        """Replace the index contents with (source, record_id, encoding) rows"""
+        keys = []
+        vectors = []
+        for source, record_id, encoding in rows:
+            if encoding is None:
+                continue
+            keys.append((source, int(record_id)))
+            vectors.append(np.asarray(encoding, dtype=np.float32).reshape(-1))
+
+        with self._lock:
+            self._matrix = None
+            self._sq_norms = None
+            self._keys = []
+            self._slots = {}
+            if vectors:
+                self.dimension = vectors[0].shape[0]
+                # Drop rows with a foreign dimension instead of failing the whole load
+                kept = [(k, v) for k, v in zip(keys, vectors) if v.shape[0] == self.dimension]
+                self._ensure_capacity(len(kept))
+                for slot, (key, vector) in enumerate(kept):
+                    self._matrix[slot] = vector
+                    self._keys.append(key)
+                    self._slots[key] = slot
+                count = len(self._keys)
+                self._sq_norms[:count] = np.einsum(
+                    'ij,ij->i', self._matrix[:count], self._matrix[:count]
+                )
+            self._ann = None
+            self.loaded = True
+            self.build_ann()
+
+    def build_ann(self):
+        """(Re)train the approximate index when the engine and size call for it"""
+        from utils.face_ann import IVFIndex
+
+        with self._lock:
+            count = len(self._keys)
+            if self.engine != 'ivf' or count < max(Config.FACE_ANN_MIN_FACES, 1):
+                self._ann = None
+                return False
+            nlist = Config.FACE_IVF_NLIST or int(4 * np.sqrt(count))
+            ann = IVFIndex(
+                nlist=nlist,
+                nprobe=Config.FACE_IVF_NPROBE,
+                pq_subquantizers=Config.FACE_PQ_SUBQUANTIZERS,
+                rerank_top_k=Config.FACE_ANN_RERANK_TOP_K,
+            )
+            ann.build(self._matrix[:count])
+            self._ann = ann
+            return True
+
+    def add(self, source, record_id, encoding):
+        """Insert or replace the encoding stored for one visit"""
+        key = (source, int(record_id))
+        with self._lock:
+            vector = self._as_vector(encoding)
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = len(self._keys)
+                self._ensure_capacity(slot + 1)
+                self._keys.append(key)
+                self._slots[key] = slot
+            self._matrix[slot] = vector
+            self._sq_norms[slot] = float(vector @ vector)
+            if self._ann is not None:
+                self._ann.add(slot, vector)
+            if self.engine == 'ivf' and (self._ann is None or self._ann.stale):
+                # Crossing the size threshold or doubling since training
+                self.build_ann()
+
+    def remove(self, source, record_id):
+        """Drop one visit from the index; returns False if it was not indexed"""
+        key = (source, int(record_id))
+        with self._lock:
+            slot = self._slots.pop(key, None)
+            if slot is None:
+                return False
+            last = len(self._keys) - 1
+            if self._ann is not None:
+                self._ann.remove(slot)
+            if slot != last:
+                last_key = self._keys[last]
+                self._matrix[slot] = self._matrix[last]
+                self._sq_norms[slot] = self._sq_norms[last]
+                self._keys[slot] = last_key
+                self._slots[last_key] = slot
+                if self._ann is not None:
+                    self._ann.move(last, slot)
+            self._keys.pop()
+            return True
+
+    # ------------------------------------------------------------------
+    # Searching
+    # ------------------------------------------------------------------
+
+    def distances(self, encoding):
+        """Euclidean distance from encoding to every indexed row"""
+        with self._lock:
+            count = len(self._keys)
+            if not count:
+                return np.empty(0, dtype=np.float32)
+            query = self._query_vector(encoding)
+            if query is None:
+                return np.full(count, np.inf, dtype=np.float32)
+            matrix = self._matrix[:count]
+            sq = self._sq_norms[:count] - 2.0 * (matrix @ query) + float(query @ query)
+        np.maximum(sq, 0.0, out=sq)
+        return np.sqrt(sq, out=sq)
+
+    def best_match(self, encoding, tolerance=None):
+        """
+        Return (source, record_id, distance) of the closest stored face within
+        tolerance, or None when nothing is close enough (or the query comes
+        from a model with another dimension)
+        """
+        if tolerance is None:
+            from utils.face_engine import match_tolerance
+            tolerance = match_tolerance()
+
+        with self._lock:
+            count = len(self._keys)
+            if not count:
+                return None
+            query = self._query_vector(encoding)
+            if query is None:
+                return None
+            matrix = self._matrix[:count]
+            if self._ann is not None:
+                found = self._ann.search(query, matrix)
+                if found is None:
+                    return None
+                slot, distance = found
+            else:
+                sq = self._sq_norms[:count] - 2.0 * (matrix @ query) + float(query @ query)
+                slot = int(np.argmin(sq))
+                # Recompute the winner directly - the norm expansion loses precision
+                distance = float(np.linalg.norm(matrix[slot] - query))
+            key = self._keys[slot]
+
+        if distance > tolerance:
+            return None
+        return key[0], key[1], distance
+
+
+# ----------------------------------------------------------------------
+# Process-wide index
+# ----------------------------------------------------------------------
+
+_face_index = None
+_face_index_lock = threading.Lock()
+
+
+def iter_stored_encodings(conn, version=None):
+    """
+    Yield (source, record_id, encoding) for every stored face on a DB-API
+    connection. The binary face_encoding_blob column is used when present,
+    with the TEXT column as fallback for rows not yet migrated.
+
+    Once a table has a face_model_version column, only rows produced by the
+    current model (or version, if given) are returned - embeddings from
+    different models are not comparable. Rows without a version predate the
+    column and count as the default histogram encoder's.
+    """
+    from utils.face_codec import (
+        BLOB_COLUMN, VERSION_COLUMN, decode_face_blob, has_blob_column, has_column
+    )
+    from utils.face_engine import HISTOGRAM_MODEL_VERSION, model_version
+
+    version = version or model_version()
+    cursor = conn.cursor()
+    for source, table in FACE_SOURCES.items():
+        if has_blob_column(conn, table):
+            sql = (
+                f"SELECT id, {BLOB_COLUMN}, "
+                f"CASE WHEN {BLOB_COLUMN} IS NULL THEN face_encoding END "
+                f"FROM {table} "
+                f"WHERE ({BLOB_COLUMN} IS NOT NULL "
+                f"OR (face_encoding IS NOT NULL AND face_encoding != ''))"
+            )
+        else:
+            sql = (
+                f"SELECT id, NULL, face_encoding FROM {table} "
+                f"WHERE face_encoding IS NOT NULL AND face_encoding != ''"
+            )
+        if has_column(conn, table, VERSION_COLUMN):
+            cursor.execute(
+                sql + f" AND COALESCE({VERSION_COLUMN}, ?) = ?", (HISTOGRAM_MODEL_VERSION, version)
+            )
+        else:
+            cursor.execute(sql)
+        for record_id, blob, value in cursor.fetchall():
+            try:
+                if blob is not None:
+                    encoding = decode_face_blob(blob)
+                else:
+                    encoding = decode_text_encoding(value)
+            except ValueError:
+                continue
+            if encoding is not None:
+                yield source, record_id, encoding
+    cursor.close()
+
+
+def get_face_index():
+    """Return the process-wide index, loading it from the database on first use"""
+    global _face_index
+
+    if _face_index is not None and _face_index.loaded:
+        return _face_index
+
+    with _face_index_lock:
+        if _face_index is None:
+            _face_index = FaceIndex()
+        if not _face_index.loaded:
+            from models.database import db
+
+            conn = db.engine.raw_connection()
+            try:
+                _face_index.load(iter_stored_encodings(conn))
+            finally:
+                conn.close()
+    return _face_index
+
+
+def _row_exists(source, record_id):
+    from models.database import db
+
+    conn = db.engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT 1 FROM {FACE_SOURCES[source]} WHERE id = ?", (record_id,))
+        found = cursor.fetchone() is not None
+        cursor.close()
+        return found
+    finally:
+        conn.close()
+
+
+def find_face_match(encoding, tolerance=None, row_exists=None):
+    """
+    Best (source, record_id, distance) match for an encoding, or None.
+
+    The match is checked against the database (one primary-key lookup):
+    rows deleted outside this process's ORM session - archived by
+    archive_old_visits.py, removed by a script - are dropped from the index
+    and the next best face is tried.
+    """
+    row_exists = row_exists or _row_exists
+    index = get_face_index()
+    while True:
+        found = index.best_match(encoding, tolerance)
+        if found is None or row_exists(found[0], found[1]):
+            return found
+        index.remove(found[0], found[1])
+
+
+def forget_face_rows(keys):
+    """Drop (source, record_id) rows deleted outside the ORM from this process's index"""
+    for source, record_id in keys:
+        _apply_change(source, record_id, None)
+
+
+# ----------------------------------------------------------------------
+# Incremental updates
+# ----------------------------------------------------------------------
+
+_listeners_lock = threading.Lock()
+_registered_models = set()
+_session_listeners_registered = False
+
+
+def _apply_change(source, record_id, encoding):
+    """
+    Apply one committed change. Runs inside after_commit, so it must never
+    raise - the row is already saved and the request has to succeed.
+    """
+    index = _face_index
+    if index is None or not index.loaded:
+        # Nothing to keep in sync yet; the first lookup loads fresh rows
+        return
+    try:
+        if encoding is None:
+            index.remove(source, record_id)
+            return
+        dimension = np.asarray(encoding).size
+        if index.dimension is not None and dimension != index.dimension:
+            # Another model produced this encoding (e.g. after switching
+            # FACE_ENCODER_BACKEND); reload from the database on next lookup
+            print(f"⚠️ Face index: {source} {record_id} has a {dimension}-d encoding, "
+                  f"index holds {index.dimension}-d - reloading on next lookup")
+            index.remove(source, record_id)
+            index.loaded = False
+            return
+        index.add(source, record_id, encoding)
+    except Exception as e:
+        print(f"⚠️ Face index update failed for {source} {record_id}: {e}")
+        index.loaded = False
+
+
+def register_face_index_listeners(visitor_model, host_visitor_model):
+    """
+    Keep the process-wide index in step with Visitor / HostVisitor rows.
+
+    Changes are collected per session during flush and applied only after the
+    transaction commits, so a rolled back registration never becomes matchable.
+    Safe to call once per create_app(): every listener is registered once.
+    """
+    global _session_listeners_registered
+    from sqlalchemy import event, inspect
+    from sqlalchemy.orm import Session, object_session
+
+    def queue(target, source, deleted=False):
+        session = object_session(target)
+        if session is None:
+            return
+        encoding = None
+        if not deleted:
+            try:
+                encoding = decode_text_encoding(target.face_encoding)
+            except ValueError:
+                encoding = None
+        session.info.setdefault('face_index_changes', []).append(
+            (source, target.id, encoding)
+        )
+
+    def make_listeners(source):
+        def on_insert(mapper, connection, target):
+            queue(target, source)
+
+        def on_update(mapper, connection, target):
+            # Status changes are far more common than new photos - skip those
+            if inspect(target).attrs.face_encoding.history.has_changes():
+                queue(target, source)
+
+        def on_delete(mapper, connection, target):
+            queue(target, source, deleted=True)
+
+        return on_insert, on_update, on_delete
+
+    with _listeners_lock:
+        for model, source in ((visitor_model, 'visitor'), (host_visitor_model, 'host_visitor')):
+            if model in _registered_models:
+                continue
+            _registered_models.add(model)
+            on_insert, on_update, on_delete = make_listeners(source)
+            event.listen(model, 'after_insert', on_insert)
+            event.listen(model, 'after_update', on_update)
+            event.listen(model, 'after_delete', on_delete)
+
+        if not _session_listeners_registered:
+            _session_listeners_registered = True
+            event.listen(Session, 'after_commit', apply_face_index_changes)
+            event.listen(Session, 'after_rollback', discard_face_index_changes)
+
+
+def apply_face_index_changes(session):
+    for change in session.info.pop('face_index_changes', []):
+        _apply_change(*change)
+
+
+def discard_face_index_changes(session):
+    session.info.pop('face_index_changes', None)
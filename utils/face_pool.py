@@ -0,0 +1,201 @@
+"""
+Face Processing Pool
+Runs face detection + encoding in worker processes so a slow 'cnn' pass never
+blocks a Flask request thread. Each worker builds its FaceModel once when it
+starts; request threads only hand over image bytes and wait on a future.
+"""
+
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from config import Config
+
+
+class FacePoolBusy(RuntimeError):
+    """Raised when FACE_POOL_MAX_PENDING jobs are already queued"""
+
+
+class FaceEncodingTimeout(TimeoutError):
+    """Raised when a job does not finish within its timeout"""
+
+
+# ----------------------------------------------------------------------
+# Worker side
+# ----------------------------------------------------------------------
+
+_worker_model = None
+
+
+def _init_worker(detection_model, backend):
+    """Load the detector / network once per worker process"""
+    global _worker_model
+    from utils.face_engine import FaceModel
+
+    _worker_model = FaceModel(detection_model=detection_model, backend=backend)
+
+
+def _encode_in_worker(image_bytes):
+    return _worker_model.encode_image_bytes(image_bytes)
+
+
+def _ping():
+    import os
+
+    return os.getpid()
+
+
+# ----------------------------------------------------------------------
+# Request side
+# ----------------------------------------------------------------------
+
+class FacePool:
+    """
+    Bounded pool of face-encoding worker processes
+
+    At most max_pending jobs may be queued or running at once; further
+    submissions raise FacePoolBusy. encode() falls back to a model loaded in
+    the calling process when the pool is disabled (workers=0), saturated or
+    broken, and sync_fallback is on.
+    """
+
+    def __init__(self, workers=None, max_pending=None, timeout=None,
+                 sync_fallback=None, detection_model=None, backend=None):
+        self.workers = Config.FACE_POOL_WORKERS if workers is None else workers
+        self.max_pending = max_pending or Config.FACE_POOL_MAX_PENDING
+        self.timeout = timeout or Config.FACE_POOL_TIMEOUT
+        self.sync_fallback = Config.FACE_POOL_SYNC_FALLBACK if sync_fallback is None else sync_fallback
+        self.detection_model = detection_model or Config.FACE_DETECTION_MODEL
+        self.backend = backend or Config.FACE_ENCODER_BACKEND
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._local_model = None
+        self._local_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None and self.workers > 0:
+                # 'spawn' avoids forking a process that already holds
+                # SQLAlchemy connections and TensorFlow threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.detection_model, self.backend),
+                )
+            return self._executor
+
+    def warm_up(self):
+        """Start every worker now so the first request does not pay model loading"""
+        executor = self._get_executor()
+        if executor is None:
+            self._get_local_model()
+            return
+        futures = [executor.submit(_ping) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _reset_broken(self, executor):
+        if executor is None:
+            return
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    def submit(self, image_bytes):
+        """Queue one image; returns a Future resolving to a float32 encoding"""
+        executor = self._get_executor()
+        if executor is None:
+            raise FacePoolBusy("Face processing pool is disabled")
+        if not self._slots.acquire(blocking=False):
+            raise FacePoolBusy(f"{self.max_pending} face jobs already pending")
+        try:
+            future = executor.submit(_encode_in_worker, bytes(image_bytes))
+        except BrokenProcessPool:
+            self._slots.release()
+            self._reset_broken(executor)
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def encode(self, image_bytes, timeout=None):
+        """
+        Encode the largest face in image_bytes, waiting at most timeout
+        seconds for a worker. Raises NoFaceDetected / FaceEncodingTimeout.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        try:
+            future = self.submit(image_bytes)
+        except (FacePoolBusy, BrokenProcessPool):
+            if not self.sync_fallback:
+                raise
+            return self.encode_local(image_bytes)
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise FaceEncodingTimeout(f"Face encoding took longer than {timeout}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); restart the pool on next use
+            self._reset_broken(self._executor)
+            if not self.sync_fallback:
+                raise
+            return self.encode_local(image_bytes)
+
+    def _get_local_model(self):
+        if self._local_model is None:
+            from utils.face_engine import FaceModel
+
+            self._local_model = FaceModel(detection_model=self.detection_model, backend=self.backend)
+        return self._local_model
+
+    def encode_local(self, image_bytes):
+        """Synchronous fallback in the calling process (one job at a time)"""
+        with self._local_lock:
+            return self._get_local_model().encode_image_bytes(image_bytes)
+
+
+# ----------------------------------------------------------------------
+# Process-wide pool
+# ----------------------------------------------------------------------
+
+_face_pool = None
+_face_pool_lock = threading.Lock()
+
+
+def get_face_pool():
+    """Return the process-wide pool, creating it on first use"""
+    global _face_pool
+
+    if _face_pool is None:
+        with _face_pool_lock:
+            if _face_pool is None:
+                _face_pool = FacePool()
+                atexit.register(_face_pool.shutdown, False)
+    return _face_pool
+
+
+def encode_face_image(image_bytes, timeout=None):
+    """Float32 encoding of the largest face in an uploaded image"""
+    return get_face_pool().encode(image_bytes, timeout)
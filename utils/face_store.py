@@ -0,0 +1,389 @@
+"""
+Content-Addressed Face Image Store
+Face photos are saved under the SHA-256 of their bytes in two-level sharded
+directories, so a repeat upload reuses the existing file:
+
+    <FACE_FOLDER>/3f/a2/3fa2...e1.jpg
+
+face_image_path holds the relative path ('3f/a2/3fa2...e1.jpg'). A file is
+deleted once no visitors / host_visitors row references it any more
+(reference count = rows whose face_image_path contains its content hash, so
+values written with a folder prefix still count); photos of archived visits
+are kept for good. Encodings are cached by
+content hash + model version, so a re-uploaded image is never encoded twice.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from config import Config
+
+# Tables whose face_image_path column references stored images
+FACE_IMAGE_TABLES = ('visitors', 'host_visitors')
+
+CACHE_TABLE = 'face_embedding_cache'
+
+# Content hashes of photos referenced by rows moved to the monthly archives
+# (utils/archive.py); such files are never released
+ARCHIVED_FACES_TABLE = 'archived_face_images'
+
+_HASH_LENGTH = 64
+
+# Held while a file is written or released, so a release in this process
+# never unlinks a file another thread is storing
+_store_lock = threading.Lock()
+
+
+def content_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def image_extension(image_bytes):
+    """File extension from the image signature (uploads are JPEG or PNG)"""
+    if image_bytes[:8] == b'\x89PNG\r\n\x1a\n':
+        return '.png'
+    if image_bytes[:6] in (b'GIF87a', b'GIF89a'):
+        return '.gif'
+    if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
+        return '.webp'
+    return '.jpg'
+
+
+def sharded_path(digest, extension='.jpg'):
+    """Relative store path for a content hash: 'ab/cd/abcd....jpg'"""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def file_name(value):
+    """Last component of a stored path, whichever OS separator it was saved with"""
+    return value.replace('\\', '/').rsplit('/', 1)[-1]
+
+
+def hash_from_path(path):
+    """Content hash encoded in a stored path, or None for legacy flat files"""
+    if not path:
+        return None
+    stem = os.path.splitext(file_name(path))[0]
+    if len(stem) == _HASH_LENGTH and all(c in '0123456789abcdef' for c in stem):
+        return stem
+    return None
+
+
+def resolve_face_image(value, face_folder=None):
+    """Absolute path of the file a face_image_path value refers to, or None"""
+    if not value:
+        return None
+    face_folder = face_folder or default_face_folder()
+    digest = hash_from_path(value)
+    candidates = []
+    if digest is not None:
+        relative = sharded_path(digest, os.path.splitext(file_name(value))[1])
+        candidates.append(os.path.join(face_folder, *relative.split('/')))
+    candidates += [
+        os.path.join(face_folder, file_name(value)),
+        os.path.join(Config.BASE_DIR, value),
+        os.path.join(Config.BASE_DIR, 'static', value),
+    ]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def default_face_folder():
+    try:
+        from flask import current_app
+
+        return current_app.config['FACE_FOLDER']
+    except (RuntimeError, KeyError):
+        return Config.FACE_FOLDER
+
+
+# ----------------------------------------------------------------------
+# Writing / deleting files
+# ----------------------------------------------------------------------
+
+def store_face_image(image_bytes, face_folder=None):
+    """
+    Save image bytes under their content hash.
+
+    Returns (relative_path, digest). Writing is atomic (temp file + rename).
+    An existing file with the same hash is kept but its mtime is bumped: the
+    row referencing it may not be committed yet, and release_face_image
+    leaves recently stored files alone for FACE_STORE_RELEASE_GRACE seconds.
+    """
+    face_folder = face_folder or default_face_folder()
+    digest = content_hash(image_bytes)
+    relative = sharded_path(digest, image_extension(image_bytes))
+    target = os.path.join(face_folder, *relative.split('/'))
+
+    with _store_lock:
+        try:
+            os.utime(target)
+        except FileNotFoundError:
+            _write_file(target, image_bytes)
+    return relative, digest
+
+
+def _write_file(target, image_bytes):
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(image_bytes)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def count_references(conn, digest):
+    """
+    Rows in every face table whose face_image_path refers to this content
+    hash, whatever folder prefix or separator the value was stored with.
+    The digest is hex, so it is safe inside a LIKE pattern; the lookup scans
+    the narrow ix_<table>_face_image_path index rather than the table.
+    """
+    cursor = conn.cursor()
+    total = 0
+    for table in FACE_IMAGE_TABLES:
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE face_image_path LIKE ?", (f"%{digest}%",)
+        )
+        total += cursor.fetchone()[0]
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ARCHIVED_FACES_TABLE,))
+    if cursor.fetchone() is not None:
+        cursor.execute(f"SELECT COUNT(*) FROM {ARCHIVED_FACES_TABLE} WHERE content_hash = ?", (digest,))
+        total += cursor.fetchone()[0]
+    cursor.close()
+    return total
+
+
+def mark_archived_faces(cursor, values):
+    """
+    Record the photos of rows about to be archived (call inside the delete
+    transaction), so releasing a live reference never removes them
+    """
+    digests = {hash_from_path(value) for value in values} - {None}
+    if not digests:
+        return 0
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {ARCHIVED_FACES_TABLE} ("
+        f"content_hash CHAR(64) PRIMARY KEY) WITHOUT ROWID"
+    )
+    cursor.executemany(
+        f"INSERT OR IGNORE INTO {ARCHIVED_FACES_TABLE} (content_hash) VALUES (?)",
+        [(digest,) for digest in digests]
+    )
+    return len(digests)
+
+
+def release_face_image(conn, stored_value, face_folder=None):
+    """
+    Delete a content-addressed file once nothing references it.
+
+    The count and the unlink run inside one write transaction (no other
+    connection can commit a new reference in between) and under the lock
+    store_face_image writes with. Files stored within the last
+    FACE_STORE_RELEASE_GRACE seconds are kept - their row may still be on
+    its way to a commit. Legacy (non-hashed) paths are never touched.
+    Returns True if removed.
+    """
+    digest = hash_from_path(stored_value)
+    if digest is None:
+        return False
+
+    face_folder = face_folder or default_face_folder()
+    relative = sharded_path(digest, os.path.splitext(file_name(stored_value))[1])
+    target = os.path.join(face_folder, *relative.split('/'))
+
+    with _store_lock:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if count_references(conn, digest):
+                return False
+            try:
+                if time.time() - os.path.getmtime(target) < Config.FACE_STORE_RELEASE_GRACE:
+                    return False
+                os.remove(target)
+            except FileNotFoundError:
+                return False
+        finally:
+            conn.rollback()
+            cursor.close()
+    for directory in (os.path.dirname(target), os.path.dirname(os.path.dirname(target))):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+    return True
+
+
+# ----------------------------------------------------------------------
+# Embedding cache
+# ----------------------------------------------------------------------
+
+_cache_ready = set()
+_cache_lock = threading.Lock()
+
+
+def ensure_cache_table(conn):
+    cursor = conn.cursor()
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {CACHE_TABLE} ("
+        f"content_hash CHAR(64) NOT NULL, "
+        f"model_version VARCHAR(100) NOT NULL, "
+        f"encoding BLOB NOT NULL, "
+        f"PRIMARY KEY (content_hash, model_version)"
+        f") WITHOUT ROWID"
+    )
+    cursor.close()
+    conn.commit()
+
+
+def get_cached_encoding(conn, digest, version):
+    from utils.face_codec import decode_face_blob
+
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT encoding FROM {CACHE_TABLE} WHERE content_hash = ? AND model_version = ?",
+        (digest, version)
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    return decode_face_blob(row[0]) if row else None
+
+
+def put_cached_encoding(conn, digest, version, encoding):
+    from utils.face_codec import encode_face_blob
+
+    cursor = conn.cursor()
+    cursor.execute(
+        f"INSERT OR REPLACE INTO {CACHE_TABLE} (content_hash, model_version, encoding) VALUES (?, ?, ?)",
+        (digest, version, encode_face_blob(encoding))
+    )
+    cursor.close()
+    conn.commit()
+
+
+def _raw_connection():
+    from models.database import db
+
+    conn = db.engine.raw_connection()
+    key = str(db.engine.url)
+    if key not in _cache_ready:
+        with _cache_lock:
+            if key not in _cache_ready:
+                ensure_cache_table(conn)
+                _cache_ready.add(key)
+    return conn
+
+
+def encode_stored_image(image_bytes, digest=None, timeout=None):
+    """
+    Encoding for an uploaded image, from the cache when these exact bytes
+    were encoded before by the current model, otherwise via the face pool
+    """
+    from utils.face_engine import model_version
+    from utils.face_pool import encode_face_image
+
+    digest = digest or content_hash(image_bytes)
+    version = model_version()
+
+    conn = _raw_connection()
+    try:
+        encoding = get_cached_encoding(conn, digest, version)
+        if encoding is not None:
+            return encoding
+        encoding = encode_face_image(image_bytes, timeout)
+        put_cached_encoding(conn, digest, version, encoding)
+        return encoding
+    finally:
+        conn.close()
+
+
+def save_face_upload(image_bytes, face_folder=None, timeout=None):
+    """
+    Store an uploaded face photo and encode it.
+
+    Returns (relative_path, encoding); raises NoFaceDetected like the pool.
+    """
+    relative, digest = store_face_image(image_bytes, face_folder)
+    return relative, encode_stored_image(image_bytes, digest, timeout)
+
+
+# ----------------------------------------------------------------------
+# Reference counting
+# ----------------------------------------------------------------------
+
+_listeners_lock = threading.Lock()
+_registered_models = set()
+_session_listeners_registered = False
+
+
+def register_face_store_listeners(visitor_model, host_visitor_model):
+    """
+    Delete content-addressed images that lose their last reference.
+
+    Replaced or deleted face_image_path values are collected during flush
+    and checked after commit, so a rolled back change never removes a file.
+    Safe to call once per create_app(): every listener is registered once.
+    """
+    global _session_listeners_registered
+    from sqlalchemy import event, inspect
+    from sqlalchemy.orm import Session, object_session
+
+    def queue(target, value):
+        session = object_session(target)
+        if session is None or hash_from_path(value) is None:
+            return
+        session.info.setdefault('face_store_releases', set()).add(value)
+
+    def on_update(mapper, connection, target):
+        history = inspect(target).attrs.face_image_path.history
+        for value in history.deleted or ():
+            queue(target, value)
+
+    def on_delete(mapper, connection, target):
+        queue(target, target.face_image_path)
+
+    with _listeners_lock:
+        for model in (visitor_model, host_visitor_model):
+            if model in _registered_models:
+                continue
+            _registered_models.add(model)
+            event.listen(model, 'after_update', on_update)
+            event.listen(model, 'after_delete', on_delete)
+
+        if not _session_listeners_registered:
+            _session_listeners_registered = True
+            event.listen(Session, 'after_commit', release_face_images)
+            event.listen(Session, 'after_rollback', discard_face_images)
+
+
+def release_face_images(session):
+    values = session.info.pop('face_store_releases', None)
+    if not values:
+        return
+    from models.database import db
+
+    face_folder = default_face_folder()
+    conn = db.engine.raw_connection()
+    try:
+        for value in values:
+            try:
+                release_face_image(conn, value, face_folder)
+            except Exception as e:
+                print(f"⚠️ Could not release face image {value}: {e}")
+    finally:
+        conn.close()
+
+
+def discard_face_images(session):
+    session.info.pop('face_store_releases', None)
@@ -0,0 +1,232 @@
+"""
+Streaming Face Recognition (Kiosk Mode)
+Continuous recognition from a camera / video feed without running the full
+detector + encoder on every frame:
+
+- Detection runs every KIOSK_DETECT_EVERY_N_FRAMES frames
+- In between, each face box is followed by a cheap template-match tracker
+- A track is encoded only when it appears or its quality (size x sharpness)
+  clearly improves, and each person produces one match event
+"""
+
+import itertools
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from config import Config
+from utils.lazy_imports import cv2
+
+MatchEvent = namedtuple('MatchEvent', 'track_id source record_id distance frame_index box')
+
+_SEARCH_MARGIN = 0.5    # Tracker search window, as a fraction of the box size
+_MIN_TRACK_SCORE = 0.5  # Normalised cross-correlation below this = track lost
+_MIN_IOU = 0.3          # Detection <-> track association threshold
+
+
+def box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    x0, y0 = max(ax, bx), max(ay, by)
+    x1, y1 = min(ax + aw, bx + bw), min(ay + ah, by + bh)
+    inter = max(x1 - x0, 0) * max(y1 - y0, 0)
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def face_quality(gray, box):
+    """Face area weighted by sharpness (variance of the Laplacian)"""
+    x, y, w, h = box
+    patch = gray[y:y + h, x:x + w]
+    if patch.size == 0:
+        return 0.0
+    sharpness = float(cv2.Laplacian(patch, cv2.CV_64F).var())
+    return w * h * min(sharpness / 100.0, 1.0)
+
+
+def _to_gray(frame):
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+
+def _clip_box(box, shape):
+    x, y, w, h = (int(v) for v in box)
+    height, width = shape[:2]
+    x, y = max(x, 0), max(y, 0)
+    return x, y, max(min(w, width - x), 0), max(min(h, height - y), 0)
+
+
+class FaceTrack:
+    """One face followed across frames"""
+
+    def __init__(self, track_id, box, gray, frame_index):
+        self.track_id = track_id
+        self.box = box
+        self.template = gray[box[1]:box[1] + box[3], box[0]:box[0] + box[2]].copy()
+        self.first_frame = frame_index
+        self.missed_detections = 0
+        self.best_quality = 0.0
+        self.encodings = 0
+        self.match = None
+
+    def update(self, gray):
+        """Follow the face into a new frame; returns False if it was lost"""
+        x, y, w, h = self.box
+        if self.template.size == 0 or w < 4 or h < 4:
+            return False
+        mx, my = int(w * _SEARCH_MARGIN), int(h * _SEARCH_MARGIN)
+        sx, sy = max(x - mx, 0), max(y - my, 0)
+        window = gray[sy:y + h + my, sx:x + w + mx]
+        if window.shape[0] < h or window.shape[1] < w:
+            return False
+        scores = cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = cv2.minMaxLoc(scores)
+        if score < _MIN_TRACK_SCORE:
+            return False
+        self.box = (sx + dx, sy + dy, w, h)
+        return True
+
+    def redetected(self, box, gray):
+        self.box = box
+        self.template = gray[box[1]:box[1] + box[3], box[0]:box[0] + box[2]].copy()
+        self.missed_detections = 0
+
+
+class StreamingRecognizer:
+    """
+    Frame-by-frame recognizer for a kiosk camera
+
+    model needs detect_scaled(image) and encode_face(crop) (a FaceModel);
+    matcher maps an encoding to (source, record_id, distance) or None
+    (defaults to the process-wide face index).
+    """
+
+    def __init__(self, model=None, matcher=None, detect_every=None, max_missed=None,
+                 quality_gain=None, cooldown=None):
+        if model is None:
+            from utils.face_engine import FaceModel
+
+            model = FaceModel()
+        if matcher is None:
+            from utils.face_index import find_face_match
+
+            matcher = find_face_match
+        self.model = model
+        self.matcher = matcher
+        self.detect_every = max(detect_every or Config.KIOSK_DETECT_EVERY_N_FRAMES, 1)
+        self.max_missed = Config.KIOSK_MAX_MISSED_DETECTIONS if max_missed is None else max_missed
+        self.quality_gain = Config.KIOSK_QUALITY_GAIN if quality_gain is None else quality_gain
+        self.cooldown = Config.KIOSK_EVENT_COOLDOWN if cooldown is None else cooldown
+
+        self.tracks = []
+        self.frame_index = 0
+        self.encodings_run = 0
+        self.detections_run = 0
+        self._track_ids = itertools.count(1)
+        self._recent = {}  # (source, record_id) -> last event time, within the cooldown
+
+    def reset(self):
+        self.tracks = []
+        self._recent = {}
+
+    # ------------------------------------------------------------------
+    # Per-frame pipeline
+    # ------------------------------------------------------------------
+
+    def process_frame(self, frame, timestamp=None):
+        """Feed one BGR (or grayscale) frame; returns the new MatchEvents"""
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        gray = _to_gray(frame)
+
+        if self.frame_index % self.detect_every == 0:
+            self._detect(frame, gray)
+        else:
+            self.tracks = [track for track in self.tracks if track.update(gray)]
+
+        events = []
+        for track in self.tracks:
+            event = self._maybe_encode(frame, gray, track, timestamp)
+            if event is not None:
+                events.append(event)
+
+        self.frame_index += 1
+        return events
+
+    def _detect(self, frame, gray):
+        self.detections_run += 1
+        boxes = [_clip_box(box, gray.shape) for box in self.model.detect_scaled(frame)]
+        boxes = [box for box in boxes if box[2] and box[3]]
+
+        unclaimed = list(boxes)
+        for track in self.tracks:
+            best = max(unclaimed, key=lambda box: box_iou(track.box, box), default=None)
+            if best is not None and box_iou(track.box, best) >= _MIN_IOU:
+                track.redetected(best, gray)
+                unclaimed.remove(best)
+            else:
+                track.missed_detections += 1
+
+        self.tracks = [track for track in self.tracks if track.missed_detections <= self.max_missed]
+        for box in unclaimed:
+            self.tracks.append(FaceTrack(next(self._track_ids), box, gray, self.frame_index))
+
+    def _maybe_encode(self, frame, gray, track, timestamp):
+        if track.match is not None:
+            return None
+        quality = face_quality(gray, track.box)
+        if track.encodings and quality <= track.best_quality * (1.0 + self.quality_gain):
+            return None
+        track.best_quality = quality
+        track.encodings += 1
+
+        x, y, w, h = track.box
+        self.encodings_run += 1
+        encoding = self.model.encode_face(frame[y:y + h, x:x + w])
+        found = self.matcher(np.asarray(encoding, dtype=np.float32))
+        if found is None:
+            return None
+
+        source, record_id, distance = found
+        track.match = found
+        last = self._recent.get((source, record_id))
+        if last is not None and timestamp - last < self.cooldown:
+            # Same person re-acquired as a new track - already announced
+            return None
+        self._recent[(source, record_id)] = timestamp
+        self._prune_recent(timestamp)
+        return MatchEvent(track.track_id, source, record_id, distance, self.frame_index, track.box)
+
+    def _prune_recent(self, timestamp):
+        """
+        Forget people whose cooldown has passed, so a kiosk running for
+        months only remembers the last few minutes of visitors
+        """
+        expired = [key for key, last in self._recent.items() if timestamp - last >= self.cooldown]
+        for key in expired:
+            del self._recent[key]
+
+    # ------------------------------------------------------------------
+    # Video sources
+    # ------------------------------------------------------------------
+
+    def run(self, frames, fps=None):
+        """
+        Yield MatchEvents for an iterable of frames. With fps, the cooldown
+        uses video time instead of wall-clock time (recorded files).
+        """
+        for frame in frames:
+            timestamp = self.frame_index / fps if fps else None
+            yield from self.process_frame(frame, timestamp)
+
+
+def iter_video_frames(source):
+    """Frames from a video file path or camera index, until the stream ends"""
+    capture = cv2.VideoCapture(source)
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        capture.release()
@@ -0,0 +1,97 @@
+"""
+Lazy Imports
+Heavy ML / imaging / reporting modules behind small accessor shims, so they
+are imported on first attribute access instead of when a blueprint loads.
+
+    from utils.lazy_imports import cv2, pd
+    image = cv2.imdecode(...)      # cv2 is imported here, once
+
+A worker that never touches face recognition, analytics or PDF export never
+pays for TensorFlow, pandas, matplotlib or reportlab.
+"""
+
+import importlib
+import threading
+import time
+
+# Module name -> seconds spent importing it (first access only)
+load_times = {}
+
+_load_lock = threading.RLock()
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name, setup=None):
+        self.__dict__['_name'] = name
+        self.__dict__['_setup'] = setup
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is not None:
+            return module
+        with _load_lock:
+            module = self.__dict__['_module']
+            if module is None:
+                start = time.perf_counter()
+                setup = self.__dict__['_setup']
+                if setup is not None:
+                    setup()
+                module = importlib.import_module(self.__dict__['_name'])
+                load_times[self.__dict__['_name']] = time.perf_counter() - start
+                self.__dict__['_module'] = module
+        return module
+
+    @property
+    def loaded(self):
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def _use_agg_backend():
+    # Charts are rendered to files / bytes - never to a display
+    import matplotlib
+
+    matplotlib.use('Agg')
+
+
+cv2 = LazyModule('cv2')
+pd = LazyModule('pandas')
+plt = LazyModule('matplotlib.pyplot', setup=_use_agg_backend)
+DeepFace = LazyModule('deepface.DeepFace')
+reportlab_canvas = LazyModule('reportlab.pdfgen.canvas')
+reportlab_platypus = LazyModule('reportlab.platypus')
+PIL_Image = LazyModule('PIL.Image')
+qrcode = LazyModule('qrcode')
+openpyxl = LazyModule('openpyxl')
+
+LAZY_MODULES = {
+    'cv2': cv2,
+    'pandas': pd,
+    'matplotlib.pyplot': plt,
+    'deepface.DeepFace': DeepFace,
+    'reportlab.pdfgen.canvas': reportlab_canvas,
+    'reportlab.platypus': reportlab_platypus,
+    'PIL.Image': PIL_Image,
+    'qrcode': qrcode,
+    'openpyxl': openpyxl,
+}
+
+
+def loaded_modules():
+    """Names of the shimmed modules that have been imported so far"""
+    return [name for name, module in LAZY_MODULES.items() if module.loaded]
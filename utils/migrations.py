@@ -0,0 +1,529 @@
+"""
+Schema Migrations
+Ordered registry of schema changes with a schema_version table, replacing
+the one-off ALTER TABLE scripts (add_codes_migration.py,
+add_host_confirmation.py, migrate_database.py, migrate_host_visitors.py,
+fix_host_role_standalone.py) and the reflection work create_app() did on
+every boot.
+
+On startup schema_is_current() is a single SELECT on schema_version; only
+when it is behind does the app run db.create_all() and the pending
+migrations. Every migration is idempotent (columns are added only if
+missing), so databases that already ran the old scripts upgrade cleanly.
+
+Changes SQLite cannot ALTER in place go through rebuild_table(), which
+copies the table in short keyset batches while triggers mirror concurrent
+writes, so the live database is only locked for the final swap.
+
+Several workers may boot at once: run_migrations() serialises them on a
+lock row (migrations commit in batches, so one transaction cannot cover a
+whole step) and re-reads schema_version inside BEGIN IMMEDIATE before each
+step, so a step another process already applied is skipped.
+
+Face storage: the face_encoding_blob / face_model_version columns, the
+embedding cache table and the face_image_path indexes are migration 13.
+Three data jobs stay manual scripts, run once per installation when the
+operator chooses: migrate_face_encoding_blob.py (converts old TEXT
+encodings; readers fall back to TEXT until then), migrate_face_store.py
+(moves photo files; keeps the originals unless told otherwise) and
+reencode_faces.py (hours of encoding on a process pool after a model
+change). None of them belongs in a web worker's boot.
+"""
+
+import os
+import socket
+import time
+
+VERSION_TABLE = 'schema_version'
+
+# One row while a process is applying migrations
+LOCK_TABLE = 'schema_migration_lock'
+
+# Seconds without progress after which a lock counts as abandoned (its
+# process died); a single step must finish within this
+LOCK_STALE_AFTER = 900
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def _table_exists(cursor, table):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def _table_columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def add_missing_columns(conn, table, columns):
+    """
+    ALTER TABLE ... ADD COLUMN for each (name, sql_type) not yet on table.
+    Tables that do not exist yet are skipped (db.create_all() makes them
+    with every column). Returns the names of the columns added.
+    """
+    cursor = conn.cursor()
+    if not _table_exists(cursor, table):
+        cursor.close()
+        return []
+    existing = set(_table_columns(cursor, table))
+    added = []
+    for name, sql_type in columns:
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+            added.append(name)
+    cursor.close()
+    conn.commit()
+    return added
+
+
+def update_in_batches(conn, table, set_sql, where_sql, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    UPDATE table SET set_sql WHERE where_sql, batch_size rows per
+    transaction so writers are never blocked for long. Returns rows updated.
+    """
+    cursor = conn.cursor()
+    updated = 0
+    while True:
+        cursor.execute(
+            f"UPDATE {table} SET {set_sql} WHERE id IN "
+            f"(SELECT id FROM {table} WHERE {where_sql} ORDER BY id LIMIT ?)",
+            (batch_size,)
+        )
+        conn.commit()
+        if cursor.rowcount <= 0:
+            break
+        updated += cursor.rowcount
+    cursor.close()
+    return updated
+
+
+def rebuild_table(conn, table, create_sql, column_map=None, batch_size=DEFAULT_BATCH_SIZE, pause=0.0):
+    """
+    Rebuild table with a new definition without holding a long lock.
+
+    create_sql is the new CREATE TABLE statement using the placeholder
+    {table} for the table name. column_map maps new column -> SQL expression
+    over the old row (default: the columns both definitions share).
+
+      1. create {table}__new and triggers mirroring INSERT / UPDATE / DELETE
+         on the live table into it
+      2. copy the rows that existed when the triggers went in, in keyset
+         batches (INSERT OR IGNORE, so rows the triggers already wrote win),
+         committing after each batch
+      3. in one short transaction: drop the triggers and old table, rename
+         the copy and recreate the old table's indexes and triggers
+
+    Returns the number of rows copied in step 2.
+    """
+    new_table = f"{table}__new"
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (table,)
+    )
+    dependents = cursor.fetchall()
+
+    cursor.execute(f"DROP TABLE IF EXISTS {new_table}")
+    cursor.execute(create_sql.format(table=new_table))
+    old_columns = _table_columns(cursor, table)
+    if column_map is None:
+        column_map = {
+            column: column
+            for column in _table_columns(cursor, new_table) if column in old_columns
+        }
+    targets = ', '.join(column_map)
+
+    def select_list(row):
+        # Old-column names in the expressions become NEW.x / OLD.x / table.x
+        return ', '.join(
+            f"{row}.{expression}" if expression in old_columns else expression
+            for expression in column_map.values()
+        )
+
+    sync_triggers = {
+        f"trg_{table}_rebuild_insert":
+            f"AFTER INSERT ON {table} BEGIN INSERT OR REPLACE INTO {new_table} ({targets}) "
+            f"VALUES ({select_list('NEW')}); END",
+        f"trg_{table}_rebuild_update":
+            f"AFTER UPDATE ON {table} BEGIN DELETE FROM {new_table} WHERE id = OLD.id; "
+            f"INSERT OR REPLACE INTO {new_table} ({targets}) VALUES ({select_list('NEW')}); END",
+        f"trg_{table}_rebuild_delete":
+            f"AFTER DELETE ON {table} BEGIN DELETE FROM {new_table} WHERE id = OLD.id; END",
+    }
+    for name, body in sync_triggers.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"CREATE TRIGGER {name} {body}")
+    # Rows inserted from here on reach the copy through the insert trigger
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+    max_id = cursor.fetchone()[0]
+    conn.commit()
+
+    copied = 0
+    last_id = 0
+    while last_id < max_id:
+        cursor.execute(
+            f"SELECT MAX(id), COUNT(*) FROM (SELECT id FROM {table} WHERE id > ? AND id <= ? "
+            f"ORDER BY id LIMIT ?)",
+            (last_id, max_id, batch_size)
+        )
+        batch_end, batch_rows = cursor.fetchone()
+        if not batch_rows:
+            break
+        cursor.execute(
+            f"INSERT OR IGNORE INTO {new_table} ({targets}) "
+            f"SELECT {select_list(table)} FROM {table} WHERE id > ? AND id <= ?",
+            (last_id, batch_end)
+        )
+        conn.commit()
+        copied += batch_rows
+        last_id = batch_end
+        if pause:
+            time.sleep(pause)
+
+    # Final swap - the only step that holds the write lock for more than a batch
+    cursor.execute("PRAGMA legacy_alter_table=ON")
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        for name in sync_triggers:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+        for kind, name, sql in dependents:
+            if kind == 'index' and not all(
+                column in column_map for column in _index_columns(sql)
+            ):
+                continue
+            cursor.execute(sql)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.execute("PRAGMA legacy_alter_table=OFF")
+        cursor.close()
+    return copied
+
+
+def _index_columns(create_index_sql):
+    columns = create_index_sql[create_index_sql.rindex('(') + 1:create_index_sql.rindex(')')]
+    return [column.strip().split()[0] for column in columns.split(',')]
+
+
+# ----------------------------------------------------------------------
+# Registry
+# ----------------------------------------------------------------------
+
+def _visitor_registration_fields(conn):
+    # migrate_database.py
+    add_missing_columns(conn, 'visitors', [
+        ('company_address', 'TEXT'),
+        ('visitor_type', 'VARCHAR(50)'),
+        ('coming_with_vehicle', 'VARCHAR(3)'),
+        ('has_driver', 'VARCHAR(3)'),
+        ('driver_name', 'VARCHAR(120)'),
+        ('driver_phone', 'VARCHAR(20)'),
+        ('assets_to_bring', 'VARCHAR(255)'),
+        ('assets_other_details', 'VARCHAR(255)'),
+        ('purpose_other_details', 'TEXT'),
+        ('visit_type', 'VARCHAR(20)'),
+        ('visit_time', 'VARCHAR(10)'),
+        ('no_of_days', 'INTEGER'),
+        ('visit_dates', 'TEXT'),
+        ('host_contact_no', 'VARCHAR(20)'),
+        ('host_designation', 'VARCHAR(100)'),
+        ('special_permissions', 'TEXT'),
+        ('special_permission_other', 'VARCHAR(255)'),
+    ])
+
+
+def _visitor_codes(conn):
+    # add_codes_migration.py
+    add_missing_columns(conn, 'visitors', [
+        ('entry_code', 'VARCHAR(4)'),
+        ('exit_code', 'VARCHAR(4)'),
+    ])
+
+
+def _host_confirmation(conn):
+    # add_host_confirmation.py
+    add_missing_columns(conn, 'visitors', [
+        ('host_confirmation', "VARCHAR(20) DEFAULT 'pending'"),
+        ('host_confirmation_reason', 'TEXT'),
+        ('host_confirmation_time', 'DATETIME'),
+    ])
+
+
+def _host_visitor_faces(conn):
+    # migrate_host_visitors.py
+    add_missing_columns(conn, 'host_visitors', [
+        ('face_image_path', 'VARCHAR(255)'),
+        ('face_encoding', 'TEXT'),
+    ])
+
+
+def _host_role(conn):
+    # fix_host_role_standalone.py
+    add_missing_columns(conn, 'hosts', [('role', "VARCHAR(20) DEFAULT 'host'")])
+    cursor = conn.cursor()
+    present = _table_exists(cursor, 'hosts')
+    cursor.close()
+    if present:
+        update_in_batches(conn, 'hosts', "role = 'host'", "role IS NULL OR role = ''")
+
+
+def _hot_query_indexes(conn):
+    from utils.db_indexes import ensure_indexes
+    ensure_indexes(conn)
+
+
+def _visits_read_model(conn):
+    from utils.visits import ensure_visits_table
+    ensure_visits_table(conn)
+
+
+def _visit_days(conn):
+    from utils.visit_days import ensure_visit_days_table
+    ensure_visit_days_table(conn)
+
+
+def _visit_days_triggers(conn):
+    from utils.visit_days import ensure_visit_days_table
+    ensure_visit_days_table(conn, rebuild=True)
+
+
+def _daily_visit_rollup(conn):
+    from utils.visit_rollups import ensure_rollup_table
+    ensure_rollup_table(conn)
+
+
+def _data_version(conn):
+    from utils.chart_cache import ensure_data_version_table
+    ensure_data_version_table(conn)
+
+
+def _report_jobs(conn):
+    from utils.report_jobs import ensure_report_jobs_table
+    ensure_report_jobs_table(conn)
+
+
+def _face_storage(conn):
+    # migrate_face_encoding_blob.py / reencode_faces.py / migrate_face_store.py
+    # (schema only - the data jobs stay manual, see the module docstring)
+    from utils.face_codec import BLOB_COLUMN, VERSION_COLUMN
+    from utils.face_engine import HISTOGRAM_MODEL_VERSION
+    from utils.face_store import FACE_IMAGE_TABLES, ensure_cache_table
+
+    for table in FACE_IMAGE_TABLES:
+        add_missing_columns(conn, table, [(BLOB_COLUMN, 'BLOB'), (VERSION_COLUMN, 'VARCHAR(100)')])
+        cursor = conn.cursor()
+        present = _table_exists(cursor, table)
+        if present:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_face_image_path ON {table} (face_image_path)"
+            )
+        cursor.close()
+        conn.commit()
+        if present:
+            # Encodings stored before the column existed
+            update_in_batches(
+                conn, table, f"{VERSION_COLUMN} = '{HISTOGRAM_MODEL_VERSION}'",
+                f"{VERSION_COLUMN} IS NULL AND face_encoding IS NOT NULL AND face_encoding != ''"
+            )
+    ensure_cache_table(conn)
+
+
+def _user_data_version(conn):
+    from utils.user_cache import ensure_user_data_version
+    ensure_user_data_version(conn)
+
+
+# (version, description, function(conn)) - append only, never renumber
+MIGRATIONS = [
+    (1, 'visitor registration fields', _visitor_registration_fields),
+    (2, 'visitor entry / exit codes', _visitor_codes),
+    (3, 'host confirmation fields', _host_confirmation),
+    (4, 'host visitor face columns', _host_visitor_faces),
+    (5, 'host role column', _host_role),
+    (6, 'hot query indexes', _hot_query_indexes),
+    (7, 'visits read model', _visits_read_model),
+    (8, 'visit days table', _visit_days),
+    (9, 'daily visit rollup', _daily_visit_rollup),
+    (10, 'chart data version', _data_version),
+    (11, 'report jobs table', _report_jobs),
+    (12, 'visit days sync triggers', _visit_days_triggers),
+    (13, 'face storage columns', _face_storage),
+    (14, 'login cache data version', _user_data_version),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ----------------------------------------------------------------------
+# Runner (DB-API connection)
+# ----------------------------------------------------------------------
+
+def current_version(conn):
+    """Highest applied migration, 0 for a database that has none"""
+    import sqlite3
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT MAX(version) FROM {VERSION_TABLE}")
+        return cursor.fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        return 0
+    finally:
+        cursor.close()
+
+
+def schema_is_current(conn):
+    """The startup check - one indexed lookup, no reflection"""
+    return current_version(conn) >= LATEST_VERSION
+
+
+def ensure_version_table(conn):
+    cursor = conn.cursor()
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+        f"version INTEGER PRIMARY KEY, "
+        f"description VARCHAR(255) NOT NULL, "
+        f"applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+        f"duration_ms INTEGER)"
+    )
+    cursor.close()
+    conn.commit()
+
+
+def pending_migrations(conn):
+    version = current_version(conn)
+    return [migration for migration in MIGRATIONS if migration[0] > version]
+
+
+def ensure_lock_table(conn):
+    cursor = conn.cursor()
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {LOCK_TABLE} ("
+        f"id INTEGER PRIMARY KEY CHECK (id = 1), "
+        f"owner VARCHAR(255) NOT NULL, "
+        f"heartbeat REAL NOT NULL)"
+    )
+    cursor.close()
+    conn.commit()
+
+
+def _begin_immediate(cursor, conn):
+    """BEGIN IMMEDIATE, retrying while another process holds the write lock"""
+    import sqlite3
+
+    conn.commit()
+    while True:
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            time.sleep(0.2)
+
+
+def acquire_migration_lock(conn, owner, log=None, poll=0.5):
+    """Wait until this process holds the lock row (or it went stale)"""
+    ensure_lock_table(conn)
+    cursor = conn.cursor()
+    waiting = False
+    try:
+        while True:
+            _begin_immediate(cursor, conn)
+            cursor.execute(f"SELECT owner, heartbeat FROM {LOCK_TABLE} WHERE id = 1")
+            row = cursor.fetchone()
+            if row is None or time.time() - row[1] > LOCK_STALE_AFTER:
+                cursor.execute(
+                    f"INSERT OR REPLACE INTO {LOCK_TABLE} (id, owner, heartbeat) VALUES (1, ?, ?)",
+                    (owner, time.time())
+                )
+                conn.commit()
+                return
+            conn.rollback()
+            if log and not waiting:
+                log(f"⏳ Waiting for migrations running in {row[0]}")
+                waiting = True
+            time.sleep(poll)
+    finally:
+        cursor.close()
+
+
+def release_migration_lock(conn, owner):
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM {LOCK_TABLE} WHERE id = 1 AND owner = ?", (owner,))
+    cursor.close()
+    conn.commit()
+
+
+def run_migrations(conn, target=None, log=None, prepare=None):
+    """
+    Apply every pending migration up to target (default: all) in order,
+    recording each in schema_version as soon as it succeeds. Returns the
+    list of (version, description) applied.
+
+    Holds the migration lock throughout; prepare() (e.g. db.create_all) runs
+    once the lock is held. Before each step the applied version is re-read
+    inside BEGIN IMMEDIATE, so steps another process finished are skipped.
+    """
+    ensure_version_table(conn)
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    acquire_migration_lock(conn, owner, log)
+    applied = []
+    try:
+        if prepare is not None:
+            prepare()
+        for version, description, function in MIGRATIONS:
+            if target is not None and version > target:
+                break
+            cursor = conn.cursor()
+            _begin_immediate(cursor, conn)
+            cursor.execute(f"SELECT MAX(version) FROM {VERSION_TABLE}")
+            done = version <= (cursor.fetchone()[0] or 0)
+            if not done:
+                cursor.execute(
+                    f"UPDATE {LOCK_TABLE} SET heartbeat = ? WHERE id = 1 AND owner = ?",
+                    (time.time(), owner)
+                )
+            conn.commit()
+            cursor.close()
+            if done:
+                continue
+
+            if log:
+                log(f"➡️  {version:04d} {description}")
+            start = time.perf_counter()
+            function(conn)
+            duration_ms = int((time.perf_counter() - start) * 1000)
+            cursor = conn.cursor()
+            cursor.execute(
+                f"INSERT OR IGNORE INTO {VERSION_TABLE} (version, description, duration_ms) "
+                f"VALUES (?, ?, ?)",
+                (version, description, duration_ms)
+            )
+            cursor.close()
+            conn.commit()
+            applied.append((version, description))
+    finally:
+        conn.rollback()
+        release_migration_lock(conn, owner)
+    return applied
+
+
+def applied_migrations(conn):
+    """(version, description, applied_at, duration_ms) rows, oldest first"""
+    cursor = conn.cursor()
+    if not _table_exists(cursor, VERSION_TABLE):
+        cursor.close()
+        return []
+    cursor.execute(
+        f"SELECT version, description, applied_at, duration_ms FROM {VERSION_TABLE} ORDER BY version"
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
@@ -0,0 +1,192 @@
+"""
+Keyset Pagination
+Seek pagination over (created_at, id) - or (timestamp, id) for the log
+tables - so page 500 costs the same index range scan as page 1, instead of
+OFFSET skipping (or .all() loading) every earlier row.
+
+    page = keyset_page(Visitor.query.filter_by(status='approved'), Visitor,
+                       cursor=request.args.get('cursor'))
+    for visitor in page.items: ...
+    page.next_cursor   # opaque token for the next page link / API response
+
+Exports that really need every row use stream_query(), which fetches in
+batches with yield_per instead of building one huge list.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 500
+
+# Column each model is ordered by (with id as tie-breaker)
+_SORT_COLUMNS = ('created_at', 'timestamp', 'registration_time')
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor token that cannot be decoded"""
+
+
+def sort_column(model):
+    """The (created_at | timestamp) column a model is paginated by"""
+    for name in _SORT_COLUMNS:
+        column = getattr(model, name, None)
+        if column is not None:
+            return column
+    raise ValueError(f"{model.__name__} has no created_at / timestamp column")
+
+
+def encode_cursor(sort_value, record_id, direction='next'):
+    """Opaque URL-safe token for the position after (sort_value, record_id)"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_value, record_id, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(sort_value, record_id, direction) from a token; raises InvalidCursor"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        sort_value, record_id, direction = json.loads(base64.urlsafe_b64decode(padded))
+        if sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value)
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return sort_value, int(record_id), direction
+    except (ValueError, TypeError, json.JSONDecodeError) as e:
+        raise InvalidCursor(f"Invalid page cursor: {token!r}") from e
+
+
+class KeysetPage:
+    """One page of rows plus the tokens for the neighbouring pages"""
+
+    def __init__(self, items, next_cursor, prev_cursor, per_page):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.per_page = per_page
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def next_url(self, endpoint, **values):
+        from flask import url_for
+
+        if self.next_cursor is None:
+            return None
+        return url_for(endpoint, cursor=self.next_cursor, per_page=self.per_page, **values)
+
+    def prev_url(self, endpoint, **values):
+        from flask import url_for
+
+        if self.prev_cursor is None:
+            return None
+        return url_for(endpoint, cursor=self.prev_cursor, per_page=self.per_page, **values)
+
+    def to_dict(self, serialize=None):
+        """JSON-ready dict for API responses"""
+        return {
+            'items': [serialize(item) if serialize else item for item in self.items],
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'per_page': self.per_page,
+        }
+
+
+def _after(column, id_column, sort_value, record_id, newest_first):
+    """
+    Rows strictly after (sort_value, record_id) in the page order. NULL sort
+    values sort last when newest first (SQLite puts NULLs first ascending).
+    """
+    from sqlalchemy import and_, or_
+
+    if newest_first:
+        if sort_value is None:
+            return and_(column.is_(None), id_column < record_id)
+        return or_(
+            column < sort_value,
+            and_(column == sort_value, id_column < record_id),
+            column.is_(None),
+        )
+    if sort_value is None:
+        return or_(and_(column.is_(None), id_column > record_id), column.isnot(None))
+    return or_(column > sort_value, and_(column == sort_value, id_column > record_id))
+
+
+def keyset_page(query, model, cursor=None, per_page=DEFAULT_PER_PAGE, newest_first=True):
+    """
+    One page of query ordered by (sort column, id), newest first by default.
+
+    query must not carry its own ORDER BY. cursor is a token from a previous
+    page's next_cursor / prev_cursor, or None for the first page.
+    """
+    per_page = max(1, min(int(per_page or DEFAULT_PER_PAGE), MAX_PER_PAGE))
+    column = sort_column(model)
+    id_column = model.id
+
+    direction = 'next'
+    if cursor:
+        sort_value, record_id, direction = decode_cursor(cursor)
+        # Walking backwards = walking forwards in the opposite order
+        forward = newest_first if direction == 'next' else not newest_first
+        query = query.filter(_after(column, id_column, sort_value, record_id, forward))
+    else:
+        forward = newest_first
+
+    if forward:
+        ordering = (column.desc(), id_column.desc())
+    else:
+        ordering = (column.asc(), id_column.asc())
+    rows = query.order_by(*ordering).limit(per_page + 1).all()
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+
+    def token(row, which):
+        return encode_cursor(getattr(row, column.key), row.id, which)
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if direction == 'next':
+            next_cursor = token(rows[-1], 'next') if more else None
+            prev_cursor = token(rows[0], 'prev') if cursor else None
+        else:
+            prev_cursor = token(rows[0], 'prev') if more else None
+            next_cursor = token(rows[-1], 'next')
+    return KeysetPage(rows, next_cursor, prev_cursor, per_page)
+
+
+def page_args(args=None):
+    """(cursor, per_page) from the request query string"""
+    if args is None:
+        from flask import request
+
+        args = request.args
+    try:
+        per_page = int(args.get('per_page', DEFAULT_PER_PAGE))
+    except (TypeError, ValueError):
+        per_page = DEFAULT_PER_PAGE
+    return args.get('cursor') or None, per_page
+
+
+def stream_query(query, batch_size=1000):
+    """
+    Iterate over every row of query, fetching batch_size rows at a time
+    (yield_per) so exports never hold the whole table in memory
+    """
+    yield from query.yield_per(batch_size)
@@ -0,0 +1,635 @@
+"""
+Background Report Jobs
+Large PDF / Excel / CSV reports are built by a small thread pool instead of
+inside the request, so no proxy timeout and no request worker tied up for a
+minute. The browser submits, polls the progress and downloads when ready:
+
+    job = submit_report('visits_xlsx', {'start': '2025-01-01', 'end': '2025-12-31'},
+                        created_by=job_owner(current_user))
+    ...
+    job = get_report_job(job_id, current_user)      # None -> 404
+    return report_download_response(job_id, current_user)
+
+A job belongs to the account that submitted it: only that account and
+admins (role admin / superadmin in users) can poll or download it; anyone
+else gets the same 404 as for an unknown id.
+
+Jobs live in the report_jobs table, so every worker process sees them:
+
+    dedupe     an identical request (same kind + params + owner) while one
+               is queued or running returns that job - a partial unique index makes
+               this hold across processes
+    caching    a finished result is returned for REPORT_JOB_RESULT_TTL
+               seconds without building it again
+    cleanup    expired results are deleted from REPORT_JOB_FOLDER, jobs of a
+               process that died (no heartbeat for REPORT_JOB_STALE_AFTER
+               seconds) are marked failed, leftover partial files removed
+
+Report builders are registered with @register_report and write one file:
+builder(params, path, progress), calling progress(done, total, message).
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from config import Config
+
+JOBS_TABLE = 'report_jobs'
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# users.role values that may see every account's jobs
+ADMIN_ROLES = ('admin', 'superadmin')
+
+# Same text format SQLAlchemy's DateTime uses on SQLite (UTC)
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+# Seconds between two progress writes of one job
+_PROGRESS_INTERVAL = 0.5
+
+JOB_COLUMNS = (
+    'id', 'kind', 'params', 'params_key', 'status', 'progress', 'message', 'error',
+    'result_path', 'result_name', 'mimetype', 'size', 'created_by',
+    'created_at', 'started_at', 'updated_at', 'finished_at', 'expires_at',
+)
+
+
+class ReportQueueFull(RuntimeError):
+    """Raised when REPORT_JOB_MAX_PENDING jobs are already queued or running"""
+
+
+class UnknownReport(ValueError):
+    """Raised for a report kind nobody registered"""
+
+
+# (builder, extension, mimetype) by report kind
+REPORT_BUILDERS = {}
+
+
+def register_report(kind, extension, mimetype):
+    """Decorator registering builder(params, path, progress) for kind"""
+    def decorator(builder):
+        REPORT_BUILDERS[kind] = (builder, extension, mimetype)
+        return builder
+    return decorator
+
+
+def _timestamp(value=None):
+    return (value or datetime.utcnow()).strftime(_TIMESTAMP_FORMAT)
+
+
+def params_key(kind, params, created_by=None):
+    """Identity of a request: equal kind + params (+ owner) give the same key"""
+    request = [kind, params or {}] + ([created_by] if created_by is not None else [])
+    payload = json.dumps(request, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# ----------------------------------------------------------------------
+# Schema (DB-API connection)
+# ----------------------------------------------------------------------
+
+def ensure_report_jobs_table(conn):
+    cursor = conn.cursor()
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {JOBS_TABLE} (\n"
+        f"    id VARCHAR(32) PRIMARY KEY,\n"
+        f"    kind VARCHAR(50) NOT NULL,\n"
+        f"    params TEXT NOT NULL,\n"
+        f"    params_key VARCHAR(64) NOT NULL,\n"
+        f"    status VARCHAR(20) NOT NULL,\n"
+        f"    progress REAL NOT NULL DEFAULT 0,\n"
+        f"    message VARCHAR(255),\n"
+        f"    error TEXT,\n"
+        f"    result_path VARCHAR(500),\n"
+        f"    result_name VARCHAR(255),\n"
+        f"    mimetype VARCHAR(100),\n"
+        f"    size INTEGER,\n"
+        f"    created_by VARCHAR(100),\n"
+        f"    created_at DATETIME NOT NULL,\n"
+        f"    started_at DATETIME,\n"
+        f"    updated_at DATETIME NOT NULL,\n"
+        f"    finished_at DATETIME,\n"
+        f"    expires_at DATETIME\n"
+        f")"
+    )
+    # At most one queued / running job per request, whichever process submits it
+    cursor.execute(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS ux_report_jobs_active ON {JOBS_TABLE} (params_key) "
+        f"WHERE status IN ('queued', 'running')"
+    )
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS ix_report_jobs_params_key ON {JOBS_TABLE} (params_key, status)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS ix_report_jobs_status_expires_at ON {JOBS_TABLE} (status, expires_at)")
+    cursor.close()
+    conn.commit()
+
+
+# ----------------------------------------------------------------------
+# Job queue
+# ----------------------------------------------------------------------
+
+class ReportJobs:
+    """
+    SQLite-backed report queue run by a thread pool in this process
+
+    connect is a callable returning a DB-API connection (e.g.
+    engine.raw_connection); every operation uses its own short connection.
+    """
+
+    def __init__(self, connect, workers=None, max_pending=None, result_ttl=None,
+                 folder=None, stale_after=None, cleanup_interval=None):
+        self.connect = connect
+        self.workers = workers or Config.REPORT_JOB_WORKERS
+        self.max_pending = max_pending or Config.REPORT_JOB_MAX_PENDING
+        self.result_ttl = Config.REPORT_JOB_RESULT_TTL if result_ttl is None else result_ttl
+        self.folder = folder or Config.REPORT_JOB_FOLDER
+        self.stale_after = stale_after or Config.REPORT_JOB_STALE_AFTER
+        self.cleanup_interval = Config.REPORT_JOB_CLEANUP_INTERVAL if cleanup_interval is None else cleanup_interval
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._owned = set()
+        self._heartbeat = None
+        self._stopping = threading.Event()
+        self._last_cleanup = 0.0
+
+    # ------------------------------------------------------------------
+    # Database helpers
+    # ------------------------------------------------------------------
+
+    def _execute(self, sql, params=(), fetch=False):
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall() if fetch else cursor.rowcount
+            cursor.close()
+            conn.commit()
+            return rows
+        finally:
+            conn.close()
+
+    def _row_to_job(self, row):
+        job = dict(zip(JOB_COLUMNS, row))
+        job['params'] = json.loads(job['params'])
+        job['ready'] = job['status'] == 'done'
+        return job
+
+    def get(self, job_id):
+        """Job dict (status, progress, message, ...) or None"""
+        rows = self._execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM {JOBS_TABLE} WHERE id = ?", (job_id,), fetch=True
+        )
+        return self._row_to_job(rows[0]) if rows else None
+
+    def recent(self, created_by=None, limit=20):
+        sql = f"SELECT {', '.join(JOB_COLUMNS)} FROM {JOBS_TABLE}"
+        params = []
+        if created_by is not None:
+            sql += " WHERE created_by = ?"
+            params.append(created_by)
+        rows = self._execute(sql + " ORDER BY created_at DESC LIMIT ?", params + [limit], fetch=True)
+        return [self._row_to_job(row) for row in rows]
+
+    # ------------------------------------------------------------------
+    # Submitting
+    # ------------------------------------------------------------------
+
+    def submit(self, kind, params=None, created_by=None):
+        """
+        Queue a report and return its job dict - or the job already queued /
+        running for the same request, or a finished one still within its TTL
+        """
+        if kind not in REPORT_BUILDERS:
+            raise UnknownReport(f"Unknown report: {kind}")
+        params = params or {}
+        # Per owner, so a deduplicated job is one the submitter may download
+        key = params_key(kind, params, created_by)
+        self._maybe_cleanup()
+
+        now = datetime.utcnow()
+        job_id = uuid.uuid4().hex
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            self._fail_stale(cursor, now)
+            cursor.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM {JOBS_TABLE} "
+                f"WHERE params_key = ? AND (status IN ('queued', 'running') "
+                f"OR (status = 'done' AND expires_at > ?)) "
+                f"ORDER BY created_at DESC LIMIT 1",
+                (key, _timestamp(now))
+            )
+            row = cursor.fetchone()
+            if row is not None:
+                job = self._row_to_job(row)
+                if job['status'] != 'done' or (job['result_path'] and os.path.exists(job['result_path'])):
+                    conn.rollback()
+                    return job
+
+            cursor.execute(f"SELECT COUNT(*) FROM {JOBS_TABLE} WHERE status IN ('queued', 'running')")
+            if cursor.fetchone()[0] >= self.max_pending:
+                conn.rollback()
+                raise ReportQueueFull(f"{self.max_pending} reports already queued")
+
+            cursor.execute(
+                f"INSERT INTO {JOBS_TABLE} (id, kind, params, params_key, status, progress, "
+                f"message, created_by, created_at, updated_at) "
+                f"VALUES (?, ?, ?, ?, 'queued', 0, 'Waiting to start', ?, ?, ?)",
+                (job_id, kind, json.dumps(params, sort_keys=True, default=str), key,
+                 created_by, _timestamp(now), _timestamp(now))
+            )
+            conn.commit()
+            cursor.close()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._owned.add(job_id)
+        self._get_executor().submit(self._run, job_id)
+        return self.get(job_id)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='report-job')
+                atexit.register(self.shutdown, False)
+            if self._heartbeat is None or not self._heartbeat.is_alive():
+                self._heartbeat = threading.Thread(target=self._beat, name='report-job-heartbeat', daemon=True)
+                self._heartbeat.start()
+            return self._executor
+
+    def wait(self, job_id, timeout=None, poll=0.1):
+        """Block until the job finishes (scripts); returns the job dict"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] not in ACTIVE_STATUSES:
+                return job
+            if deadline is not None and time.monotonic() > deadline:
+                return job
+            time.sleep(poll)
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+
+    def _run(self, job_id):
+        try:
+            self._build(job_id)
+        finally:
+            with self._lock:
+                self._owned.discard(job_id)
+
+    def _build(self, job_id):
+        started = self._execute(
+            f"UPDATE {JOBS_TABLE} SET status = 'running', message = 'Starting', "
+            f"started_at = ?, updated_at = ? WHERE id = ? AND status = 'queued'",
+            (_timestamp(), _timestamp(), job_id)
+        )
+        if not started:
+            return
+        job = self.get(job_id)
+        builder, extension, mimetype = REPORT_BUILDERS[job['kind']]
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, f"{job_id}.{extension}")
+        temp_path = path + '.part'
+        try:
+            builder(job['params'], temp_path, self._progress_callback(job_id))
+            os.replace(temp_path, path)
+            finished = datetime.utcnow()
+            done = self._execute(
+                f"UPDATE {JOBS_TABLE} SET status = 'done', progress = 1, message = 'Ready', "
+                f"result_path = ?, result_name = ?, mimetype = ?, size = ?, "
+                f"finished_at = ?, updated_at = ?, expires_at = ? WHERE id = ? AND status = 'running'",
+                (path, _result_name(job, extension), mimetype, os.path.getsize(path),
+                 _timestamp(finished), _timestamp(finished),
+                 _timestamp(finished + timedelta(seconds=self.result_ttl)), job_id)
+            )
+            if not done:
+                # Failed as stale meanwhile - nothing will ever serve the file
+                os.remove(path)
+        except Exception as e:
+            print(f"❌ Report job {job_id} ({job['kind']}) failed: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            self._execute(
+                f"UPDATE {JOBS_TABLE} SET status = 'failed', message = 'Failed', error = ?, "
+                f"finished_at = ?, updated_at = ? WHERE id = ?",
+                (str(e), _timestamp(), _timestamp(), job_id)
+            )
+
+    def _progress_callback(self, job_id):
+        last_write = [0.0]
+
+        def progress(done, total=None, message=None):
+            now = time.monotonic()
+            if now - last_write[0] < _PROGRESS_INTERVAL:
+                return
+            last_write[0] = now
+            fraction = min(done / total, 0.99) if total else 0.0
+            self._execute(
+                f"UPDATE {JOBS_TABLE} SET progress = ?, message = COALESCE(?, message), "
+                f"updated_at = ? WHERE id = ?",
+                (fraction, message, _timestamp(), job_id)
+            )
+
+        return progress
+
+    def _beat(self):
+        """
+        Keep updated_at fresh for this process's queued and running jobs,
+        so only jobs of a process that is gone ever look stale
+        """
+        interval = max(self.stale_after / 3.0, 1.0)
+        while not self._stopping.wait(interval):
+            with self._lock:
+                owned = list(self._owned)
+            if not owned:
+                continue
+            try:
+                self._execute(
+                    f"UPDATE {JOBS_TABLE} SET updated_at = ? "
+                    f"WHERE id IN ({', '.join('?' for _ in owned)}) AND status IN ('queued', 'running')",
+                    [_timestamp()] + owned
+                )
+            except Exception as e:
+                print(f"⚠️ Report job heartbeat failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Cleanup
+    # ------------------------------------------------------------------
+
+    def _fail_stale(self, cursor, now):
+        """Jobs no process has touched for stale_after seconds are dead"""
+        cursor.execute(
+            f"UPDATE {JOBS_TABLE} SET status = 'failed', message = 'Failed', "
+            f"error = 'Worker stopped before the report finished', finished_at = ? "
+            f"WHERE status IN ('queued', 'running') AND updated_at < ?",
+            (_timestamp(now), _timestamp(now - timedelta(seconds=self.stale_after)))
+        )
+        return cursor.rowcount
+
+    def _maybe_cleanup(self):
+        if not self.cleanup_interval:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_cleanup < self.cleanup_interval:
+                return
+            self._last_cleanup = now
+        try:
+            self.cleanup()
+        except Exception as e:
+            print(f"⚠️ Report job cleanup failed: {e}")
+
+    def cleanup(self, keep_days=7):
+        """
+        Delete expired results, fail stale jobs, drop job rows older than
+        keep_days and files no job refers to. Files modified within the last
+        stale_after seconds are left alone - they may belong to a job
+        submitted after the active jobs were read. Returns counts per action.
+        """
+        now = datetime.utcnow()
+        counts = {'expired': 0, 'stale': 0, 'deleted_jobs': 0, 'orphan_files': 0}
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            counts['stale'] = self._fail_stale(cursor, now)
+            cursor.execute(
+                f"SELECT id, result_path FROM {JOBS_TABLE} WHERE status = 'done' AND expires_at <= ?",
+                (_timestamp(now),)
+            )
+            expired = cursor.fetchall()
+            cursor.executemany(
+                f"UPDATE {JOBS_TABLE} SET status = 'expired', result_path = NULL, updated_at = ? WHERE id = ?",
+                [(_timestamp(now), job_id) for job_id, _ in expired]
+            )
+            cursor.execute(
+                f"DELETE FROM {JOBS_TABLE} WHERE status IN ('failed', 'expired') AND updated_at < ?",
+                (_timestamp(now - timedelta(days=keep_days)),)
+            )
+            counts['deleted_jobs'] = cursor.rowcount
+            cursor.execute(f"SELECT result_path FROM {JOBS_TABLE} WHERE result_path IS NOT NULL")
+            referenced = {os.path.abspath(path) for (path,) in cursor.fetchall()}
+            cursor.execute(f"SELECT id FROM {JOBS_TABLE} WHERE status IN ('queued', 'running')")
+            active = {job_id for (job_id,) in cursor.fetchall()}
+            conn.commit()
+            cursor.close()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        for _, path in expired:
+            if path and os.path.exists(path):
+                os.remove(path)
+            counts['expired'] += 1
+
+        if os.path.isdir(self.folder):
+            recent = time.time() - self.stale_after
+            for name in os.listdir(self.folder):
+                path = os.path.abspath(os.path.join(self.folder, name))
+                if path in referenced or name.split('.', 1)[0] in active:
+                    continue
+                try:
+                    if os.path.getmtime(path) > recent:
+                        continue
+                    os.remove(path)
+                    counts['orphan_files'] += 1
+                except OSError:
+                    pass
+        return counts
+
+    def shutdown(self, wait=True):
+        self._stopping.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def _result_name(job, extension):
+    params = job['params']
+    span = '_'.join(str(params[key])[:10] for key in ('start', 'end') if params.get(key))
+    return f"{job['kind']}{'_' + span if span else ''}.{extension}"
+
+
+# ----------------------------------------------------------------------
+# Process-wide queue
+# ----------------------------------------------------------------------
+
+_report_jobs = None
+_report_jobs_lock = threading.Lock()
+
+
+def init_report_jobs(connect, **options):
+    """Create the process-wide queue (create_app passes db.engine.raw_connection)"""
+    global _report_jobs
+    with _report_jobs_lock:
+        if _report_jobs is not None:
+            _report_jobs.shutdown(wait=False)
+        _report_jobs = ReportJobs(connect, **options)
+    return _report_jobs
+
+
+def get_report_jobs():
+    if _report_jobs is None:
+        raise RuntimeError("Report jobs not initialised - call init_report_jobs() first")
+    return _report_jobs
+
+
+def submit_report(kind, params=None, created_by=None):
+    return get_report_jobs().submit(kind, params, created_by)
+
+
+def job_owner(user):
+    """created_by for a logged-in principal (users and hosts share ids)"""
+    return f"{user.kind}:{user.id}"
+
+
+def can_access_job(job, user):
+    """The submitting account, or an admin / superadmin user"""
+    if job is None or user is None or not getattr(user, 'is_authenticated', False):
+        return False
+    if user.kind == 'user' and user.role in ADMIN_ROLES:
+        return True
+    return job['created_by'] is not None and job['created_by'] == job_owner(user)
+
+
+def get_report_job(job_id, user):
+    """Job dict when user may see it, else None (answer 404 either way)"""
+    job = get_report_jobs().get(job_id)
+    return job if can_access_job(job, user) else None
+
+
+def report_status_json(job):
+    """What the polling endpoint returns (no server paths)"""
+    return {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'progress': round(job['progress'] or 0.0, 3),
+        'message': job['message'],
+        'error': job['error'],
+        'ready': job['ready'],
+        'created_at': job['created_at'],
+        'finished_at': job['finished_at'],
+        'expires_at': job['expires_at'],
+    }
+
+
+def report_download_response(job_id, user):
+    """The finished file as an attachment, or 404 when missing / expired / not user's"""
+    from flask import abort, send_file
+
+    job = get_report_job(job_id, user)
+    if job is None or job['status'] != 'done' or not job['result_path'] or not os.path.exists(job['result_path']):
+        abort(404)
+    return send_file(job['result_path'], mimetype=job['mimetype'], as_attachment=True,
+                     download_name=job['result_name'], conditional=True)
+
+
+# ----------------------------------------------------------------------
+# Built-in reports (visit history, see utils/visit_export.py)
+# ----------------------------------------------------------------------
+
+def _visit_export(params):
+    from utils.visit_export import VisitExport
+
+    return VisitExport(
+        columns=params.get('columns'), start=params.get('start'),
+        end=params.get('end'), status=params.get('status'),
+    )
+
+
+def _write_chunks(export, chunks, path, progress):
+    total = export.count()
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            progress(export.rows_written, total, f"{export.rows_written:,} of {total:,} visits")
+
+
+@register_report('visits_csv', 'csv', 'text/csv')
+def build_visits_csv(params, path, progress):
+    export = _visit_export(params)
+    _write_chunks(export, export.csv_chunks(), path, progress)
+
+
+@register_report('visits_xlsx', 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+def build_visits_xlsx(params, path, progress):
+    from utils.lazy_imports import openpyxl
+
+    export = _visit_export(params)
+    export.fit_sheet()
+    total = export.count()
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Visits')
+    sheet.append(export.columns)
+    for written, row in enumerate(export.rows(), 1):
+        sheet.append(row)
+        if written % 1000 == 0:
+            progress(written, total, f"{written:,} of {total:,} visits")
+    progress(total, total, "Saving workbook")
+    workbook.save(path)
+
+
+@register_report('visits_pdf', 'pdf', 'application/pdf')
+def build_visits_pdf(params, path, progress):
+    from reportlab.lib.pagesizes import A4, landscape
+
+    from utils.lazy_imports import reportlab_canvas
+
+    export = _visit_export(dict(params, columns=params.get('columns') or [
+        'full_name', 'company', 'host_name', 'visit_date', 'status', 'check_in_time', 'check_out_time',
+    ]))
+    total = export.count()
+    width, height = landscape(A4)
+    margin = 36
+    line_height = 13
+    column_width = (width - 2 * margin) / len(export.columns)
+    max_chars = max(int(column_width / 4.6), 4)
+
+    pdf = reportlab_canvas.Canvas(path, pagesize=(width, height))
+    title = f"Visit history {params.get('start') or ''} - {params.get('end') or ''}".strip(' -')
+
+    def start_page(page):
+        pdf.setFont('Helvetica-Bold', 12)
+        pdf.drawString(margin, height - margin, title)
+        pdf.setFont('Helvetica', 8)
+        pdf.drawRightString(width - margin, height - margin, f"Page {page}")
+        pdf.setFont('Helvetica-Bold', 8)
+        for index, column in enumerate(export.columns):
+            pdf.drawString(margin + index * column_width, height - margin - 22, column.replace('_', ' ').title())
+        pdf.setFont('Helvetica', 8)
+        return height - margin - 22 - line_height
+
+    page = 1
+    y = start_page(page)
+    for written, row in enumerate(export.rows(), 1):
+        if y < margin:
+            pdf.showPage()
+            page += 1
+            y = start_page(page)
+        for index, value in enumerate(row):
+            text = '' if value is None else str(value)
+            pdf.drawString(margin + index * column_width, y, text[:max_chars])
+        y -= line_height
+        if written % 500 == 0:
+            progress(written, total, f"{written:,} of {total:,} visits")
+    progress(total, total, "Saving PDF")
+    pdf.save()
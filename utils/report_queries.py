@@ -0,0 +1,314 @@
+"""
+Report Queries
+Every analytics report as one aggregate SQL query over the 'visits' read
+model (public and host-registered visits), so SQLite returns only the
+grouped rows - a few hundred for a year - instead of every visit being
+loaded into a DataFrame and grouped in memory. pandas is only used to
+shape those small results (pivots, filling missing days).
+
+All queries take :start and :end (ISO dates, inclusive) and filter on
+visit_date, which ix_visits_visit_date_status covers.
+
+Ranges reaching into archived months (utils/archive.py) read those visits
+too: the query runs unchanged with 'visits' shadowed by the live and
+archived rows. When the range has more archived months than SQLite can
+attach at once, REPORT_MERGES computes additive partial aggregates per
+group of months and one final query combines them.
+"""
+
+import sqlite3
+from datetime import date, timedelta
+
+REPORT_QUERIES = {
+    # day, visits, checked_out, running total
+    'daily_counts': """
+        SELECT visit_date AS day,
+               COUNT(*) AS visits,
+               SUM(status IN ('checked-out', 'checked_out')) AS checked_out,
+               SUM(COUNT(*)) OVER (ORDER BY visit_date) AS cumulative_visits
+        FROM visits
+        WHERE visit_date BETWEEN :start AND :end
+        GROUP BY visit_date
+        ORDER BY visit_date
+    """,
+
+    'status_breakdown': """
+        SELECT COALESCE(status, 'unknown') AS status, COUNT(*) AS visits
+        FROM visits
+        WHERE visit_date BETWEEN :start AND :end
+        GROUP BY 1
+        ORDER BY visits DESC, status
+    """,
+
+    # day x status counts, pivoted by daily_status_matrix()
+    'daily_status': """
+        SELECT visit_date AS day, COALESCE(status, 'unknown') AS status, COUNT(*) AS visits
+        FROM visits
+        WHERE visit_date BETWEEN :start AND :end
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """,
+
+    'top_companies': """
+        SELECT company, COUNT(*) AS visits
+        FROM visits
+        WHERE visit_date BETWEEN :start AND :end AND company IS NOT NULL AND company != ''
+        GROUP BY company
+        ORDER BY visits DESC, company
+        LIMIT :limit
+    """,
+
+    # Three busiest companies of every month
+    'monthly_top_companies': """
+        SELECT month, company, visits, rank FROM (
+            SELECT substr(visit_date, 1, 7) AS month, company, COUNT(*) AS visits,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY substr(visit_date, 1, 7) ORDER BY COUNT(*) DESC, company
+                   ) AS rank
+            FROM visits
+            WHERE visit_date BETWEEN :start AND :end AND company IS NOT NULL AND company != ''
+            GROUP BY 1, 2
+        )
+        WHERE rank <= 3
+        ORDER BY month, rank
+    """,
+
+    'visitor_types': """
+        SELECT COALESCE(visitor_type, 'unknown') AS visitor_type, COUNT(*) AS visits
+        FROM visits
+        WHERE visit_date BETWEEN :start AND :end
+        GROUP BY 1
+        ORDER BY visits DESC, visitor_type
+    """,
+
+    'hourly_checkins': """
+        SELECT CAST(strftime('%H', check_in_time) AS INTEGER) AS hour, COUNT(*) AS checkins
+        FROM visits
+        WHERE visit_date BETWEEN :start AND :end AND check_in_time IS NOT NULL
+        GROUP BY 1
+        ORDER BY 1
+    """,
+
+    # Minutes on site for visits with both check-in and check-out
+    'visit_durations': """
+        SELECT visit_date AS day,
+               COUNT(*) AS completed,
+               AVG((julianday(check_out_time) - julianday(check_in_time)) * 1440.0) AS avg_minutes,
+               MAX((julianday(check_out_time) - julianday(check_in_time)) * 1440.0) AS max_minutes
+        FROM visits
+        WHERE visit_date BETWEEN :start AND :end
+          AND check_in_time IS NOT NULL AND check_out_time IS NOT NULL
+        GROUP BY visit_date
+        ORDER BY visit_date
+    """,
+
+    'repeat_visitors': """
+        SELECT email, COUNT(*) AS visits, MIN(visit_date) AS first_visit, MAX(visit_date) AS last_visit
+        FROM visits
+        WHERE visit_date BETWEEN :start AND :end AND email IS NOT NULL AND email != ''
+        GROUP BY email
+        HAVING COUNT(*) > 1
+        ORDER BY visits DESC, email
+        LIMIT :limit
+    """,
+}
+
+
+# name -> (per-group query over 'visits', final query over their rows in
+# 'partials'); None reuses the REPORT_QUERIES entry as the partial query
+REPORT_MERGES = {
+    'daily_counts': ("""
+        SELECT visit_date AS day,
+               COUNT(*) AS visits,
+               SUM(status IN ('checked-out', 'checked_out')) AS checked_out
+        FROM visits
+        WHERE visit_date BETWEEN :start AND :end
+        GROUP BY visit_date
+    """, """
+        SELECT day, SUM(visits) AS visits, SUM(checked_out) AS checked_out,
+               SUM(SUM(visits)) OVER (ORDER BY day) AS cumulative_visits
+        FROM partials
+        GROUP BY day
+        ORDER BY day
+    """),
+
+    'status_breakdown': (None, """
+        SELECT status, SUM(visits) AS visits
+        FROM partials
+        GROUP BY status
+        ORDER BY visits DESC, status
+    """),
+
+    'daily_status': (None, """
+        SELECT day, status, SUM(visits) AS visits
+        FROM partials
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """),
+
+    'top_companies': ("""
+        SELECT company, COUNT(*) AS visits
+        FROM visits
+        WHERE visit_date BETWEEN :start AND :end AND company IS NOT NULL AND company != ''
+        GROUP BY company
+    """, """
+        SELECT company, SUM(visits) AS visits
+        FROM partials
+        GROUP BY company
+        ORDER BY visits DESC, company
+        LIMIT :limit
+    """),
+
+    'monthly_top_companies': ("""
+        SELECT substr(visit_date, 1, 7) AS month, company, COUNT(*) AS visits
+        FROM visits
+        WHERE visit_date BETWEEN :start AND :end AND company IS NOT NULL AND company != ''
+        GROUP BY 1, 2
+    """, """
+        SELECT month, company, visits, rank FROM (
+            SELECT month, company, SUM(visits) AS visits,
+                   ROW_NUMBER() OVER (PARTITION BY month ORDER BY SUM(visits) DESC, company) AS rank
+            FROM partials
+            GROUP BY 1, 2
+        )
+        WHERE rank <= 3
+        ORDER BY month, rank
+    """),
+
+    'visitor_types': (None, """
+        SELECT visitor_type, SUM(visits) AS visits
+        FROM partials
+        GROUP BY visitor_type
+        ORDER BY visits DESC, visitor_type
+    """),
+
+    'hourly_checkins': (None, """
+        SELECT hour, SUM(checkins) AS checkins
+        FROM partials
+        GROUP BY hour
+        ORDER BY hour
+    """),
+
+    'visit_durations': ("""
+        SELECT visit_date AS day,
+               COUNT(*) AS completed,
+               SUM((julianday(check_out_time) - julianday(check_in_time)) * 1440.0) AS total_minutes,
+               MAX((julianday(check_out_time) - julianday(check_in_time)) * 1440.0) AS max_minutes
+        FROM visits
+        WHERE visit_date BETWEEN :start AND :end
+          AND check_in_time IS NOT NULL AND check_out_time IS NOT NULL
+        GROUP BY visit_date
+    """, """
+        SELECT day, SUM(completed) AS completed,
+               SUM(total_minutes) / SUM(completed) AS avg_minutes,
+               MAX(max_minutes) AS max_minutes
+        FROM partials
+        GROUP BY day
+        ORDER BY day
+    """),
+
+    'repeat_visitors': ("""
+        SELECT email, COUNT(*) AS visits, MIN(visit_date) AS first_visit, MAX(visit_date) AS last_visit
+        FROM visits
+        WHERE visit_date BETWEEN :start AND :end AND email IS NOT NULL AND email != ''
+        GROUP BY email
+    """, """
+        SELECT email, SUM(visits) AS visits, MIN(first_visit) AS first_visit, MAX(last_visit) AS last_visit
+        FROM partials
+        GROUP BY email
+        HAVING SUM(visits) > 1
+        ORDER BY visits DESC, email
+        LIMIT :limit
+    """),
+}
+
+
+def report_params(start=None, end=None, limit=10):
+    """:start / :end / :limit bind values (default: the last 30 days)"""
+    end = end or date.today()
+    start = start or end - timedelta(days=30)
+    return {'start': str(start)[:10], 'end': str(end)[:10], 'limit': int(limit)}
+
+
+def run_report(name, start=None, end=None, limit=10, read=None, connection=None, folder=None):
+    """
+    DataFrame for one REPORT_QUERIES entry, archived visits in the range
+    included. read(sql, params) defaults to the read-only analytics engine;
+    a custom read sees the archives when connection - the DB-API connection
+    it reads from - is passed as well.
+    """
+    params = report_params(start, end, limit)
+    if read is None:
+        from sqlalchemy import text
+
+        from utils.analytics_db import analytics_connection
+        from utils.lazy_imports import pd
+
+        with analytics_connection() as conn:
+            def read_analytics(sql, values):
+                return pd.read_sql_query(text(sql), conn, params=values)
+
+            return report_frame(name, params, read_analytics, conn.connection, folder)
+    if connection is None:
+        return read(REPORT_QUERIES[name], params)
+    return report_frame(name, params, read, connection, folder)
+
+
+def report_frame(name, params, read, connection, folder=None):
+    """One report over the live and archived visits, read through connection"""
+    from utils.archive import archived_months, attached_months, month_groups, with_archives
+
+    months = archived_months(params['start'], params['end'], folder)
+    if not months:
+        return read(REPORT_QUERIES[name], params)
+
+    groups = month_groups(months)
+    partial, final = REPORT_MERGES[name]
+    frames = []
+    cursor = connection.cursor()
+    try:
+        for index, group in enumerate(groups):
+            with attached_months(connection, group, folder) as aliases:
+                if len(groups) == 1:
+                    return read(with_archives(cursor, REPORT_QUERIES[name], aliases), params)
+                sql = with_archives(cursor, partial or REPORT_QUERIES[name], aliases, live=index == 0)
+                frames.append(read(sql, params))
+    finally:
+        cursor.close()
+    return _merge_partials(frames, final, params)
+
+
+def _merge_partials(frames, final, params):
+    """final over the concatenated per-group frames (a few thousand rows)"""
+    from utils.lazy_imports import pd
+
+    conn = sqlite3.connect(':memory:')
+    try:
+        pd.concat(frames, ignore_index=True).to_sql('partials', conn, index=False)
+        return pd.read_sql_query(final, conn, params=params)
+    finally:
+        conn.close()
+
+
+# ----------------------------------------------------------------------
+# Final shaping (small, already aggregated frames)
+# ----------------------------------------------------------------------
+
+def fill_days(frame, start, end, columns=('visits',)):
+    """One row per day in [start, end], zero where nothing happened"""
+    from utils.lazy_imports import pd
+
+    days = pd.date_range(str(start)[:10], str(end)[:10], freq='D').strftime('%Y-%m-%d')
+    filled = frame.set_index('day').reindex(days)
+    filled.index.name = 'day'
+    for column in columns:
+        filled[column] = filled[column].fillna(0).astype('int64')
+    return filled.reset_index()
+
+
+def daily_status_matrix(start=None, end=None, read=None):
+    """day x status table of visit counts for the stacked status chart"""
+    frame = run_report('daily_status', start, end, read=read)
+    if frame.empty:
+        return frame
+    return frame.pivot(index='day', columns='status', values='visits').fillna(0).astype('int64')
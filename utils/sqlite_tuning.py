@@ -0,0 +1,69 @@
+"""
+SQLite Connection Tuning
+PRAGMAs applied to every new SQLite connection so security desk check-ins
+and public registrations can write at the same time without
+"database is locked" errors:
+
+    journal_mode=WAL      readers no longer block the writer (and vice versa)
+    busy_timeout          wait for the write lock instead of failing at once
+    synchronous=NORMAL    fsync at checkpoints only - safe with WAL
+    mmap_size / cache_size / temp_store   fewer read syscalls, sorts in memory
+
+All values come from config.Config (SQLITE_*).
+"""
+
+from config import Config
+
+_registered = False
+
+
+def sqlite_pragmas():
+    """(pragma, value) pairs in the order they are applied"""
+    return [
+        ('journal_mode', Config.SQLITE_JOURNAL_MODE),
+        ('busy_timeout', int(Config.SQLITE_BUSY_TIMEOUT_MS)),
+        ('synchronous', Config.SQLITE_SYNCHRONOUS),
+        ('mmap_size', int(Config.SQLITE_MMAP_SIZE)),
+        ('cache_size', int(Config.SQLITE_CACHE_SIZE)),
+        ('temp_store', Config.SQLITE_TEMP_STORE),
+    ]
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas=None):
+    """Run the PRAGMAs on a DB-API (sqlite3) connection"""
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas or sqlite_pragmas():
+        if value is None:
+            continue
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def sqlite_engine_options():
+    """SQLALCHEMY_ENGINE_OPTIONS for the app's SQLite database"""
+    return {
+        'connect_args': {
+            # pysqlite's own busy handler, in seconds
+            'timeout': Config.SQLITE_BUSY_TIMEOUT_MS / 1000.0,
+        },
+    }
+
+
+def register_sqlite_tuning():
+    """Apply the PRAGMAs to every SQLite connection any engine opens"""
+    global _registered
+    if _registered:
+        return
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # Read-only analytics connections configure themselves (utils/analytics_db.py)
+        if getattr(dbapi_connection, 'read_only', False):
+            return
+        if type(dbapi_connection).__module__.startswith('sqlite3'):
+            apply_sqlite_pragmas(dbapi_connection)
+
+    _registered = True
@@ -0,0 +1,295 @@
+"""
+Login User Cache
+Flask-Login calls load_user on every authenticated request, and the security
+desk polls all day, so the users / hosts primary-key lookup is the most
+frequent query the app runs. This keeps a small TTL + LRU cache of the
+login-relevant column values (never password_hash) keyed by (table, id):
+
+    ('user', 3)   admin / security accounts (users table)
+    ('host', 7)   hosts table
+
+Only plain values are cached. load_user builds a new Principal from them for
+each request, which answers everything Flask-Login and the templates need
+without a query. Any other attribute or method (check_password,
+relationships, ...) comes from the ORM row in the request's own session,
+loaded on first use, so existing code keeps working. isinstance(current_user,
+User) still holds. Setting an attribute on a Principal sets it on that ORM
+row (current_user.model), so a view that changes the account and commits
+writes what it always wrote.
+
+Entries are dropped after a users / hosts row is inserted, updated or
+deleted (once the transaction commits). Other worker processes and scripts
+are covered by data_version.version for 'users' (utils/chart_cache.py),
+which SQLite triggers on users / hosts bump on every write: each entry
+remembers the version it was read at and is reloaded once that moves. The
+check is a one-row primary-key read per request; USER_CACHE_TTL stays as
+the backstop for databases that predate the triggers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+# Columns copied onto the principal (whichever the model has)
+PRINCIPAL_FIELDS = (
+    'id', 'username', 'email', 'full_name', 'role', 'is_active',
+    'department', 'designation', 'is_approved', 'approval_status',
+)
+
+# Cached "no such row" marker, so the session-less fallback in load_user
+# does not query users again for every host request
+MISSING = object()
+
+_TABLES = {'users': 'user', 'hosts': 'host'}
+
+# data_version row bumped by the users / hosts triggers
+USERS_DATA = 'users'
+
+
+def principal_values(row):
+    """The cached column values of a User / Host row"""
+    return {field: getattr(row, field) for field in PRINCIPAL_FIELDS if hasattr(row, field)}
+
+
+class Principal:
+    """Per-request stand-in for a User / Host row in current_user"""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, kind, model, values):
+        self.__dict__['kind'] = kind
+        self.__dict__['_model'] = model
+        self.__dict__.update(values)
+
+    @classmethod
+    def from_row(cls, kind, row):
+        return cls(kind, type(row), principal_values(row))
+
+    @property
+    def __class__(self):
+        # isinstance(current_user, User / Host) keeps working in the routes
+        return self._model
+
+    @property
+    def is_active(self):
+        return self.__dict__.get('is_active') is not False
+
+    def get_id(self):
+        return str(self.id)
+
+    @property
+    def model(self):
+        """
+        The ORM row for code that needs it, from the current request's
+        session (its identity map makes repeated access free)
+        """
+        from models.database import db
+
+        return db.session.get(self._model, self.id)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        row = self.model
+        if row is None:
+            raise AttributeError(name)
+        return getattr(row, name)
+
+    def __setattr__(self, name, value):
+        # Writes go to the ORM row in the request's session, which commits
+        # them; the cached copy on this principal follows
+        row = self.model
+        if row is None:
+            raise AttributeError(name)
+        setattr(row, name, value)
+        if name in self.__dict__:
+            self.__dict__[name] = value
+
+    def __eq__(self, other):
+        if isinstance(other, Principal):
+            return (self.kind, self.id) == (other.kind, other.id)
+        return isinstance(other, self._model) and other.id == self.id
+
+    def __hash__(self):
+        return hash((self.kind, self.id))
+
+    def __repr__(self):
+        return f"<Principal {self.kind} {self.id} {self.__dict__.get('username')!r}>"
+
+
+class UserCache:
+    """Thread-safe TTL + LRU map of (kind, id) -> (data version, column values / MISSING)"""
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Cached value for key, or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, kind, record_id):
+        with self._lock:
+            if self._entries.pop((kind, record_id), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    """The process-wide cache (sized from Config.USER_CACHE_*)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = UserCache(Config.USER_CACHE_MAX_SIZE, Config.USER_CACHE_TTL)
+    return _cache
+
+
+def load_principal(kind, model, record_id):
+    """
+    New Principal for (kind, id) from the cached values, querying the model
+    on a miss or when the 'users' data version moved since they were read.
+    Returns None when the row does not exist.
+
+    Reads of cached columns never query; other attributes and every write
+    go through the ORM row (Principal.model) in the current session.
+    """
+    from models.database import db
+    from utils.chart_cache import data_version
+
+    cache = get_user_cache()
+    key = (kind, record_id)
+    version = data_version(USERS_DATA)
+    cached = cache.get(key)
+    if cached is None or cached[0] != version:
+        row = db.session.get(model, record_id)
+        cached = (version, principal_values(row) if row is not None else MISSING)
+        cache.put(key, cached)
+    values = cached[1]
+    if values is MISSING:
+        return None
+    return Principal(kind, model, values)
+
+
+def ensure_user_data_version(conn):
+    """data_version row for 'users' and the users / hosts triggers (DB-API connection)"""
+    from utils.chart_cache import DATA_VERSION_TABLE, ensure_data_version_table, trigger_sql
+
+    ensure_data_version_table(conn)
+    cursor = conn.cursor()
+    cursor.execute(f"INSERT OR IGNORE INTO {DATA_VERSION_TABLE} (name, version) VALUES (?, 0)", (USERS_DATA,))
+    for table in _TABLES:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        if cursor.fetchone() is not None:
+            for statement in trigger_sql(USERS_DATA, (table,)):
+                cursor.execute(statement)
+    cursor.close()
+    conn.commit()
+
+
+def user_cache_stats():
+    return get_user_cache().stats()
+
+
+def _queue_invalidation(mapper, connection, target):
+    from sqlalchemy.orm import object_session
+
+    kind = _TABLES[mapper.local_table.name]
+    get_user_cache().invalidate(kind, target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('user_cache_invalidations', set()).add((kind, target.id))
+
+
+def apply_user_cache_invalidations(session):
+    cache = get_user_cache()
+    for kind, record_id in session.info.pop('user_cache_invalidations', ()):
+        cache.invalidate(kind, record_id)
+
+
+def discard_user_cache_invalidations(session):
+    session.info.pop('user_cache_invalidations', None)
+
+
+_listeners_lock = threading.Lock()
+_registered_models = set()
+_session_listeners_registered = False
+
+
+def register_user_cache_listeners(user_model, host_model):
+    """
+    Drop cached principals when a users / hosts row is inserted (clears a
+    cached MISSING), updated (deactivated, approved, role changed, ...) or
+    deleted. Keys are collected during flush and evicted after commit, and
+    once more immediately so requests in this process stop using them now.
+
+    Safe to call once per create_app(): each model and the Session hooks are
+    registered only once per process.
+    """
+    global _session_listeners_registered
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    with _listeners_lock:
+        for model in (user_model, host_model):
+            if model in _registered_models:
+                continue
+            _registered_models.add(model)
+            for name in ('after_insert', 'after_update', 'after_delete'):
+                event.listen(model, name, _queue_invalidation)
+
+        if not _session_listeners_registered:
+            _session_listeners_registered = True
+            event.listen(Session, 'after_commit', apply_user_cache_invalidations)
+            event.listen(Session, 'after_rollback', discard_user_cache_invalidations)
@@ -0,0 +1,187 @@
+"""
+Visit Days
+Multi-day visits keep their days as free text in visit_dates next to
+no_of_days. visit_days(visit_source, visit_id, day) holds one row per
+scheduled day of every visit (single-day visits included), indexed on day,
+so "who is expected on date X" is an index lookup joined to the visits read
+model instead of parsing strings in Python.
+
+Like the 'visits' read model, it is kept in sync by SQLite triggers on
+visitors / host_visitors, so raw SQL, scripts and every app process write
+the same days. visit_dates may be a JSON list or a comma / semicolon /
+newline / | separated list of dates as YYYY-MM-DD (a DATETIME prefix is
+fine), DD-MM-YYYY, DD/MM/YYYY, DD.MM.YYYY or YYYY/MM/DD. When it holds no
+readable date, no_of_days consecutive days from visit_date are used.
+"""
+
+VISIT_DAYS_TABLE = 'visit_days'
+
+# Numbers 0 .. _MAX_DAYS - 1, joined against to expand no_of_days (SQLite
+# does not allow WITH RECURSIVE inside a trigger)
+VISIT_DAY_OFFSETS_TABLE = 'visit_day_offsets'
+
+SOURCE_TABLES = {
+    'visitor': 'visitors',
+    'host_visitor': 'host_visitors',
+}
+
+_MAX_DAYS = 366
+
+
+# ----------------------------------------------------------------------
+# SQL
+# ----------------------------------------------------------------------
+
+def day_sql(value):
+    """SQL expression: value as an ISO date, or NULL when it is not readable"""
+    return (
+        f"CASE "
+        f"WHEN {value} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' "
+        f"THEN date(substr({value}, 1, 10)) "
+        f"WHEN {value} GLOB '[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]' "
+        f"THEN date(replace({value}, '/', '-')) "
+        f"WHEN {value} GLOB '[0-9][0-9][-/.][0-9][0-9][-/.][0-9][0-9][0-9][0-9]' "
+        f"THEN date(substr({value}, 7, 4) || '-' || substr({value}, 4, 2) || '-' || substr({value}, 1, 2)) "
+        f"END"
+    )
+
+
+def _json_list_sql(value):
+    """SQL expression: a visit_dates value as a JSON array ('[]' if unreadable)"""
+    separated = (
+        f"replace(replace(replace(trim({value}, '[] '), char(10), ','), ';', ','), '|', ',')"
+    )
+    as_json = f"'[\"' || replace({separated}, ',', '\",\"') || '\"]'"
+    return (
+        f"CASE WHEN json_valid({value}) AND json_type({value}) = 'array' THEN {value} "
+        f"WHEN json_valid({as_json}) THEN {as_json} ELSE '[]' END"
+    )
+
+
+def insert_days_sql(source, row, table=None):
+    """
+    The two statements writing one visit's days: the readable dates of
+    visit_dates, otherwise no_of_days days from visit_date. row is 'NEW'
+    inside a trigger, or the alias of table for a backfill (a condition on
+    row can then be appended to each with AND).
+    """
+    item = day_sql("trim(CAST(j.value AS TEXT), ' \"''')")
+    rows = f"{table} {row}, " if table else ""
+    listed = (
+        f"INSERT OR IGNORE INTO {VISIT_DAYS_TABLE} (visit_source, visit_id, day) "
+        f"SELECT '{source}', {row}.id, {item} "
+        f"FROM {rows}json_each({_json_list_sql(f'{row}.visit_dates')}) j "
+        f"WHERE {item} IS NOT NULL"
+    )
+    start = day_sql(f"CAST({row}.visit_date AS TEXT)")
+    count = f"min(max(COALESCE(CAST({row}.no_of_days AS INTEGER), 1), 1), {_MAX_DAYS})"
+    consecutive = (
+        f"INSERT OR IGNORE INTO {VISIT_DAYS_TABLE} (visit_source, visit_id, day) "
+        f"SELECT '{source}', {row}.id, date({start}, '+' || o.n || ' days') "
+        f"FROM {rows}{VISIT_DAY_OFFSETS_TABLE} o "
+        f"WHERE o.n < {count} AND {start} IS NOT NULL AND NOT EXISTS ("
+        f"SELECT 1 FROM {VISIT_DAYS_TABLE} d WHERE d.visit_source = '{source}' AND d.visit_id = {row}.id)"
+    )
+    return [listed, consecutive]
+
+
+def trigger_sql():
+    """CREATE TRIGGER statements keeping visit_days in sync with both tables"""
+    statements = []
+    for source, table in SOURCE_TABLES.items():
+        write = ' '.join(statement + ';' for statement in insert_days_sql(source, 'NEW'))
+        clear = f"DELETE FROM {VISIT_DAYS_TABLE} WHERE visit_source = '{source}' AND visit_id = OLD.id;"
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_visit_days_insert AFTER INSERT ON {table} "
+            f"BEGIN {write} END"
+        )
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_visit_days_update "
+            f"AFTER UPDATE OF id, visit_date, no_of_days, visit_dates ON {table} "
+            f"BEGIN {clear} {write} END"
+        )
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_visit_days_delete AFTER DELETE ON {table} "
+            f"BEGIN {clear} END"
+        )
+    return statements
+
+
+# ----------------------------------------------------------------------
+# Schema / backfill (DB-API connection)
+# ----------------------------------------------------------------------
+
+def _table_exists(cursor, table):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def backfill_visit_days(conn, source, chunk_size=500):
+    """Rebuild visit_days for one source table in keyset chunks"""
+    table = SOURCE_TABLES[source]
+    statements = [
+        sql + " AND t.id BETWEEN ? AND ?" for sql in insert_days_sql(source, 't', table)
+    ]
+    cursor = conn.cursor()
+    written = 0
+    last_id = 0
+    while True:
+        cursor.execute(
+            f"SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?", (last_id, chunk_size)
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            break
+        cursor.execute(
+            f"DELETE FROM {VISIT_DAYS_TABLE} WHERE visit_source = ? "
+            f"AND visit_id BETWEEN ? AND ?",
+            (source, ids[0], ids[-1])
+        )
+        for sql in statements:
+            cursor.execute(sql, (ids[0], ids[-1]))
+            written += cursor.rowcount
+        conn.commit()
+        last_id = ids[-1]
+    cursor.close()
+    return written
+
+
+def ensure_visit_days_table(conn, rebuild=False):
+    """
+    Create visit_days, its day index and the sync triggers. Backfills when
+    the table is new or rebuild=True; returns the number of day rows written.
+    """
+    cursor = conn.cursor()
+    if not all(_table_exists(cursor, table) for table in SOURCE_TABLES.values()):
+        cursor.close()
+        return 0
+
+    created = not _table_exists(cursor, VISIT_DAYS_TABLE)
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {VISIT_DAYS_TABLE} ("
+        f"visit_source VARCHAR(20) NOT NULL, "
+        f"visit_id INTEGER NOT NULL, "
+        f"day DATE NOT NULL, "
+        f"PRIMARY KEY (visit_source, visit_id, day)"
+        f") WITHOUT ROWID"
+    )
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS ix_visit_days_day ON {VISIT_DAYS_TABLE} (day, visit_source, visit_id)"
+    )
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {VISIT_DAY_OFFSETS_TABLE} (n INTEGER PRIMARY KEY)"
+    )
+    cursor.executemany(
+        f"INSERT OR IGNORE INTO {VISIT_DAY_OFFSETS_TABLE} (n) VALUES (?)",
+        [(n,) for n in range(_MAX_DAYS)]
+    )
+    for statement in trigger_sql():
+        cursor.execute(statement)
+    cursor.close()
+    conn.commit()
+
+    written = 0
+    if created or rebuild:
+        for source in SOURCE_TABLES:
+            written += backfill_visit_days(conn, source)
+    return written
@@ -0,0 +1,380 @@
+"""
+Streaming Visit Export
+Visitor history (the 'visits' read model) as CSV, gzipped CSV or XLSX,
+written to the response batch by batch so a year-long export of hundreds of
+thousands of rows uses the same memory as a one-day export:
+
+    batches      EXPORT_BATCH_SIZE rows per keyset query over (source,
+                 source_id), each on a connection checked out of the
+                 read-only analytics pool for just that query - a slow
+                 download never holds a pool slot, a read transaction
+                 (WAL checkpoints keep working) or the statement timeout
+    CSV          each batch is encoded and sent before the next is read;
+                 optionally through a streaming gzip compressor
+    XLSX         openpyxl write-only workbook spooled to a temporary file
+                 (rows are never held in memory), then sent in chunks
+    archives     visits moved to the monthly archives (utils/archive.py)
+                 are exported first, month by month - each batch attaches
+                 its one month file - then the live rows
+    resumption   cursor= continues after a given row, limit= cuts an export
+                 into parts; the response carries X-Export-Next-Cursor for
+                 the part that follows
+
+    export = VisitExport(columns=['full_name', 'company', 'visit_date'],
+                         start='2025-01-01', end='2025-12-31')
+    return export_response(export, 'csv', compress=True)
+"""
+
+import base64
+import csv
+import io
+import json
+import os
+import tempfile
+import zlib
+from functools import partial
+
+from config import Config
+from utils.archive import archived_months
+from utils.pagination import InvalidCursor
+from utils.visits import VISIT_COLUMNS, VISITS_TABLE
+
+EXPORT_COLUMNS = ['source', 'source_id'] + [column for column, _, _, _ in VISIT_COLUMNS]
+
+DEFAULT_EXPORT_COLUMNS = [
+    'full_name', 'email', 'phone', 'company', 'visitor_type', 'purpose',
+    'host_name', 'host_department', 'visit_date', 'visit_time', 'status',
+    'pass_id', 'check_in_time', 'check_out_time',
+]
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+# Data rows on one Excel sheet (1,048,576 minus the header)
+XLSX_MAX_ROWS = 1048575
+
+_FILE_CHUNK = 64 * 1024
+
+
+def encode_export_cursor(source, source_id, month=None):
+    """Opaque token for 'continue after this visit' (of an archive month)"""
+    key = [source, source_id] if month is None else [month, source, source_id]
+    payload = json.dumps(key, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_export_cursor(token):
+    """(month or None for live rows, source, source_id) from a token; raises InvalidCursor"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded))
+        month = str(key.pop(0)) if len(key) == 3 else None
+        source, source_id = key
+        return month, str(source), int(source_id)
+    except (ValueError, TypeError, AttributeError, json.JSONDecodeError) as e:
+        raise InvalidCursor(f"Invalid export cursor: {token!r}") from e
+
+
+def export_columns(requested=None):
+    """Validated column list (DEFAULT_EXPORT_COLUMNS when none requested)"""
+    if not requested:
+        return list(DEFAULT_EXPORT_COLUMNS)
+    if isinstance(requested, str):
+        requested = [column.strip() for column in requested.split(',') if column.strip()]
+    unknown = [column for column in requested if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown export column(s): {', '.join(unknown)}")
+    return list(dict.fromkeys(requested))
+
+
+def _analytics_rows(sql, params):
+    """Rows of one batch query from the read-only analytics pool"""
+    from sqlalchemy import text
+
+    from utils.analytics_db import analytics_connection
+
+    with analytics_connection() as conn:
+        result = conn.execution_options(stream_results=True).execute(text(sql), params)
+        return [tuple(row) for row in result]
+
+
+def _analytics_archive_rows(month, sql, params, folder=None):
+    """As _analytics_rows, with 'visits' the archived visits of one month"""
+    from sqlalchemy import text
+
+    from utils.analytics_db import analytics_connection
+    from utils.archive import attached_months, with_archives
+
+    with analytics_connection() as conn:
+        with attached_months(conn.connection, [month], folder) as aliases:
+            cursor = conn.connection.cursor()
+            try:
+                sql = with_archives(cursor, sql, aliases, live=False)
+            finally:
+                cursor.close()
+            return [tuple(row) for row in conn.execute(text(sql), params)]
+
+
+# Sorts after every 'YYYY-MM': live rows come after the archive months
+_LIVE_PART = '~'
+
+
+class VisitExport:
+    """
+    One export: selected columns of the visits between start and end
+    (visit_date, inclusive), optionally one status - archived months in
+    order, then the live rows, each in (source, source_id) order.
+
+    read(sql, params) returns a batch of row tuples and
+    read_archive(month, sql, params) the same over one archive month; both
+    default to the read-only analytics engine. A custom read without a
+    read_archive exports the live rows only.
+    """
+
+    def __init__(self, columns=None, start=None, end=None, status=None,
+                 cursor=None, limit=None, batch_size=None, read=None, read_archive=None, folder=None):
+        self.columns = export_columns(columns)
+        self.start = str(start)[:10] if start else None
+        self.end = str(end)[:10] if end else None
+        self.status = status or None
+        self.after = decode_export_cursor(cursor) if cursor else None
+        self.limit = int(limit) if limit else None
+        self.batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+        if read is None and read_archive is None:
+            read_archive = partial(_analytics_archive_rows, folder=folder)
+        self.read = read or _analytics_rows
+        self.read_archive = read_archive
+        self.months = archived_months(self.start, self.end, folder) if read_archive else []
+        self.rows_written = 0
+
+    def _where(self, after):
+        # The unary + keeps SQLite on the primary key: every batch continues
+        # the index walk where the last one stopped instead of re-reading
+        # the whole date range through ix_visits_visit_date_status
+        conditions = []
+        params = {}
+        if self.start:
+            conditions.append("+visit_date >= :start")
+            params['start'] = self.start
+        if self.end:
+            conditions.append("+visit_date <= :end")
+            params['end'] = self.end
+        if self.status:
+            conditions.append("+status = :status")
+            params['status'] = self.status
+        if after is not None:
+            conditions.append("(source, source_id) > (:after_source, :after_id)")
+            params['after_source'], params['after_id'] = after
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def _parts(self):
+        """(month, keyset position) of the parts still to read; month None = live rows"""
+        position = self.after
+        if position is None:
+            return [(month, None) for month in self.months + [None]]
+        current = position[0] or _LIVE_PART
+        return [
+            (month, position[1:] if (month or _LIVE_PART) == current else None)
+            for month in self.months + [None]
+            if (month or _LIVE_PART) >= current
+        ]
+
+    def _read(self, month, sql, params):
+        return self.read(sql, params) if month is None else self.read_archive(month, sql, params)
+
+    def _count(self, month, after):
+        where, params = self._where(after)
+        return self._read(month, f"SELECT COUNT(*) FROM {VISITS_TABLE}{where.replace('+', '')}", params)[0][0]
+
+    def rows(self):
+        """Row tuples in column order, one batch query at a time"""
+        select = ', '.join(self.columns)
+        remaining = self.limit
+        for month, after in self._parts():
+            while remaining is None or remaining > 0:
+                size = self.batch_size if remaining is None else min(self.batch_size, remaining)
+                where, params = self._where(after)
+                params['batch'] = size
+                batch = self._read(
+                    month,
+                    f"SELECT {select}, source, source_id FROM {VISITS_TABLE}{where} "
+                    f"ORDER BY source, source_id LIMIT :batch",
+                    params
+                )
+                for row in batch:
+                    yield row[:-2]
+                self.rows_written += len(batch)
+                if remaining is not None:
+                    remaining -= len(batch)
+                if len(batch) < size:
+                    break
+                after = tuple(batch[-1][-2:])
+
+    def count(self):
+        """Rows this export will write (for progress reporting)"""
+        total = sum(self._count(month, after) for month, after in self._parts())
+        return min(total, self.limit) if self.limit else total
+
+    def next_cursor(self, limit=None):
+        """
+        Cursor for the part after the first limit rows (default self.limit),
+        or None when this part reaches the end. Reads keys and counts only.
+        """
+        limit = limit or self.limit
+        if not limit:
+            return None
+        offset = limit - 1
+        last = None
+        for month, after in self._parts():
+            if last is not None:
+                # The limit-th row ended a month: is anything left after it?
+                if self._count(month, after):
+                    return encode_export_cursor(*last[1:], month=last[0])
+                continue
+            where, params = self._where(after)
+            params['offset'] = offset
+            keys = self._read(
+                month,
+                f"SELECT source, source_id FROM {VISITS_TABLE}{where} "
+                f"ORDER BY source, source_id LIMIT 2 OFFSET :offset",
+                params
+            )
+            if len(keys) == 2:
+                return encode_export_cursor(*keys[0], month=month)
+            if keys:
+                last = (month,) + tuple(keys[0])
+            else:
+                offset -= self._count(month, after)
+        return None
+
+    # ------------------------------------------------------------------
+    # Writers
+    # ------------------------------------------------------------------
+
+    def csv_chunks(self, header=None):
+        """
+        UTF-8 CSV as one bytes chunk per batch. The header (with a BOM so
+        Excel detects UTF-8) is written unless this part resumes a cursor.
+        """
+        header = self.after is None if header is None else header
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if header:
+            buffer.write('\ufeff')
+            writer.writerow(self.columns)
+        pending = 0
+        for row in self.rows():
+            writer.writerow(row)
+            pending += 1
+            if pending >= self.batch_size:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    def xlsx_chunks(self):
+        """
+        XLSX bytes in chunks. The workbook is written row by row in
+        write-only mode to a temporary file (an XLSX is a zip and cannot be
+        sent before it is complete), then streamed and deleted.
+        """
+        from utils.lazy_imports import openpyxl
+
+        self.fit_sheet()
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet('Visits')
+        sheet.append(self.columns)
+        for row in self.rows():
+            sheet.append(row)
+
+        handle, path = tempfile.mkstemp(suffix='.xlsx', prefix='visit_export_')
+        os.close(handle)
+        try:
+            workbook.save(path)
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(_FILE_CHUNK)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(path)
+
+    def fit_sheet(self):
+        """Cap the part at one Excel sheet; the rest goes to the next part"""
+        if self.limit is None or self.limit > XLSX_MAX_ROWS:
+            self.limit = XLSX_MAX_ROWS
+
+    def chunks(self, fmt='csv', compress=False):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        chunks = self.xlsx_chunks() if fmt == 'xlsx' else self.csv_chunks()
+        return gzip_chunks(chunks) if compress else chunks
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of bytes chunks without buffering it"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# ----------------------------------------------------------------------
+# Flask
+# ----------------------------------------------------------------------
+
+def export_args(args=None):
+    """VisitExport keyword arguments plus (fmt, compress) from the query string"""
+    if args is None:
+        from flask import request
+
+        args = request.args
+    try:
+        limit = int(args['limit']) if args.get('limit') else None
+    except (TypeError, ValueError):
+        limit = None
+    options = {
+        'columns': args.get('columns') or None,
+        'start': args.get('start') or None,
+        'end': args.get('end') or None,
+        'status': args.get('status') or None,
+        'cursor': args.get('cursor') or None,
+        'limit': limit,
+    }
+    fmt = (args.get('format') or 'csv').lower()
+    compress = (args.get('gzip') or '').lower() in ('1', 'true', 'yes')
+    return options, fmt, compress
+
+
+def export_response(export, fmt='csv', compress=False, filename=None):
+    """
+    Streaming download response. The next-part cursor is computed before
+    the first byte is sent, so it can go in a header.
+    """
+    from flask import Response, stream_with_context
+
+    mimetype, extension = FORMATS[fmt]
+    if fmt == 'xlsx':
+        export.fit_sheet()
+    next_cursor = export.next_cursor()
+
+    filename = filename or f"visits_{export.start or 'all'}_{export.end or 'all'}.{extension}"
+    headers = {
+        'Content-Disposition': f'attachment; filename="{filename}{".gz" if compress else ""}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',
+    }
+    if next_cursor:
+        headers['X-Export-Next-Cursor'] = next_cursor
+    return Response(
+        stream_with_context(export.chunks(fmt, compress)),
+        mimetype='application/gzip' if compress else mimetype,
+        headers=headers,
+    )
@@ -0,0 +1,275 @@
+"""
+Daily Visit Rollups
+daily_visit_rollup holds one row per day x source x status x host x
+company x visitor_type with the number of visits, so the analytics
+dashboard sums a few hundred rows for a 12-month range instead of scanning
+every visitors / host_visitors row.
+
+    day           visit_date (created_at's date when there is none)
+    source        'visitor' (public registration) or 'host_visitor'
+    host_id       host_visitors.host_id, 0 for public registrations
+    host_email    visitors.host_email, '' for host registrations
+
+SQLite triggers on both visit tables adjust the counts in the same
+transaction as every INSERT / UPDATE / DELETE. Rows moved out by the
+archive job (utils/archive.py) keep counting: it sets a marker row in
+visit_rollup_suppress inside its delete transaction, which the delete
+triggers skip on. rebuild_rollups() and check_rollups() therefore read the
+live tables plus every archive month.
+"""
+
+ROLLUP_TABLE = 'daily_visit_rollup'
+SUPPRESS_TABLE = 'visit_rollup_suppress'
+
+SOURCE_TABLES = {
+    'visitor': 'visitors',
+    'host_visitor': 'host_visitors',
+}
+
+# (column, type, expression on visitors, expression on host_visitors)
+ROLLUP_KEYS = [
+    ('day', 'DATE', "COALESCE({row}.visit_date, date({row}.created_at), '')",
+     "COALESCE({row}.visit_date, date({row}.created_at), '')"),
+    ('status', 'VARCHAR(20)', "COALESCE({row}.status, '')", "COALESCE({row}.status, '')"),
+    ('host_id', 'INTEGER', '0', 'COALESCE({row}.host_id, 0)'),
+    ('host_email', 'VARCHAR(120)', "COALESCE({row}.host_email, '')", "''"),
+    ('company', 'VARCHAR(120)', "COALESCE({row}.company, '')", "COALESCE({row}.company, '')"),
+    ('visitor_type', 'VARCHAR(50)', "COALESCE({row}.visitor_type, '')", "COALESCE({row}.visitor_type, '')"),
+]
+
+# Columns whose change moves a visit to another rollup row
+_TRACKED_COLUMNS = {
+    'visitor': ('visit_date', 'created_at', 'status', 'host_email', 'company', 'visitor_type'),
+    'host_visitor': ('visit_date', 'created_at', 'status', 'host_id', 'company', 'visitor_type'),
+}
+
+KEY_COLUMNS = ('day', 'source') + tuple(column for column, _, _, _ in ROLLUP_KEYS[1:])
+
+
+def _key_list():
+    return ', '.join(column for column, _, _, _ in ROLLUP_KEYS)
+
+
+def _key_values(source, row):
+    position = 2 if source == 'visitor' else 3
+    return ', '.join(spec[position].format(row=row) for spec in ROLLUP_KEYS)
+
+
+def _key_match(source, row):
+    position = 2 if source == 'visitor' else 3
+    return ' AND '.join(f"{spec[0]} = {spec[position].format(row=row)}" for spec in ROLLUP_KEYS)
+
+
+def create_table_sql():
+    columns = ',\n    '.join(f"{column} {sql_type} NOT NULL" for column, sql_type, _, _ in ROLLUP_KEYS)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (\n"
+        f"    {columns},\n"
+        f"    source VARCHAR(20) NOT NULL,\n"
+        f"    visits INTEGER NOT NULL,\n"
+        f"    PRIMARY KEY ({', '.join(KEY_COLUMNS)})\n"
+        f") WITHOUT ROWID"
+    )
+
+
+def trigger_sql():
+    """CREATE TRIGGER statements keeping the rollup in step with both tables"""
+    statements = []
+    for source, table in SOURCE_TABLES.items():
+        increment = (
+            f"INSERT INTO {ROLLUP_TABLE} ({_key_list()}, source, visits) "
+            f"VALUES ({_key_values(source, 'NEW')}, '{source}', 1) "
+            f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET visits = visits + 1;"
+        )
+        decrement = (
+            f"UPDATE {ROLLUP_TABLE} SET visits = visits - 1 "
+            f"WHERE source = '{source}' AND {_key_match(source, 'OLD')}; "
+            f"DELETE FROM {ROLLUP_TABLE} "
+            f"WHERE source = '{source}' AND {_key_match(source, 'OLD')} AND visits <= 0;"
+        )
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_insert AFTER INSERT ON {table} "
+            f"BEGIN {increment} END"
+        )
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_update "
+            f"AFTER UPDATE OF {', '.join(_TRACKED_COLUMNS[source])} ON {table} "
+            f"BEGIN {decrement} {increment} END"
+        )
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_delete AFTER DELETE ON {table} "
+            f"WHEN NOT EXISTS (SELECT 1 FROM {SUPPRESS_TABLE}) "
+            f"BEGIN {decrement} END"
+        )
+    return statements
+
+
+def _table_exists(cursor, table, schema='main'):
+    cursor.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def ensure_rollup_table(conn, rebuild=False):
+    """
+    Create the rollup table and its triggers (DB-API connection). Rebuilds
+    the counts when the table is new or rebuild=True; returns the number of
+    rollup rows written, or 0 if nothing was rebuilt.
+    """
+    cursor = conn.cursor()
+    if not all(_table_exists(cursor, table) for table in SOURCE_TABLES.values()):
+        cursor.close()
+        return 0
+
+    created = not _table_exists(cursor, ROLLUP_TABLE)
+    cursor.execute(create_table_sql())
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {SUPPRESS_TABLE} (active INTEGER)")
+    for statement in trigger_sql():
+        cursor.execute(statement)
+    cursor.close()
+    conn.commit()
+
+    if created or rebuild:
+        return rebuild_rollups(conn)
+    return 0
+
+
+def drop_rollup_triggers(conn):
+    """Remove the triggers (e.g. before changing ROLLUP_KEYS)"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_%_rollup_%'")
+    for (name,) in cursor.fetchall():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cursor.close()
+    conn.commit()
+
+
+# ----------------------------------------------------------------------
+# Rebuild / consistency check
+# ----------------------------------------------------------------------
+
+def _group_counts(cursor, schema='main', counts=None):
+    """Add {key tuple: visits} from schema's visit tables into counts"""
+    counts = {} if counts is None else counts
+    for source, table in SOURCE_TABLES.items():
+        if not _table_exists(cursor, table, schema):
+            continue
+        cursor.execute(
+            f"SELECT {_key_values(source, table)}, COUNT(*) FROM {schema}.{table} "
+            f"GROUP BY {', '.join(str(position) for position in range(1, len(ROLLUP_KEYS) + 1))}"
+        )
+        for row in cursor.fetchall():
+            day, status, host_id, host_email, company, visitor_type, visits = row
+            key = (day, source, status, host_id, host_email, company, visitor_type)
+            counts[key] = counts.get(key, 0) + visits
+    return counts
+
+
+def _archive_counts(conn, folder=None):
+    """Counts from every archive month, one attached file at a time"""
+    from utils.archive import archived_months, attach_month, detach_month
+
+    counts = {}
+    cursor = conn.cursor()
+    for month in archived_months(folder=folder):
+        alias = attach_month(conn, month, folder)
+        try:
+            _group_counts(cursor, alias, counts)
+        finally:
+            detach_month(conn, alias)
+    cursor.close()
+    return counts
+
+
+def expected_counts(conn, include_archives=True, folder=None):
+    counts = _archive_counts(conn, folder) if include_archives else {}
+    cursor = conn.cursor()
+    _group_counts(cursor, 'main', counts)
+    cursor.close()
+    return counts
+
+
+def rebuild_rollups(conn, include_archives=True, folder=None):
+    """
+    Recount every rollup row from the live tables plus the archive months.
+    The live part runs in one write transaction, so concurrent changes are
+    either fully in the new counts or applied by the triggers after it.
+    Returns the number of rollup rows written.
+    """
+    archived = _archive_counts(conn, folder) if include_archives else {}
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        counts = _group_counts(cursor, 'main', dict(archived))
+        cursor.execute(f"DELETE FROM {ROLLUP_TABLE}")
+        cursor.executemany(
+            f"INSERT INTO {ROLLUP_TABLE} ({', '.join(KEY_COLUMNS)}, visits) "
+            f"VALUES ({', '.join('?' for _ in KEY_COLUMNS)}, ?)",
+            [key + (visits,) for key, visits in counts.items()]
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(counts)
+
+
+def check_rollups(conn, include_archives=True, folder=None):
+    """
+    Compare the rollup table with a fresh count. Returns a list of
+    (key, expected, actual) for every row that differs (empty when
+    consistent).
+    """
+    expected = expected_counts(conn, include_archives, folder)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(KEY_COLUMNS)}, visits FROM {ROLLUP_TABLE}")
+    actual = {tuple(row[:-1]): row[-1] for row in cursor.fetchall()}
+    cursor.close()
+    return [
+        (key, expected.get(key, 0), actual.get(key, 0))
+        for key in sorted(set(expected) | set(actual), key=lambda key: tuple(map(str, key)))
+        if expected.get(key, 0) != actual.get(key, 0)
+    ]
+
+
+# ----------------------------------------------------------------------
+# Dashboard queries (read-only analytics engine)
+# ----------------------------------------------------------------------
+
+def rollup_totals(group_by=('status',), start=None, end=None, **filters):
+    """
+    SUM(visits) grouped by any of KEY_COLUMNS between start and end
+    (dates or ISO strings, inclusive), e.g.
+
+        rollup_totals(('day',), start, end, source='visitor')
+        rollup_totals(('company',), start, end, status='checked-out')
+    """
+    from utils.analytics_db import read_sql
+
+    for column in tuple(group_by) + tuple(filters):
+        if column not in KEY_COLUMNS:
+            raise ValueError(f"Unknown rollup column: {column}")
+    conditions = []
+    params = {}
+    if start is not None:
+        conditions.append("day >= :start")
+        params['start'] = str(start)[:10]
+    if end is not None:
+        conditions.append("day <= :end")
+        params['end'] = str(end)[:10]
+    for column, value in filters.items():
+        conditions.append(f"{column} = :{column}")
+        params[column] = value
+    columns = ', '.join(group_by)
+    sql = f"SELECT {columns}{', ' if columns else ''}SUM(visits) AS visits FROM {ROLLUP_TABLE}"
+    if conditions:
+        sql += " WHERE " + ' AND '.join(conditions)
+    if columns:
+        sql += f" GROUP BY {columns} ORDER BY {columns}"
+    return read_sql(sql, params)
+
+
+def status_counts(start=None, end=None, **filters):
+    """{status: visits} for the dashboard cards"""
+    return {row['status']: row['visits'] for row in rollup_totals(('status',), start, end, **filters)}
@@ -0,0 +1,241 @@
+"""
+Unified Visits Read Model
+One 'visits' table holding every public registration (visitors) and every
+host-registered visit (host_visitors), keyed by (source, source_id).
+
+SQLite triggers on both tables keep it in step with every INSERT / UPDATE /
+DELETE, whether it comes from the ORM, a migration script or the sqlite
+shell, so "who is expected today" is one indexed query instead of two
+queries merged in Python.
+"""
+
+from datetime import date
+
+VISITS_TABLE = 'visits'
+
+SOURCE_TABLES = {
+    'visitor': 'visitors',
+    'host_visitor': 'host_visitors',
+}
+
+_HOST_LOOKUP = "(SELECT {field} FROM hosts WHERE hosts.id = {row}.host_id)"
+
+# (column, type, expression on visitors, expression on host_visitors);
+# '{row}' becomes NEW in triggers and the table name in the backfill
+VISIT_COLUMNS = [
+    ('full_name', 'VARCHAR(120)', '{row}.full_name', '{row}.full_name'),
+    ('email', 'VARCHAR(120)', '{row}.email', '{row}.email'),
+    ('phone', 'VARCHAR(20)', '{row}.phone', '{row}.phone'),
+    ('company', 'VARCHAR(120)', '{row}.company', '{row}.company'),
+    ('visitor_type', 'VARCHAR(50)', '{row}.visitor_type', '{row}.visitor_type'),
+    ('purpose', 'VARCHAR(255)', '{row}.purpose', '{row}.purpose'),
+    ('vehicle_number', 'VARCHAR(20)', '{row}.vehicle_number', '{row}.vehicle_number'),
+    ('host_id', 'INTEGER', 'NULL', '{row}.host_id'),
+    ('host_name', 'VARCHAR(120)', '{row}.host_name', _HOST_LOOKUP.replace('{field}', 'full_name')),
+    ('host_email', 'VARCHAR(120)', '{row}.host_email', _HOST_LOOKUP.replace('{field}', 'email')),
+    ('host_department', 'VARCHAR(100)', '{row}.host_department', _HOST_LOOKUP.replace('{field}', 'department')),
+    ('host_confirmation', 'VARCHAR(20)', '{row}.host_confirmation', 'NULL'),
+    ('visit_type', 'VARCHAR(20)', '{row}.visit_type', '{row}.visit_type'),
+    ('visit_date', 'DATE', '{row}.visit_date', '{row}.visit_date'),
+    ('visit_time', 'VARCHAR(10)', '{row}.visit_time', '{row}.visit_time'),
+    ('no_of_days', 'INTEGER', '{row}.no_of_days', '{row}.no_of_days'),
+    ('visit_dates', 'TEXT', '{row}.visit_dates', '{row}.visit_dates'),
+    ('status', 'VARCHAR(20)', '{row}.status', '{row}.status'),
+    ('pass_id', 'VARCHAR(50)', '{row}.pass_id', '{row}.pass_id'),
+    ('entry_code', 'VARCHAR(4)', '{row}.entry_code', '{row}.entry_code'),
+    ('exit_code', 'VARCHAR(4)', '{row}.exit_code', '{row}.exit_code'),
+    ('check_in_time', 'DATETIME', '{row}.check_in_time', '{row}.check_in_time'),
+    ('check_out_time', 'DATETIME', '{row}.check_out_time', '{row}.check_out_time'),
+    ('created_at', 'DATETIME', '{row}.created_at', '{row}.created_at'),
+    ('updated_at', 'DATETIME', '{row}.updated_at', '{row}.updated_at'),
+]
+
+VISIT_INDEXES = [
+    ('ix_visits_visit_date_status', ('visit_date', 'status')),
+    ('ix_visits_status_created_at', ('status', 'created_at')),
+    ('ix_visits_entry_code', ('entry_code',)),
+    ('ix_visits_exit_code', ('exit_code',)),
+    ('ix_visits_pass_id', ('pass_id',)),
+    ('ix_visits_host_email_visit_date', ('host_email', 'visit_date')),
+    ('ix_visits_host_id_created_at', ('host_id', 'created_at')),
+    ('ix_visits_created_at', ('created_at',)),
+]
+
+
+def _column_names():
+    return ', '.join(column for column, _, _, _ in VISIT_COLUMNS)
+
+
+def _select_list(source, row):
+    position = 2 if source == 'visitor' else 3
+    return ', '.join(spec[position].format(row=row) for spec in VISIT_COLUMNS)
+
+
+def create_table_sql():
+    columns = ',\n    '.join(f"{column} {sql_type}" for column, sql_type, _, _ in VISIT_COLUMNS)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {VISITS_TABLE} (\n"
+        f"    source VARCHAR(20) NOT NULL,\n"
+        f"    source_id INTEGER NOT NULL,\n"
+        f"    {columns},\n"
+        f"    PRIMARY KEY (source, source_id)\n"
+        f")"
+    )
+
+
+def trigger_sql():
+    """CREATE TRIGGER statements keeping visits in sync with both tables"""
+    statements = []
+    for source, table in SOURCE_TABLES.items():
+        upsert = (
+            f"INSERT OR REPLACE INTO {VISITS_TABLE} (source, source_id, {_column_names()}) "
+            f"VALUES ('{source}', NEW.id, {_select_list(source, 'NEW')});"
+        )
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_visits_insert AFTER INSERT ON {table} "
+            f"BEGIN {upsert} END"
+        )
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_visits_update AFTER UPDATE ON {table} "
+            f"BEGIN {upsert} END"
+        )
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_visits_delete AFTER DELETE ON {table} "
+            f"BEGIN DELETE FROM {VISITS_TABLE} WHERE source = '{source}' AND source_id = OLD.id; END"
+        )
+    # Host-registered visits show the host's current name / email
+    statements.append(
+        f"CREATE TRIGGER IF NOT EXISTS trg_hosts_visits_update "
+        f"AFTER UPDATE OF full_name, email, department ON hosts "
+        f"BEGIN UPDATE {VISITS_TABLE} SET host_name = NEW.full_name, host_email = NEW.email, "
+        f"host_department = NEW.department "
+        f"WHERE source = 'host_visitor' AND host_id = NEW.id; END"
+    )
+    return statements
+
+
+def backfill_sql(source):
+    table = SOURCE_TABLES[source]
+    return (
+        f"INSERT OR REPLACE INTO {VISITS_TABLE} (source, source_id, {_column_names()}) "
+        f"SELECT '{source}', {table}.id, {_select_list(source, table)} FROM {table}"
+    )
+
+
+def _table_exists(cursor, table):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def ensure_visits_table(conn, rebuild=False):
+    """
+    Create the visits table, its indexes and triggers (DB-API connection).
+
+    The table is backfilled when it is first created or when rebuild=True.
+    Returns the number of rows copied, or 0 if nothing was backfilled.
+    """
+    cursor = conn.cursor()
+    if not all(_table_exists(cursor, table) for table in list(SOURCE_TABLES.values()) + ['hosts']):
+        cursor.close()
+        return 0
+
+    created = not _table_exists(cursor, VISITS_TABLE)
+    cursor.execute(create_table_sql())
+    for name, columns in VISIT_INDEXES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {VISITS_TABLE} ({', '.join(columns)})")
+    for statement in trigger_sql():
+        cursor.execute(statement)
+
+    copied = 0
+    if created or rebuild:
+        cursor.execute(f"DELETE FROM {VISITS_TABLE}")
+        for source in SOURCE_TABLES:
+            cursor.execute(backfill_sql(source))
+            copied += cursor.rowcount
+    cursor.close()
+    conn.commit()
+    return copied
+
+
+def drop_visits_triggers(conn):
+    """Remove the triggers (e.g. before changing VISIT_COLUMNS)"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_%_visits_%'")
+    for (name,) in cursor.fetchall():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cursor.close()
+    conn.commit()
+
+
+def count_mismatches(conn):
+    """Rows missing from visits or left over in it (0 when consistent)"""
+    cursor = conn.cursor()
+    mismatches = 0
+    for source, table in SOURCE_TABLES.items():
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE NOT EXISTS "
+            f"(SELECT 1 FROM {VISITS_TABLE} v WHERE v.source = '{source}' AND v.source_id = {table}.id)"
+        )
+        mismatches += cursor.fetchone()[0]
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {VISITS_TABLE} v WHERE v.source = '{source}' AND NOT EXISTS "
+            f"(SELECT 1 FROM {table} WHERE {table}.id = v.source_id)"
+        )
+        mismatches += cursor.fetchone()[0]
+    cursor.close()
+    return mismatches
+
+
+# ----------------------------------------------------------------------
+# Queries (Flask-SQLAlchemy session)
+# ----------------------------------------------------------------------
+
+def _execute(sql, params):
+    from sqlalchemy import text
+
+    from models.database import db
+
+    return db.session.execute(text(sql), params).mappings().all()
+
+
+def expected_visits(day=None, status=None):
+    """
+    Visits of both kinds scheduled for day (default today), by time -
+    including every day of multi-day visits (see utils.visit_days)
+    """
+    from utils.visit_days import VISIT_DAYS_TABLE
+
+    sql = (
+        f"SELECT v.* FROM {VISIT_DAYS_TABLE} d "
+        f"JOIN {VISITS_TABLE} v ON v.source = d.visit_source AND v.source_id = d.visit_id "
+        f"WHERE d.day = :day"
+    )
+    params = {'day': (day or date.today()).isoformat()}
+    if status is not None:
+        sql += " AND v.status = :status"
+        params['status'] = status
+    return _execute(sql + " ORDER BY v.visit_time", params)
+
+
+def visits_with_status(status, limit=None):
+    sql = f"SELECT * FROM {VISITS_TABLE} WHERE status = :status ORDER BY created_at DESC"
+    params = {'status': status}
+    if limit:
+        sql += " LIMIT :limit"
+        params['limit'] = limit
+    return _execute(sql, params)
+
+
+def find_visit_by_code(code, kind='entry'):
+    """The visit with this entry / exit code, or None"""
+    column = 'exit_code' if kind == 'exit' else 'entry_code'
+    rows = _execute(
+        f"SELECT * FROM {VISITS_TABLE} WHERE {column} = :code ORDER BY visit_date DESC LIMIT 1",
+        {'code': code}
+    )
+    return rows[0] if rows else None
+
+
+def find_visit_by_pass_id(pass_id):
+    rows = _execute(f"SELECT * FROM {VISITS_TABLE} WHERE pass_id = :pass_id LIMIT 1", {'pass_id': pass_id})
+    return rows[0] if rows else None